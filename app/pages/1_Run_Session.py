@@ -6,12 +6,12 @@ import streamlit as st
 
 from printtune.core.io.paths import (
     get_sample_image_path,
-    session_json_path,
     session_dir,
     artifacts_dir,
     best_params_json_path,
 )
-from printtune.core.io.session_store import save_session, load_session
+from printtune.core.io.session_repository import default_session_repository
+from printtune.core.io.session_store import SessionConflictError
 from printtune.core.io.best_params_store import save_best_params, load_best_params
 from printtune.core.optimizer.best_selector import estimate_best_params
 from printtune.core.imaging.globals_adapter import globals_dict_to_params
@@ -27,8 +27,9 @@ from printtune.core.session_runner import (
 )
 from printtune.core.botorch.update_loop import propose_from_session_for_round
 from printtune.core.ui.streamlit_state import ensure_state
-from printtune.core.usecases import submit_judgment_and_maybe_create_next_round
+from printtune.core.usecases import submit_judgment_and_save
 from printtune.core.session_loop import make_next_round # 直接呼び出し用にimport
+from printtune.core.speculative import default_prefetcher
 
 # 定数: 最大ラウンド数（reprint等で増えることを考慮して少し多めに）
 
@@ -75,6 +76,11 @@ if not use_sample:
 if "session_id" not in st.session_state:
     st.session_state.session_id = None
 
+# セッションの meta（カタログでの検索に使う。空欄なら記録しない）
+meta_cols = st.columns(2)
+printer_name = meta_cols[0].text_input("プリンタ", key="session_printer")
+paper_name = meta_cols[1].text_input("用紙", key="session_paper")
+
 if st.button("Start new session"):
     # セッションIDを先に生成
     from printtune.core.ids import SessionId
@@ -93,13 +99,14 @@ if st.button("Start new session"):
         image_path = "data/input/sample.png"
         original_filename = "sample"
     
-    sess = new_session(sample_image_relpath=image_path)
+    meta = {k: v.strip() for k, v in (("printer", printer_name), ("paper", paper_name)) if v.strip()}
+    sess = new_session(sample_image_relpath=image_path, meta=meta)
     # 元のファイル名をsession_stateに保存（セッションIDをキーに）
     st.session_state[f"original_filename_{sess.session_id}"] = original_filename
     
     rr1 = create_round1(sess)
     sess = append_round(sess, rr1)
-    save_session(session_json_path(sess.session_id), sess)
+    sess = default_session_repository().save(sess)
     st.session_state.session_id = sess.session_id
     st.rerun()
 
@@ -108,8 +115,7 @@ if sid is None:
     st.info("Start new session を押してください。")
     st.stop()
 
-sess_path = session_json_path(sid)
-sess = load_session(sess_path)
+sess = default_session_repository().get(sid)
 
 # セッションで使用する画像を取得（アップロード画像 or sample.png）
 if sess.sample_image_relpath and sess.sample_image_relpath != "data/input/sample.png":
@@ -147,7 +153,7 @@ st.divider()
 current = sess.rounds[-1]
 sheet_path = out_dir / f"round{current.round_index:02d}_sheet.png"
 if not sheet_path.exists():
-    sheet_path = render_round_sheet(img, current, out_dir=out_dir)
+    sheet_path = render_round_sheet(img, current, out_dir=out_dir, use_proxy=True)
 
 st.subheader(f"Current Round: {current.round_index}")
 # Round sheetは既にPNGファイルなので、そのまま読み込んで表示
@@ -176,6 +182,9 @@ if is_judged:
     if current.round_index >= len(sess.rounds):
          st.info("次のラウンド生成待ち、または終了です。")
 else:
+    # 判定を待つ間に、各スロットを選んだ場合の次の提案をバックグラウンドで計算しておく
+    default_prefetcher().prefetch_round(sess, current.round_index)
+
     st.write("### Judgment")
     
     # st.form を廃止し、条件分岐が即座にUIに反映されるようにする
@@ -215,6 +224,8 @@ else:
         # Rejudgeの場合、結局「どれが良いか」を選ばせる（判定を強制）
             st.info("Rejudge: 違いの目立つ観点（Rubric）を指定して、近いものを選んで次に進みます。")
             chosen = st.radio("ベスト（slot）", options=slots, horizontal=True, key=f"chosen_{current.round_index}_rejudge")
+            # rejudge の提案は rubric によって変わるので、選ばれている rubric の分も先読みしておく
+            default_prefetcher().prefetch_round(sess, current.round_index, rubric=rubric)
    
 
     # アクションボタン
@@ -225,26 +236,31 @@ else:
         btn_label = "決定 (Reprint)"
 
     if st.button(btn_label, type="primary"):
-        # 1. 判定保存 & 次ラウンド生成 (全てusecasesに委譲)
+        # 1. 判定 & 次ラウンド生成 & 保存 (全てusecasesに委譲)
+        # 別のタブ・オペレーターが先に保存していたら読み直してやり直す（同じラウンドが判定済みならエラー）
         # Spinnerを出して処理中であることを示す
-        with st.spinner("Processing judgment & calculating next proposal..."):
-            sess = submit_judgment_and_maybe_create_next_round(
-                sess,
-                round_index=current.round_index,
-                kind=kind,
-                chosen_slot=chosen,
-                rubric=rubric,
-                next_action=next_action,
-                delta_scale=(float(delta_scale) if delta_scale is not None else 1.0),
-            )
-        
-        # (以前の if kind == "chosen": make_next_round... ブロックは削除)
-        
+        try:
+            with st.spinner("Processing judgment & calculating next proposal..."):
+                sess = submit_judgment_and_save(
+                    default_session_repository(),
+                    sess,
+                    round_index=current.round_index,
+                    kind=kind,
+                    chosen_slot=chosen,
+                    rubric=rubric,
+                    next_action=next_action,
+                    delta_scale=(float(delta_scale) if delta_scale is not None else 1.0),
+                    prefetcher=default_prefetcher(),
+                )
+        except SessionConflictError:
+            st.error("このラウンドは別のタブ（または別のオペレーター）で先に判定されました。最新の状態を読み込みます。")
+            time.sleep(1.5)
+            st.rerun()
+
         if len(sess.rounds) >= 10: # MAX_ROUNDS定数参照推奨
                 st.warning("最大ラウンド数に達しました。")
 
-        # 2. 保存 & Best Params 更新（chosen判定の場合のみ） & リロード
-        save_session(sess_path, sess)
+        # 2. Best Params 更新（chosen判定の場合のみ） & リロード
         # chosen判定の場合のみbest_paramsを更新
         if kind == "chosen":
             from printtune.core.optimizer.best_selector import estimate_best_params
@@ -281,6 +297,13 @@ if st.button("Force save current best params"):
     else:
         st.warning("Best paramsを更新するには、少なくとも1回の「chosen」判定が必要です。")
 
+# GPモデルキャッシュの状況（1回の判定で学習が1回に収まっているかの確認用）
+from printtune.core.botorch.model_cache import default_model_cache
+_gp_stats = default_model_cache().stats
+st.caption(f"GP model cache: fits={_gp_stats.fits}, hits={_gp_stats.hits}")
+_pf_stats = default_prefetcher().stats
+st.caption(f"Proposal prefetch: hits={_pf_stats.hits}, misses={_pf_stats.misses}, discarded={_pf_stats.discarded}")
+
 # 検証画像アップロード
 uploaded = st.file_uploader("検証画像（JPEG/PNG）をアップロード", type=["jpg", "jpeg", "png"], key="verify_png")
 if uploaded is not None:
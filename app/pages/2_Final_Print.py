@@ -1,19 +1,18 @@
 # app/pages/2_Final_Print.py
-import io
 from pathlib import Path
 import streamlit as st
 from PIL import Image
 from printtune.core.ui.streamlit_state import ensure_state
-from printtune.core.io.paths import get_sample_image_path, best_params_json_path, session_json_path
+from printtune.core.io.paths import get_sample_image_path, best_params_json_path, render_cache_dir, shared_render_cache_dir
 from printtune.core.io.best_params_store import save_best_params, load_best_params
-from printtune.core.io.session_store import load_session
+from printtune.core.io.session_repository import default_session_repository
 from printtune.core.imaging.load import load_image_rgb
 from printtune.core.imaging.parametric_linear import GlobalParams
-from printtune.core.imaging.pipeline import render_image_with_global_params
 from printtune.core.imaging.globals_adapter import globals_dict_to_params
 from printtune.core.imaging.upload import process_uploaded_image
-from printtune.core.imaging.frame import compose_with_evaluation_frame
-from printtune.core.ui.image_display import display_image_png
+from printtune.core.imaging.final import render_final_image_file
+from printtune.core.imaging.render_cache import file_source_key
+from printtune.core.ui.image_display import display_image_png, display_png_bytes
 from printtune.core.optimizer.best_selector import has_finalized_best_params
 
 st.set_page_config(page_title="Final Print", layout="wide")
@@ -26,20 +25,23 @@ sid = st.session_state.get("session_id")
 
 # セッションで使用した画像を取得（優先順位: session_state > セッションファイル > sample.png）
 session_image = None
+session_image_source = None
 if sid:
     # セッションファイルから画像パスを取得
-    sess_path = session_json_path(sid)
-    if sess_path.exists():
-        sess = load_session(sess_path)
+    sessions = default_session_repository()
+    if sessions.exists(sid):
+        sess = sessions.get(sid)
         if sess.sample_image_relpath and sess.sample_image_relpath != "data/input/sample.png":
             # アップロード画像のパスが保存されている場合
             upload_path = Path(sess.sample_image_relpath)
             if upload_path.exists():
                 session_image = load_image_rgb(upload_path)
+                session_image_source = file_source_key(upload_path)
 
 # session_stateにアップロード画像がある場合は優先
 if st.session_state.get("uploaded_image") is not None:
     session_image = st.session_state.uploaded_image
+    session_image_source = None  # session_state の同じ Image オブジェクトごとにダイジェストを覚える
 
 # use_sampleの状態をsession_stateから取得（初期化されていない場合はFalse）
 if "use_sample" not in st.session_state:
@@ -59,16 +61,21 @@ if not use_sample:
     uploaded = st.file_uploader("写真をアップロード（JPEG/PNG対応）", type=["jpg", "jpeg", "png"], key="final_print_upload")
 
 # 画像を決定（優先順位: アップロード > セッション画像 > sample.png）
+# img_source: 描画キャッシュのキーに使う入力画像のダイジェストを、rerun をまたいで覚えておくためのキー
 if not use_sample:
     if uploaded is not None:
         img_in = process_uploaded_image(uploaded)
+        file_id = getattr(uploaded, "file_id", None)
+        img_source = None if file_id is None else ("upload", file_id)
     elif session_image is not None:
         img_in = session_image
+        img_source = session_image_source
     else:
         st.info("画像をアップロードするか、sample.pngを使用してください。")
         st.stop()
 else:
     img_in = load_image_rgb(get_sample_image_path())
+    img_source = file_source_key(get_sample_image_path())
 
 # ファイル名を生成（元のファイル名を使用）
 input_filename = "sample"
@@ -77,9 +84,9 @@ if sid:
     input_filename = st.session_state.get(f"original_filename_{sid}", "sample")
     # session_stateにない場合、セッションファイルから読み込んだ可能性があるので、パスから推測
     if input_filename == "sample":
-        sess_path = session_json_path(sid)
-        if sess_path.exists():
-            sess = load_session(sess_path)
+        sessions = default_session_repository()
+        if sessions.exists(sid):
+            sess = sessions.get(sid)
             if sess.sample_image_relpath and sess.sample_image_relpath != "data/input/sample.png":
                 # 一時ファイル名からは元のファイル名を推測できないので、デフォルト値を使用
                 pass
@@ -91,8 +98,11 @@ st.subheader("出力（印刷用）")
 
 # best_paramsを取得
 bp_path = None
+# 描画結果はPNGファイルとしてキャッシュ（rerunやトグル切り替えで描き直さない。画像はメモリに持たない）
+cache_dir = shared_render_cache_dir()
 if sid:
     bp_path = best_params_json_path(sid)
+    cache_dir = render_cache_dir(sid)
 
 # 評価用フレームのON/OFF
 use_frame = st.toggle("評価用フレームを適用", value=True, help="グレーグラデーションと原色パッチを追加します")
@@ -100,9 +110,9 @@ use_frame = st.toggle("評価用フレームを適用", value=True, help="グレ
 # best_paramsが確定しているかチェック（chosen判定が存在するか）
 has_finalized = False
 if sid:
-    sess_path = session_json_path(sid)
-    if sess_path.exists():
-        sess = load_session(sess_path)
+    sessions = default_session_repository()
+    if sessions.exists(sid):
+        sess = sessions.get(sid)
         has_finalized = has_finalized_best_params(sess)
 
 if bp_path and bp_path.exists() and has_finalized:
@@ -111,38 +121,33 @@ if bp_path and bp_path.exists() and has_finalized:
     best_params = globals_dict_to_params(g)
     
     st.caption(f"Applied Params: {g}") # デバッグ用に表示しても良い
-    img_out = render_image_with_global_params(img_in, best_params)
-    
-    # 評価用フレームを適用
-    if use_frame:
-        img_out = compose_with_evaluation_frame(img_out)
+    # バンド単位でPNGファイルへ直接描画する（フル解像度の画像をメモリに作らない）
+    out_path = render_final_image_file(img_in, best_params, cache_dir, use_frame=use_frame, source=img_source)
+    out_png = out_path.read_bytes()
     
     # ファイル名を生成
     frame_suffix = "_with_frame" if use_frame else ""
     final_filename = f"{input_filename}_final{frame_suffix}"
     
     # PNG形式を保持したまま表示
-    display_image_png(img_out, caption="Final print image (Best Params Applied)", width="stretch", download_filename=final_filename)
+    display_png_bytes(out_png, caption="Final print image (Best Params Applied)", width="stretch", download_filename=final_filename)
     
     # ダウンロードボタン
     # PNG形式（可逆圧縮）で保存。JPEGアップロードでも圧縮劣化は発生しない
-    buf = io.BytesIO()
-    img_out.save(buf, format="PNG")
     st.download_button(
         "Download final_print.png",
-        data=buf.getvalue(),
+        data=out_png,
         file_name="final_print.png",
         mime="image/png",
     )
     
     # フレーム無し版もダウンロード可能にする
     if use_frame:
-        img_out_no_frame = render_image_with_global_params(img_in, best_params)
-        buf_no_frame = io.BytesIO()
-        img_out_no_frame.save(buf_no_frame, format="PNG")
+        # フレーム無し版もバンド単位でPNGファイルへ描画（2回目以降はキャッシュのファイルを返す）
+        no_frame_path = render_final_image_file(img_in, best_params, cache_dir, use_frame=False, source=img_source)
         st.download_button(
             "Download final_print_no_frame.png (フレーム無し)",
-            data=buf_no_frame.getvalue(),
+            data=no_frame_path.read_bytes(),
             file_name="final_print_no_frame.png",
             mime="image/png",
         )
@@ -150,11 +155,9 @@ else:
     st.warning("Best Params がまだありません。Run Session で判定を行ってください。")
     # 暫定（identity）表示
     params = GlobalParams()
-    img_out = render_image_with_global_params(img_in, params)
-    if use_frame:
-        img_out = compose_with_evaluation_frame(img_out)
+    out_path = render_final_image_file(img_in, params, cache_dir, use_frame=use_frame, source=img_source)
     # ファイル名を生成
     frame_suffix = "_with_frame" if use_frame else ""
     identity_filename = f"{input_filename}_identity{frame_suffix}"
     # PNG形式を保持したまま表示
-    display_image_png(img_out, caption="Output (Identity / No Params)", width="stretch", download_filename=identity_filename)
\ No newline at end of file
+    display_png_bytes(out_path.read_bytes(), caption="Output (Identity / No Params)", width="stretch", download_filename=identity_filename)
\ No newline at end of file
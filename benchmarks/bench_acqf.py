@@ -0,0 +1,108 @@
+# benchmarks/bench_acqf.py
+"""
+次の提案（EUBO の最適化）: 既定（num_restarts=10, raw_samples=128）vs fast モード
+
+合成セッション（bench_gp_fit.py と同じ作り方）で学習したモデルに対して、ラウンド数ごとに
+- default: propose_next_pair
+- fast: propose_next_pair_fast（ウォームスタートは、1ラウンド前のデータで学習したモデルに対する default の提案と事後平均最大の点）
+の時間と獲得関数値（fast / default の比）を表示する。
+
+使い方:
+    python benchmarks/bench_acqf.py --rounds 5,10,25,50 --seeds 3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import warnings
+
+import torch
+from botorch.acquisition.preference import AnalyticExpectedUtilityOfBestOption
+
+from printtune.core.botorch.pairwise_gp_fit import fit_pairwise_gp
+from printtune.core.botorch.propose_next import propose_next_pair, propose_next_pair_fast
+from printtune.core.optimizer.param_space_v1 import PARAM_KEYS_V1, default_globals_v1
+from printtune.core.policy import PROPOSAL_POLICY
+from printtune.core.policy_axes import schedule_for_round
+
+def _synthetic_session(n_rounds: int, seed: int = 0) -> tuple[torch.Tensor, torch.Tensor]:
+    g = torch.Generator().manual_seed(seed)
+    d = len(PARAM_KEYS_V1)
+    center = torch.tensor([default_globals_v1()[k] for k in PARAM_KEYS_V1], dtype=torch.float64)
+    target = center + 0.3 * torch.randn(d, generator=g, dtype=torch.float64)
+
+    def utility(x: torch.Tensor) -> float:
+        return float(-((x - target) ** 2).sum() + 0.05 * torch.randn(1, generator=g, dtype=torch.float64))
+
+    X: list[torch.Tensor] = []
+    comps: list[list[int]] = []
+    for r in range(n_rounds):
+        k = 4 if r == 0 else 2
+        base = len(X)
+        new = [center + 0.5 * torch.randn(d, generator=g, dtype=torch.float64) for _ in range(k)]
+        X.extend(new)
+        u = [utility(x) for x in new]
+        win = max(range(k), key=lambda i: u[i])
+        comps.extend([[base + win, base + j] for j in range(k) if j != win])
+    return torch.stack(X), torch.tensor(comps, dtype=torch.long)
+
+def _mask(active_keys) -> torch.Tensor:
+    active = set(active_keys)
+    return torch.tensor([k in active for k in PARAM_KEYS_V1], dtype=torch.bool)
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", default="5,10,25,50", help="カンマ区切りのラウンド数")
+    ap.add_argument("--seeds", type=int, default=3)
+    ap.add_argument("--json", default=None, help="結果を書き出すJSONパス")
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore")
+    policy = PROPOSAL_POLICY
+
+    rows = []
+    for r in [int(v) for v in args.rounds.split(",")]:
+        for seed in range(args.seeds):
+            X, comp = _synthetic_session(r, seed=seed)
+            model = fit_pairwise_gp(X, comp)
+            prev_model = fit_pairwise_gp(X[:-2], comp[:-1])
+            acqf = AnalyticExpectedUtilityOfBestOption(pref_model=model)
+            with torch.no_grad():
+                center = X[int(torch.argmax(model.posterior(X).mean.squeeze(-1)))].to(torch.float)
+            sched = schedule_for_round(min(r, 6))
+            kwargs = dict(center=center, active_mask=_mask(sched.active_keys), delta=sched.delta, micro_ratio=sched.micro_ratio, q=2)
+            previous_X = propose_next_pair(prev_model, **kwargs).X_next
+
+            t0 = time.perf_counter()
+            default = propose_next_pair(model, **kwargs)
+            t_default = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            fast = propose_next_pair_fast(
+                model, **kwargs, previous_X=previous_X,
+                min_restarts=policy.min_restarts, max_restarts=policy.max_restarts,
+                raw_samples=policy.raw_samples, timeout_sec=policy.timeout_sec,
+            )
+            t_fast = time.perf_counter() - t0
+
+            with torch.no_grad():
+                v_default = float(acqf(default.X_next.unsqueeze(0).to(X)))
+                v_fast = float(acqf(fast.X_next.unsqueeze(0).to(X)))
+            row = {
+                "rounds": r, "seed": seed, "n": X.shape[0],
+                "default_sec": t_default, "fast_sec": t_fast, "speedup": t_default / t_fast,
+                "default_acq": v_default, "fast_acq": v_fast, "acq_ratio": v_fast / v_default,
+                "fast_restarts": fast.num_restarts,
+            }
+            rows.append(row)
+            print(
+                f"rounds={r:3d} seed={seed}  default {t_default:6.3f}s acq {v_default:.4f} | "
+                f"fast {t_fast:6.3f}s acq {v_fast:.4f} (x{row['speedup']:4.1f}, acq ratio {row['acq_ratio']:.3f}, "
+                f"restarts {fast.num_restarts})"
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"policy": vars(policy), "results": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_gp_fit.py
+"""
+PairwiseGP の学習時間: コールドスタート vs ウォームスタート（前ラウンドのモデルから）
+
+合成セッション（Round1=4候補/3比較、以降は毎ラウンド2候補/1比較。隠れた効用関数で勝敗を決める）を作り、
+ラウンド数ごとに
+- cold: fit_pairwise_gp(X_r, comp_r)
+- warm: fit_pairwise_gp(X_r, comp_r, warm_start=<X_{r-1} で学習したモデル>)（ハイパーパラメータを数反復だけ再最適化）
+- condition: 同上で warm_start_maxiter=0（ハイパーパラメータは引き継ぎ、Laplace近似だけ計算し直す）
+の時間と、cold との事後平均（学習点上）の相関を表示する。
+
+使い方:
+    python benchmarks/bench_gp_fit.py --rounds 10,25,50,100,200
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import warnings
+
+import torch
+
+from printtune.core.botorch.pairwise_gp_fit import fit_pairwise_gp
+from printtune.core.optimizer.param_space_v1 import PARAM_KEYS_V1, default_globals_v1
+
+def _synthetic_session(n_rounds: int, seed: int = 0) -> tuple[torch.Tensor, torch.Tensor, list[tuple[int, int]]]:
+    """
+    Returns:
+        (X, comp, sizes): sizes[r] = ラウンド r+1 終了時点の (候補数, 比較数)。
+    """
+    g = torch.Generator().manual_seed(seed)
+    d = len(PARAM_KEYS_V1)
+    center = torch.tensor([default_globals_v1()[k] for k in PARAM_KEYS_V1], dtype=torch.float64)
+    target = center + 0.3 * torch.randn(d, generator=g, dtype=torch.float64)
+
+    def utility(x: torch.Tensor) -> float:
+        return float(-((x - target) ** 2).sum() + 0.05 * torch.randn(1, generator=g, dtype=torch.float64))
+
+    X: list[torch.Tensor] = []
+    comps: list[list[int]] = []
+    sizes: list[tuple[int, int]] = []
+    for r in range(n_rounds):
+        k = 4 if r == 0 else 2
+        base = len(X)
+        new = [center + 0.5 * torch.randn(d, generator=g, dtype=torch.float64) for _ in range(k)]
+        X.extend(new)
+        u = [utility(x) for x in new]
+        win = max(range(k), key=lambda i: u[i])
+        comps.extend([[base + win, base + j] for j in range(k) if j != win])
+        sizes.append((len(X), len(comps)))
+    return torch.stack(X), torch.tensor(comps, dtype=torch.long), sizes
+
+def _timed_fit(*args, **kwargs):
+    t0 = time.perf_counter()
+    model = fit_pairwise_gp(*args, **kwargs)
+    return model, time.perf_counter() - t0
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", default="10,25,50,100,200", help="カンマ区切りのラウンド数")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", default=None, help="結果を書き出すJSONパス")
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore")
+
+    rounds = [int(r) for r in args.rounds.split(",")]
+    X_all, comp_all, sizes = _synthetic_session(max(rounds), seed=args.seed)
+
+    rows = []
+    for r in rounds:
+        n_prev, m_prev = sizes[r - 2]
+        n, m = sizes[r - 1]
+        X, comp = X_all[:n], comp_all[:m]
+
+        prev = fit_pairwise_gp(X_all[:n_prev], comp_all[:m_prev])
+        cold, t_cold = _timed_fit(X, comp)
+        warm, t_warm = _timed_fit(X, comp, warm_start=prev)
+        cond, t_cond = _timed_fit(X, comp, warm_start=prev, warm_start_maxiter=0)
+
+        with torch.no_grad():
+            mu_cold = cold.posterior(X).mean.squeeze(-1)
+            mu = {name: mdl.posterior(X).mean.squeeze(-1) for name, mdl in (("warm", warm), ("condition", cond))}
+
+        row = {"rounds": r, "n": n, "m": m, "cold_sec": t_cold}
+        line = f"rounds={r:4d} n={n:4d} m={m:4d}  cold {t_cold:7.3f}s"
+        for name, sec in (("warm", t_warm), ("condition", t_cond)):
+            corr = float(torch.corrcoef(torch.stack([mu_cold, mu[name]]))[0, 1])
+            same_best = int(torch.argmax(mu_cold)) == int(torch.argmax(mu[name]))
+            row.update({
+                f"{name}_sec": sec, f"{name}_speedup": t_cold / sec,
+                f"{name}_posterior_mean_corr": corr, f"{name}_same_argmax": same_best,
+            })
+            line += f" | {name} {sec:7.3f}s x{t_cold / sec:5.1f} corr {corr:.4f} argmax={'=' if same_best else '!='}"
+        rows.append(row)
+        print(line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"seed": args.seed, "results": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
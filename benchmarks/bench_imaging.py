@@ -0,0 +1,183 @@
+# benchmarks/bench_imaging.py
+"""
+imaging パイプラインのベンチマーク（NumPy/Pillowのみ・オフラインで実行可能）
+
+各処理について、合成画像のサイズ（メガピクセル）ごとに
+- 処理時間（repeat回の最短）と MP/s
+- ピークメモリ: tracemalloc（Python/NumPyの確保量）と RSS（プロセスの最大常駐メモリの増分）
+を測ってJSONに書き出す。--baseline を渡すと同じケースの時間を比較し、
+threshold を超えて遅くなったケースがあれば終了コード1で終わる。
+
+使い方:
+    python benchmarks/bench_imaging.py --sizes 1,12,50 --json bench.json
+    python benchmarks/bench_imaging.py --sizes 1,12 --baseline bench.json --threshold 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from PIL import Image
+
+from printtune.core.imaging.colorspace import linear_f32_to_srgb_u8, srgb_u8_to_linear_f32
+from printtune.core.imaging.frame import compose_with_evaluation_frame
+from printtune.core.imaging.numpy_io import rgb_u8_to_pil
+from printtune.core.imaging.parametric_linear import (
+    GlobalParams,
+    apply_contrast_linear,
+    apply_exposure_linear,
+    apply_gamma_linear,
+    apply_global_params_linear,
+    apply_saturation_linear,
+    apply_temp_tint_linear_preserve_luma,
+)
+from printtune.core.imaging.pipeline import render_image_with_global_params
+from printtune.core.imaging.sheet_layout import SheetCell, render_sheet_2x2
+
+PARAMS = GlobalParams(exposure_stops=0.3, contrast=1.1, saturation=1.1, temp=2.0, tint=1.0, gamma=0.9)
+
+def _synthetic_image(megapixels: float, seed: int = 0) -> np.ndarray:
+    w = int((megapixels * 1e6 * 1.5) ** 0.5)
+    h = int(megapixels * 1e6 / w)
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+
+def _cases(rgb_u8: np.ndarray) -> dict[str, Callable[[], object]]:
+    lin = srgb_u8_to_linear_f32(rgb_u8)
+    img = rgb_u8_to_pil(rgb_u8)
+    cells = [SheetCell(slot=s, candidate_id=s, image=img) for s in "ABCD"]
+    cell_w, cell_h = max(400, img.width // 2), max(400, img.height // 2)
+    return {
+        "srgb_u8_to_linear_f32": lambda: srgb_u8_to_linear_f32(rgb_u8),
+        "linear_f32_to_srgb_u8": lambda: linear_f32_to_srgb_u8(lin),
+        "apply_exposure_linear": lambda: apply_exposure_linear(lin, PARAMS.exposure_stops),
+        "apply_contrast_linear": lambda: apply_contrast_linear(lin, PARAMS.contrast),
+        "apply_temp_tint_linear_preserve_luma": lambda: apply_temp_tint_linear_preserve_luma(lin, PARAMS.temp, PARAMS.tint),
+        "apply_saturation_linear": lambda: apply_saturation_linear(lin, PARAMS.saturation),
+        "apply_gamma_linear": lambda: apply_gamma_linear(lin, PARAMS.gamma),
+        "apply_global_params_linear": lambda: apply_global_params_linear(lin, PARAMS),
+        "render_image_with_global_params": lambda: render_image_with_global_params(img, PARAMS),
+        "compose_with_evaluation_frame": lambda: compose_with_evaluation_frame(img),
+        "render_sheet_2x2": lambda: render_sheet_2x2(cells, cell_w=cell_w, cell_h=cell_h),
+    }
+
+def _reset_peak_rss() -> bool:
+    # Linux: clear_refs に 5 を書くと VmHWM（最大RSS）がリセットされる
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _rss_kb(field: str) -> int | None:
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _peak_rss_delta_mb(fn: Callable[[], object]) -> float | None:
+    if _reset_peak_rss():
+        base = _rss_kb("VmRSS")
+        fn()
+        peak = _rss_kb("VmHWM")
+        if base is not None and peak is not None:
+            return max(0, peak - base) / 1024
+    # それ以外の環境では ru_maxrss（プロセス開始以来の最大値）の増分しか取れない
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    fn()
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # macOSはバイト単位
+    return (after - before) / scale
+
+def _measure(fn: Callable[[], object], repeat: int) -> dict[str, float | None]:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+
+    # メモリは時間計測と分けて測る（tracemalloc有効中は遅くなるため）
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"sec": best, "tracemalloc_peak_mb": peak / (1 << 20), "rss_peak_delta_mb": _peak_rss_delta_mb(fn)}
+
+def _compare(results: list[dict], baseline_path: Path, threshold: float) -> list[str]:
+    with baseline_path.open("r", encoding="utf-8") as f:
+        base = {(r["name"], r["megapixels"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        b = base.get((r["name"], r["megapixels"]))
+        if b is None:
+            continue
+        ratio = r["sec"] / b["sec"]
+        r["baseline_sec"] = b["sec"]
+        r["ratio"] = ratio
+        if ratio > 1.0 + threshold:
+            regressions.append(f"{r['name']} @ {r['megapixels']}MP: {b['sec']:.4f}s -> {r['sec']:.4f}s (x{ratio:.2f})")
+    return regressions
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1,12,50", help="カンマ区切りのメガピクセル数")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", default=None, help="ケース名に含まれる文字列で絞り込む（カンマ区切り）")
+    ap.add_argument("--json", type=Path, default=None, help="結果を書き出すJSONパス")
+    ap.add_argument("--baseline", type=Path, default=None, help="比較対象のJSON（以前の --json 出力）")
+    ap.add_argument("--threshold", type=float, default=0.2, help="許容する遅延の割合（0.2 = 20%%）")
+    args = ap.parse_args()
+
+    only = [s for s in args.only.split(",") if s] if args.only else None
+    results = []
+    for mp in [float(s) for s in args.sizes.split(",")]:
+        rgb_u8 = _synthetic_image(mp)
+        actual_mp = rgb_u8.shape[0] * rgb_u8.shape[1] / 1e6
+        for name, fn in _cases(rgb_u8).items():
+            if only and not any(s in name for s in only):
+                continue
+            m = _measure(fn, args.repeat)
+            row = {"name": name, "megapixels": mp, "mp_per_sec": actual_mp / m["sec"], **m}
+            results.append(row)
+            rss = "n/a" if m["rss_peak_delta_mb"] is None else f"{m['rss_peak_delta_mb']:8.1f}MB"
+            print(
+                f"{mp:5.1f}MP  {name:38s} {m['sec']:8.4f}s  {row['mp_per_sec']:8.1f} MP/s  "
+                f"tracemalloc {m['tracemalloc_peak_mb']:8.1f}MB  rss {rss}"
+            )
+        del rgb_u8
+
+    regressions = _compare(results, args.baseline, args.threshold) if args.baseline else []
+
+    if args.json:
+        meta = {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pillow": Image.__version__,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+        }
+        with args.json.open("w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+
+    if regressions:
+        print("performance regressions:", file=sys.stderr)
+        for line in regressions:
+            print("  " + line, file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_parallel_render.py
+"""
+並列描画のスケーリング計測（ワーカー数 vs 処理時間）
+
+- tiles: 1候補を行バンドでスレッド並列（render_rgb_u8_with_global_params, workers=N）
+- candidates: 4候補を render_candidates_rgb_u8 で描画（threads / processes）
+
+使い方:
+    python benchmarks/bench_parallel_render.py --mp 24 --workers 1,2,4,8,16,32
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from dataclasses import replace
+
+import numpy as np
+
+from printtune.core.imaging.parametric_linear import GlobalParams
+from printtune.core.imaging.pipeline import RenderConfig, render_rgb_u8_with_global_params
+from printtune.core.imaging.parallel import render_candidates_rgb_u8
+
+CANDIDATES = [
+    GlobalParams(),
+    GlobalParams(temp=3.0),
+    GlobalParams(tint=5.0),
+    GlobalParams(exposure_stops=-0.25, contrast=1.1, saturation=1.1, gamma=0.9),
+]
+
+def _synthetic_image(megapixels: float, seed: int = 0) -> np.ndarray:
+    w = int((megapixels * 1e6 * 1.5) ** 0.5)
+    h = int(megapixels * 1e6 / w)
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mp", type=float, default=12.0, help="入力画像のメガピクセル数")
+    ap.add_argument("--workers", default="1,2,4,8", help="カンマ区切りのワーカー数")
+    ap.add_argument("--engine", default="exact", choices=["exact", "fused", "lut3d"])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", default=None, help="結果を書き出すJSONパス")
+    args = ap.parse_args()
+
+    img = _synthetic_image(args.mp)
+    base = RenderConfig(engine=args.engine)
+    workers_list = [int(w) for w in args.workers.split(",")]
+
+    rows = []
+    for mode in ("tiles", "candidates_threads", "candidates_processes"):
+        t1 = None
+        for w in workers_list:
+            if mode == "tiles":
+                cfg = replace(base, workers=w)
+                fn = lambda: render_rgb_u8_with_global_params(img, CANDIDATES[-1], cfg)
+            else:
+                backend = "threads" if mode == "candidates_threads" else "processes"
+                cfg = replace(base, workers=w, parallel_backend=backend)
+                fn = lambda: render_candidates_rgb_u8(img, CANDIDATES, cfg)
+                fn()  # プロセスプールの起動を計測から外す
+            sec = _best_of(fn, args.repeat)
+            t1 = t1 or sec
+            rows.append({"mode": mode, "workers": w, "sec": sec, "speedup": t1 / sec})
+            print(f"{mode:22s} workers={w:3d}  {sec:8.3f}s  x{t1 / sec:5.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"megapixels": args.mp, "engine": args.engine, "results": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
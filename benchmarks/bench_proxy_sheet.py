@@ -0,0 +1,97 @@
+# benchmarks/bench_proxy_sheet.py
+"""
+ラウンドシート生成: 元解像度描画 vs プロキシ描画（use_proxy=True）の時間と差分
+
+差分は2枚のシート画像の ΔE76（sRGB→Lab）で測る。--max-mean-de / --max-p99-de を超えたら終了コード1。
+
+使い方:
+    python benchmarks/bench_proxy_sheet.py --mp 24
+    python benchmarks/bench_proxy_sheet.py --image path/to/photo.jpg
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from printtune.core.imaging.colorspace import delta_e76_srgb_u8
+from printtune.core.imaging.load import load_image_rgb
+from printtune.core.imaging.numpy_io import pil_to_rgb_u8, rgb_u8_to_pil
+from printtune.core.log_types import RoundRecord
+from printtune.core.session_runner import create_round1, new_session, render_round_sheet
+
+def _synthetic_photo(megapixels: float, seed: int = 0) -> Image.Image:
+    # 滑らかなグラデーション + 色ブロック + 弱いノイズ（写真に近い周波数構成）
+    w = int((megapixels * 1e6 * 1.5) ** 0.5)
+    h = int(megapixels * 1e6 / w)
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    img = np.empty((h, w, 3), dtype=np.float32)
+    img[..., 0] = 255 * xx / w
+    img[..., 1] = 255 * yy / h
+    img[..., 2] = 128 + 100 * np.sin(xx / 97.0) * np.cos(yy / 61.0)
+    del xx, yy
+    bs = max(1, w // 16)
+    blocks = rng.integers(0, 256, size=(h // bs + 1, w // bs + 1, 3)).astype(np.float32)
+    img = 0.6 * img + 0.4 * np.repeat(np.repeat(blocks, bs, axis=0), bs, axis=1)[:h, :w]
+    img += rng.normal(0.0, 4.0, size=(h, w, 1)).astype(np.float32)
+    return rgb_u8_to_pil(np.clip(img, 0, 255).astype(np.uint8))
+
+def _time_sheet(img: Image.Image, rr: RoundRecord, use_proxy: bool, out_dir: Path, repeat: int) -> tuple[float, Path]:
+    best = float("inf")
+    path = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        path = render_round_sheet(img, rr, out_dir=out_dir, use_proxy=use_proxy)
+        best = min(best, time.perf_counter() - t0)
+    return best, path
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mp", type=float, default=24.0, help="合成画像のメガピクセル数")
+    ap.add_argument("--image", type=Path, default=None, help="合成画像の代わりに使う写真")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--max-mean-de", type=float, default=1.0)
+    ap.add_argument("--max-p99-de", type=float, default=5.0)
+    ap.add_argument("--json", default=None, help="結果を書き出すJSONパス")
+    args = ap.parse_args()
+
+    img = load_image_rgb(args.image) if args.image else _synthetic_photo(args.mp)
+    # 同じラウンド（ラベルの candidate_id も同じ）で比べる
+    rr = create_round1(new_session("bench"))
+    with tempfile.TemporaryDirectory() as tmp:
+        t_full, p_full = _time_sheet(img, rr, False, Path(tmp) / "full", args.repeat)
+        t_proxy, p_proxy = _time_sheet(img, rr, True, Path(tmp) / "proxy", args.repeat)
+        a = pil_to_rgb_u8(Image.open(p_full))
+        b = pil_to_rgb_u8(Image.open(p_proxy))
+
+    de = delta_e76_srgb_u8(a, b)
+    result = {
+        "size": list(img.size),
+        "full_sec": t_full,
+        "proxy_sec": t_proxy,
+        "speedup": t_full / t_proxy,
+        "mean_delta_e": float(de.mean()),
+        "p99_delta_e": float(np.percentile(de, 99)),
+        "max_delta_e": float(de.max()),
+    }
+    print(
+        f"{img.width}x{img.height}: full {t_full:.2f}s  proxy {t_proxy:.2f}s  x{result['speedup']:.1f}  "
+        f"dE mean {result['mean_delta_e']:.3f} p99 {result['p99_delta_e']:.3f} max {result['max_delta_e']:.2f}"
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if result["mean_delta_e"] > args.max_mean_de or result["p99_delta_e"] > args.max_p99_de:
+        print("proxy sheet differs from full-resolution sheet beyond tolerance", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
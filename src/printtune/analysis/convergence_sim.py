@@ -0,0 +1,289 @@
+# src/printtune/analysis/convergence_sim.py
+"""
+最適化ループの収束シミュレータ（紙を使わずに SCHEDULE / delta / micro_ratio / 獲得関数の設定を比較する）
+
+1セッション = create_round1 → [判定 → make_next_round] を max_rounds 回。
+判定は合成オラクルが行う:
+- 隠れた目標 GlobalParams を乱数で決め、縮小した写真を目標パラメータで描画したものを「正解」とする
+- 各候補の描画と正解の平均 ΔE76 に正規ノイズ（noise_de）を足し、最小の候補を chosen にする
+判定ごとに estimate_best_params の結果を描画して正解との ΔE を測り、de_threshold 以下になった判定回数を記録する。
+
+セッションはワーカープロセスで並列に回す（GP の学習は各プロセスで1スレッド）。
+結果はJSONで書き出し、--baseline と比べて悪化していれば終了コード1（最適化まわりの変更のゲートに使う）。
+
+使い方:
+    python -m printtune.analysis.convergence_sim --sessions 200 --json conv.json
+    python -m printtune.analysis.convergence_sim --sessions 200 --baseline conv.json --threshold 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from functools import lru_cache
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+from ..core.botorch.model_cache import default_model_cache
+from ..core.botorch.update_loop import propose_from_session_for_round
+from ..core.imaging.colorspace import delta_e76_srgb_u8
+from ..core.imaging.globals_adapter import globals_dict_to_params
+from ..core.imaging.load import load_image_rgb
+from ..core.imaging.numpy_io import pil_to_rgb_u8
+from ..core.imaging.parametric_linear import GlobalParams
+from ..core.imaging.pipeline import render_rgb_u8_batch_with_global_params
+from ..core.imaging.proxy import downsample_rgb_u8_linear
+from ..core.io.paths import get_sample_image_path
+from ..core.log_types import SessionRecord
+from ..core.optimizer.best_selector import estimate_best_params
+from ..core.optimizer.bounds import default_bounds
+from ..core.optimizer.param_space_v1 import PARAM_KEYS_V1, default_globals_v1
+from ..core.policy import PREFERENCE_POLICY, PROPOSAL_POLICY, PreferenceBackend, PreferencePolicy, ProposalMode
+from ..core.session_loop import _phase_round_index_for_intent, make_next_round
+from ..core.session_runner import append_round, apply_judgment_chosen, create_round1, new_session
+
+@dataclass(frozen=True)
+class SimConfig:
+    sessions: int = 100
+    max_rounds: int = 10           # 判定回数の上限（Round1 を含む）
+    de_threshold: float = 2.0      # 収束とみなす ΔE76（best params の描画 vs 正解）
+    noise_de: float = 1.0          # オラクルの判定ノイズ（ΔE の標準偏差）
+    target_scale: float = 0.25     # 目標の散らばり（default_bounds に対する割合）
+    image_width: int = 96          # オラクルが描画する縮小画像の幅
+    image_path: str | None = None  # None なら data/input/sample.png（無ければ合成画像）
+    proposal_mode: ProposalMode = PROPOSAL_POLICY.mode
+    candidates_per_round: int = PROPOSAL_POLICY.candidates_per_round
+    preference_backend: PreferenceBackend = PREFERENCE_POLICY.backend
+    gp_min_comparisons: int = PREFERENCE_POLICY.gp_min_comparisons
+    stop_on_converge: bool = False # True なら収束した時点でそのセッションを打ち切る
+    seed: int = 0
+
+@dataclass(frozen=True)
+class SessionResult:
+    seed: int
+    target: dict[str, float]
+    rounds_to_threshold: int | None  # 収束までの判定回数（届かなければ None）
+    de_per_round: list[float]        # 判定ごとの best params の ΔE
+    round_sec: list[float]           # 判定ごとの所要時間（best 推定＋次ラウンドの提案）
+    fit_sec: list[float]             # 判定ごとの GP 学習時間
+    comparisons: int
+
+@lru_cache(maxsize=4)
+def _oracle_image(image_path: str | None, width: int) -> np.ndarray:
+    path = Path(image_path) if image_path else get_sample_image_path()
+    if path.exists():
+        rgb_u8 = pil_to_rgb_u8(load_image_rgb(path))
+    else:
+        # 合成画像（グラデーション＋色ブロック）
+        h0, w0 = 256, 384
+        yy, xx = np.mgrid[0:h0, 0:w0].astype(np.float32)
+        blocks = np.random.default_rng(0).integers(0, 256, size=(8, 12, 3)).astype(np.float32)
+        img = 0.5 * np.stack([255 * xx / w0, 255 * yy / h0, 128 + 100 * np.sin(xx / 23.0)], axis=-1)
+        img += 0.5 * np.repeat(np.repeat(blocks, 32, axis=0), 32, axis=1)
+        rgb_u8 = np.clip(img, 0, 255).astype(np.uint8)
+    h = max(1, round(rgb_u8.shape[0] * width / rgb_u8.shape[1]))
+    return downsample_rgb_u8_linear(rgb_u8, (width, h))
+
+def _random_target(rng: np.random.Generator, scale: float) -> dict[str, float]:
+    lim = default_bounds(len(PARAM_KEYS_V1))[1].numpy()
+    g = default_globals_v1()
+    return {k: float(g[k] + scale * lim[i] * rng.uniform(-1.0, 1.0)) for i, k in enumerate(PARAM_KEYS_V1)}
+
+class _Oracle:
+    def __init__(self, image_u8: np.ndarray, target: dict[str, float], noise_de: float, rng: np.random.Generator) -> None:
+        self.image_u8 = image_u8
+        self.target_u8 = render_rgb_u8_batch_with_global_params(image_u8, [globals_dict_to_params(target)])[0]
+        self.noise_de = float(noise_de)
+        self.rng = rng
+
+    def distances(self, params_list: list[GlobalParams]) -> list[float]:
+        rendered = render_rgb_u8_batch_with_global_params(self.image_u8, params_list)
+        return [float(delta_e76_srgb_u8(r, self.target_u8).mean()) for r in rendered]
+
+    def choose(self, session: SessionRecord) -> str:
+        cands = session.rounds[-1].candidates
+        d = self.distances([globals_dict_to_params(c.params["globals"]) for c in cands])
+        noisy = [v + self.noise_de * self.rng.standard_normal() for v in d]
+        return cands[int(np.argmin(noisy))].slot
+
+def simulate_session(cfg: SimConfig, seed: int) -> SessionResult:
+    """
+    1セッションを回す（ワーカープロセスから呼ばれる）。
+    """
+    rng = np.random.default_rng(seed)
+    target = _random_target(rng, cfg.target_scale)
+    oracle = _Oracle(_oracle_image(cfg.image_path, cfg.image_width), target, cfg.noise_de, rng)
+    policy = replace(PROPOSAL_POLICY, mode=cfg.proposal_mode, candidates_per_round=cfg.candidates_per_round)
+    preference = PreferencePolicy(backend=cfg.preference_backend, gp_min_comparisons=cfg.gp_min_comparisons)
+    stats = default_model_cache().stats
+
+    session = new_session(sample_image_relpath="simulation")
+    session = append_round(session, create_round1(session))
+
+    de_per_round: list[float] = []
+    round_sec: list[float] = []
+    fit_sec: list[float] = []
+    rounds_to_threshold = None
+    for r in range(1, cfg.max_rounds + 1):
+        slot = oracle.choose(session)
+        t0 = time.perf_counter()
+        fit0 = stats.fit_seconds
+        session = apply_judgment_chosen(session, round_index=len(session.rounds), chosen_slot=slot)
+        best = estimate_best_params(session, preference=preference)
+        if r < cfg.max_rounds:
+            phase = _phase_round_index_for_intent(session, "pairwise_explore")
+            proposal = propose_from_session_for_round(session, phase, policy=policy, preference=preference)
+            session = make_next_round(session, "pairwise_explore", proposal=proposal)
+        round_sec.append(time.perf_counter() - t0)
+        fit_sec.append(stats.fit_seconds - fit0)
+
+        de = oracle.distances([globals_dict_to_params(best)])[0]
+        de_per_round.append(de)
+        if rounds_to_threshold is None and de <= cfg.de_threshold:
+            rounds_to_threshold = r
+            if cfg.stop_on_converge:
+                break
+
+    return SessionResult(
+        seed=seed,
+        target=target,
+        rounds_to_threshold=rounds_to_threshold,
+        de_per_round=de_per_round,
+        round_sec=round_sec,
+        fit_sec=fit_sec,
+        comparisons=len(session.comparisons_global),
+    )
+
+def _init_worker() -> None:
+    import torch
+
+    torch.set_num_threads(1)
+    warnings.filterwarnings("ignore")
+    # シミュレーションのセッションはディスクに残さない
+    default_model_cache().persist = False
+
+def _percentile(values: list[float], q: float) -> float | None:
+    return float(np.percentile(values, q)) if values else None
+
+def summarize(cfg: SimConfig, results: list[SessionResult]) -> dict:
+    """
+    Returns:
+        集計。rounds_median / rounds_p90 は収束しなかったセッションを max_rounds + 1 として数える。
+    """
+    censored = [r.rounds_to_threshold or cfg.max_rounds + 1 for r in results]
+    converged = [r.rounds_to_threshold for r in results if r.rounds_to_threshold is not None]
+    round_sec = [v for r in results for v in r.round_sec]
+    fit_sec = [v for r in results for v in r.fit_sec]
+    return {
+        "sessions": len(results),
+        "converged_rate": len(converged) / len(results) if results else 0.0,
+        "rounds_median": float(statistics.median(censored)) if censored else None,
+        "rounds_p90": _percentile(censored, 90),
+        "rounds_mean_converged": statistics.fmean(converged) if converged else None,
+        "final_de_mean": statistics.fmean(r.de_per_round[-1] for r in results) if results else None,
+        "round_sec_mean": statistics.fmean(round_sec) if round_sec else None,
+        "round_sec_p90": _percentile(round_sec, 90),
+        "fit_sec_mean": statistics.fmean(fit_sec) if fit_sec else None,
+    }
+
+def run_simulation(cfg: SimConfig, workers: int | None = None) -> dict:
+    """
+    Args:
+        cfg: 設定。
+        workers: ワーカープロセス数（None なら CPU コア数、1 以下ならこのプロセスで逐次）。
+
+    Returns:
+        {"config", "summary", "sessions"} の辞書（JSONにそのまま書ける）。
+    """
+    seeds = [cfg.seed * 1_000_003 + i for i in range(cfg.sessions)]
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    t0 = time.perf_counter()
+    if workers <= 1:
+        _init_worker()
+        results = [simulate_session(cfg, s) for s in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"), initializer=_init_worker) as ex:
+            results = list(ex.map(simulate_session, [cfg] * len(seeds), seeds))
+    summary = summarize(cfg, results)
+    summary["wall_sec"] = time.perf_counter() - t0
+    return {"config": asdict(cfg), "summary": summary, "sessions": [asdict(r) for r in results]}
+
+def compare_to_baseline(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    収束までの判定回数（中央値・p90）が threshold の割合を超えて増えた、
+    または収束率が threshold を超えて下がった場合に、その内容を返す。
+    """
+    cur, base = report["summary"], baseline["summary"]
+    regressions = []
+    for key in ("rounds_median", "rounds_p90"):
+        if cur.get(key) is not None and base.get(key):
+            ratio = cur[key] / base[key]
+            if ratio > 1.0 + threshold:
+                regressions.append(f"{key}: {base[key]:.2f} -> {cur[key]:.2f} (x{ratio:.2f})")
+    if cur["converged_rate"] < base["converged_rate"] - threshold:
+        regressions.append(f"converged_rate: {base['converged_rate']:.2f} -> {cur['converged_rate']:.2f}")
+    return regressions
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=SimConfig.sessions)
+    ap.add_argument("--max-rounds", type=int, default=SimConfig.max_rounds)
+    ap.add_argument("--de-threshold", type=float, default=SimConfig.de_threshold)
+    ap.add_argument("--noise-de", type=float, default=SimConfig.noise_de)
+    ap.add_argument("--image", default=None, help="オラクルに使う写真（既定は data/input/sample.png）")
+    ap.add_argument("--image-width", type=int, default=SimConfig.image_width)
+    ap.add_argument("--proposal-mode", choices=["default", "fast"], default=SimConfig.proposal_mode)
+    ap.add_argument("--candidates-per-round", type=int, default=SimConfig.candidates_per_round)
+    ap.add_argument("--preference-backend", choices=["gp", "bradley_terry", "auto"], default=SimConfig.preference_backend)
+    ap.add_argument("--gp-min-comparisons", type=int, default=SimConfig.gp_min_comparisons)
+    ap.add_argument("--stop-on-converge", action="store_true")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None, help="ワーカープロセス数（既定はCPUコア数）")
+    ap.add_argument("--json", type=Path, default=None, help="結果を書き出すJSONパス")
+    ap.add_argument("--baseline", type=Path, default=None, help="比較対象のJSON（以前の --json 出力）")
+    ap.add_argument("--threshold", type=float, default=0.2, help="許容する悪化の割合")
+    args = ap.parse_args()
+
+    cfg = SimConfig(
+        sessions=args.sessions,
+        max_rounds=args.max_rounds,
+        de_threshold=args.de_threshold,
+        noise_de=args.noise_de,
+        image_width=args.image_width,
+        image_path=args.image,
+        proposal_mode=args.proposal_mode,
+        candidates_per_round=args.candidates_per_round,
+        preference_backend=args.preference_backend,
+        gp_min_comparisons=args.gp_min_comparisons,
+        stop_on_converge=args.stop_on_converge,
+        seed=args.seed,
+    )
+    report = run_simulation(cfg, workers=args.workers)
+    print(json.dumps(report["summary"], indent=2))
+
+    regressions = []
+    if args.baseline:
+        with args.baseline.open("r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(report, json.load(f), args.threshold)
+        report["regressions"] = regressions
+
+    if args.json:
+        with args.json.open("w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        print("convergence regressions:", file=sys.stderr)
+        for line in regressions:
+            print("  " + line, file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,14 @@ import torch
 
 from ..log_types import SessionRecord
 from ..optimizer.params_space import factors_to_x, PARAM_KEYS
-from ..optimizer.param_space_v1 import PARAM_KEYS_V1
+from ..session_index import DEDUPE_DECIMALS, session_index
 
 @dataclass(frozen=True)
 class TorchPreferenceData:
     train_X: torch.Tensor        # (n, d)
     train_comp: torch.LongTensor # (m, 2)
     candidate_ids: list[str]     # index -> candidate_id
+    raw_to_unique: list[int] | None = None  # 全候補の通し番号（comparisons_global の添字） -> train_X の行
 
 def build_torch_data_old(session: SessionRecord) -> TorchPreferenceData:
     # 1) 候補を時系列にフラット化（将来: roundを跨いで増える想定）
@@ -41,20 +42,33 @@ def build_torch_data_old(session: SessionRecord) -> TorchPreferenceData:
 
     return TorchPreferenceData(train_X=train_X, train_comp=train_comp, candidate_ids=candidate_ids)
 
-def build_torch_data(session: SessionRecord) -> TorchPreferenceData:
-    candidate_ids: list[str] = []
-    X_list: list[list[float]] = []
+def build_torch_data(session: SessionRecord, dedupe: bool = True) -> TorchPreferenceData:
+    """
+    Args:
+        session: セッション。
+        dedupe: True なら同じ（DEDUPE_DECIMALS 桁で丸めて一致する）パラメータの候補を1行にまとめ、
+            comparisons_global のインデックスを付け替える。再判定ラウンドは同じ X を別の候補IDで出すため、
+            まとめないと GP の点数がラウンド数に比例して増える。同じ点どうしの比較と、既出と同じ
+            (winner, loser) の組は落とす（初出を残すので、比較が増えても先頭部分は変わらない）。
 
-    for rr in session.rounds:
-        for c in rr.candidates:
-            candidate_ids.append(c.candidate_id)
-            g = c.params["globals"]
-            X_list.append([float(g[k]) for k in PARAM_KEYS_V1])
+    Returns:
+        TorchPreferenceData。dedupe 時の candidate_ids は各行の初出の候補ID。
 
-    comps = session.comparisons_global
-    if len(X_list) == 0 or len(comps) == 0:
+    Raises:
+        ValueError: 候補または（まとめた後の）比較が無い。
+
+    Note:
+        行と比較は session_index が判定・ラウンド追加のたびに追記している配列から作る（全ラウンドをなめ直さない）。
+    """
+    arrays = session_index(session).preference_arrays(dedupe=dedupe)
+    if arrays.X.shape[0] == 0 or arrays.comparisons.shape[0] == 0:
         raise ValueError("Need at least 1 candidate and 1 comparison.")
 
-    train_X = torch.tensor(X_list, dtype=torch.float)
-    train_comp = torch.tensor(comps, dtype=torch.long)
-    return TorchPreferenceData(train_X=train_X, train_comp=train_comp, candidate_ids=candidate_ids)
\ No newline at end of file
+    train_X = torch.tensor(arrays.X, dtype=torch.float)
+    train_comp = torch.tensor(arrays.comparisons, dtype=torch.long)
+    return TorchPreferenceData(
+        train_X=train_X,
+        train_comp=train_comp,
+        candidate_ids=list(arrays.candidate_ids),
+        raw_to_unique=list(arrays.raw_to_unique),
+    )
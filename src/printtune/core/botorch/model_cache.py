@@ -0,0 +1,324 @@
+# src/printtune/core/botorch/model_cache.py
+"""
+学習済み PairwiseGP のキャッシュ
+
+1回の判定で「提案（propose_from_session_for_round）」「中心の推定（_center_tensor_from_session）」
+「best_params.json の更新（estimate_best_params）」が同じデータで GP を学習していたため、
+train_X / train_comp のフィンガープリントをキーに学習済みモデルを共有する。
+
+- 末尾の「どの比較にも出てこない候補」（判定前の新ラウンド）は学習に影響しないものとして除いてからキーを作る
+  （提案時と、新ラウンド追加後の best_params 更新時で同じモデルを使えるようにするため）
+- 事後平均などの評価は呼び出し側で元の train_X 全体に対して行ってよい
+- キャッシュに無いデータでも、その先頭部分で学習済みのモデル（前ラウンド）があればウォームスタートで学習する
+  （前回のハイパーパラメータ最適化から増えた比較が REFIT_EVERY_COMPARISONS 未満なら、
+   ハイパーパラメータは引き継いだまま新しい比較で条件付けするだけにする）
+- state_path を渡すと、学習したモデルの状態をセッションの隣（gp_state.pt）に保存し、
+  プロセスを再起動した後のキャッシュミスではそこから復元する
+  （フィンガープリントが一致すれば学習せずにそのまま使い、先頭部分が一致すればウォームスタートに使う）
+- 先読みのように捨てるかもしれない分岐は state_path なしで学習し、使うと決まってから save_state で保存する
+  （gp_state.pt には実際に判定されたデータのモデルだけを置く）
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import torch
+from botorch.models.pairwise_gp import PairwiseGP
+from botorch.models.transforms import Normalize
+
+from ..io.gp_state_store import GPState, load_gp_state, save_gp_state
+from .pairwise_gp_fit import WARM_START_MAXITER, fit_pairwise_gp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MODELS = 8
+# ハイパーパラメータを再最適化するまでに許す比較の増分
+REFIT_EVERY_COMPARISONS = 8
+
+@dataclass
+class ModelCacheStats:
+    hits: int = 0
+    misses: int = 0
+    warm_starts: int = 0
+    restores: int = 0
+    fit_seconds: float = 0.0  # 学習（キャッシュミス時）にかかった時間の合計
+
+    @property
+    def fits(self) -> int:
+        return self.misses
+
+def trim_unreferenced_tail(train_X: torch.Tensor, train_comp: torch.LongTensor) -> torch.Tensor:
+    """
+    比較で参照される最大インデックスより後ろの行を除いた train_X を返す。
+    """
+    if train_comp.numel() == 0:
+        return train_X
+    n_used = int(train_comp.max().item()) + 1
+    return train_X[:n_used]
+
+def data_fingerprint(train_X: torch.Tensor, train_comp: torch.LongTensor) -> str:
+    """
+    学習データ（float64 に揃えた train_X と train_comp）のダイジェスト。
+    """
+    X = train_X.detach().to(dtype=torch.float64, device="cpu").contiguous()
+    C = train_comp.detach().to(dtype=torch.long, device="cpu").contiguous()
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((tuple(X.shape), tuple(C.shape))).encode("ascii"))
+    h.update(X.numpy().tobytes())
+    h.update(C.numpy().tobytes())
+    return h.hexdigest()
+
+def _is_prefix(X_prev: torch.Tensor, comp_prev: torch.Tensor, X: torch.Tensor, comp: torch.Tensor) -> bool:
+    # (X_prev, comp_prev) が (X, comp) の真の先頭部分か
+    n, m = X_prev.shape[0], comp_prev.shape[0]
+    return (
+        n <= X.shape[0] and m <= comp.shape[0] and (n, m) != (X.shape[0], comp.shape[0])
+        and X_prev.shape[1:] == X.shape[1:]
+        and torch.equal(X_prev, X[:n]) and torch.equal(comp_prev, comp[:m])
+    )
+
+def gp_state_from_model(model: PairwiseGP, train_X: torch.Tensor, train_comp: torch.Tensor, m_tuned: int) -> GPState:
+    return GPState(
+        fingerprint=data_fingerprint(train_X, train_comp),
+        train_X=train_X.detach().to(dtype=torch.float64, device="cpu"),
+        train_comp=train_comp.detach().to(dtype=torch.long, device="cpu"),
+        m_tuned=int(m_tuned),
+        model_state=dict(model.state_dict()),
+        utility=model.utility.detach().to(device="cpu"),
+    )
+
+def model_from_gp_state(state: GPState) -> PairwiseGP:
+    """
+    保存した状態からモデルを組み立て直す（ハイパーパラメータの最適化はしない）。
+    Laplace近似は保存したMAP効用から始めるので、数反復で収束する。
+    """
+    X = state.train_X.to(dtype=torch.float64)
+    model = PairwiseGP(X, state.train_comp, input_transform=Normalize(d=X.shape[-1]))
+    model._x0 = state.utility.detach().cpu().numpy().astype("float64")
+    # load_state_dict はデータ由来のバッファを除いてカーネルを読み込み、Laplace近似を計算し直す
+    model.load_state_dict(state.model_state)
+    model.eval()
+    return model
+
+class PairwiseGPCache:
+    """
+    フィンガープリント → 学習済みモデルのLRU。スレッドセーフ（同じキーの学習は1回だけ走り、別のキーの学習は並行して走る）。
+    """
+    def __init__(self, max_models: int = DEFAULT_MAX_MODELS) -> None:
+        self.max_models = int(max_models)
+        self.stats = ModelCacheStats()
+        self.warm_start = True
+        # False なら state_path を渡されても保存・復元しない（シミュレーションなど）
+        self.persist = True
+        # key -> (model, 学習に使った train_X(float64), train_comp, ハイパーパラメータ最適化時の比較数)
+        self._models: OrderedDict[str, tuple[PairwiseGP, torch.Tensor, torch.Tensor, int]] = OrderedDict()
+        # 辞書と統計だけを守るロック（学習中は保持しない）
+        self._lock = threading.Lock()
+        # key -> (学習中のキーのロック, 待っているスレッド数)
+        self._key_locks: dict[str, tuple[threading.Lock, int]] = {}
+
+    def get(self, key: str) -> PairwiseGP | None:
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is None:
+                return None
+            self._models.move_to_end(key)
+            return entry[0]
+
+    def _find_warm_start(self, X: torch.Tensor, comp: torch.Tensor) -> tuple[PairwiseGP, int] | None:
+        # self._lock 保持中に呼ぶ。学習データが今回のデータの先頭部分になっているモデルのうち、最も新しいもの
+        for model, X_prev, comp_prev, m_tuned in reversed(self._models.values()):
+            if _is_prefix(X_prev, comp_prev, X, comp):
+                return model, m_tuned
+        return None
+
+    def _restore(self, state_path: Path, key: str, X: torch.Tensor, comp: torch.Tensor) -> PairwiseGP | None:
+        """
+        保存済みの状態を読み、今回のデータと同じか先頭部分ならキャッシュに入れる（key のロック保持中に呼ぶ）。
+
+        Returns:
+            フィンガープリントが一致したときはそのモデル。それ以外は None。
+        """
+        state = load_gp_state(state_path)
+        if state is None:
+            return None
+        with self._lock:
+            if state.fingerprint in self._models:
+                return None
+        if state.fingerprint != key and not _is_prefix(state.train_X, state.train_comp, X, comp):
+            return None
+        try:
+            model = model_from_gp_state(state)
+        except (RuntimeError, ValueError, KeyError) as e:
+            logger.warning("failed to restore PairwiseGP state from %s: %s", state_path, e)
+            return None
+        logger.debug("PairwiseGP restored %s from %s", state.fingerprint[:8], state_path)
+        with self._lock:
+            self.stats.restores += 1
+            self._insert(state.fingerprint, (model, state.train_X, state.train_comp, state.m_tuned))
+        return model if state.fingerprint == key else None
+
+    def _save(self, state_path: Path, model: PairwiseGP, X: torch.Tensor, comp: torch.Tensor, m_tuned: int) -> None:
+        try:
+            save_gp_state(state_path, gp_state_from_model(model, X, comp, m_tuned))
+        except OSError as e:
+            # 保存できなくても次回の学習が遅くなるだけなので続行する
+            logger.warning("failed to save PairwiseGP state to %s: %s", state_path, e)
+
+    def _insert(self, key: str, entry: tuple[PairwiseGP, torch.Tensor, torch.Tensor, int]) -> None:
+        # self._lock 保持中に呼ぶ
+        self._models[key] = entry
+        self._models.move_to_end(key)
+        while len(self._models) > self.max_models:
+            self._models.popitem(last=False)
+
+    def _acquire_key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock, users = self._key_locks.get(key, (None, 0))
+            if lock is None:
+                lock = threading.Lock()
+            self._key_locks[key] = (lock, users + 1)
+        lock.acquire()
+        return lock
+
+    def _release_key_lock(self, key: str, lock: threading.Lock) -> None:
+        lock.release()
+        with self._lock:
+            _, users = self._key_locks[key]
+            if users <= 1:
+                del self._key_locks[key]
+            else:
+                self._key_locks[key] = (lock, users - 1)
+
+    def get_or_fit(
+        self,
+        train_X: torch.Tensor,
+        train_comp: torch.LongTensor,
+        state_path: Path | None = None,
+    ) -> PairwiseGP:
+        """
+        Args:
+            train_X: (n, d) 全候補（末尾の未比較の行を含んでよい）。
+            train_comp: (m, 2) 比較。
+            state_path: 学習済み状態の保存先（io.paths.gp_state_path）。None なら保存・復元しない。
+
+        Returns:
+            学習済みモデル（キャッシュと共有。学習し直さないこと）。
+        """
+        if not self.persist:
+            state_path = None
+        X_fit = trim_unreferenced_tail(train_X, train_comp)
+        key = data_fingerprint(X_fit, train_comp)
+        model = self.get(key)
+        if model is not None:
+            with self._lock:
+                self.stats.hits += 1
+            logger.debug("PairwiseGP cache hit %s (n=%d, m=%d)", key[:8], X_fit.shape[0], train_comp.shape[0])
+            return model
+
+        # 同じデータの学習は1回だけ走らせる（キーごとのロック）。全体のロックは辞書の操作の間だけ持つので、
+        # 別のセッション・別のデータ（先読みと手前の推定など）の学習は並行して進む
+        key_lock = self._acquire_key_lock(key)
+        try:
+            model = self.get(key)
+            if model is not None:
+                with self._lock:
+                    self.stats.hits += 1
+                return model
+
+            X64 = X_fit.detach().to(dtype=torch.float64, device="cpu")
+            comp = train_comp.detach().to(dtype=torch.long, device="cpu")
+            if state_path is not None:
+                restored = self._restore(state_path, key, X64, comp)
+                if restored is not None:
+                    return restored
+
+            t0 = time.perf_counter()
+            with self._lock:
+                self.stats.misses += 1
+                found = self._find_warm_start(X64, comp) if self.warm_start else None
+            m = comp.shape[0]
+            if found is None:
+                model = fit_pairwise_gp(X_fit, train_comp)
+                m_tuned = m
+            else:
+                warm, m_tuned = found
+                if m - m_tuned >= REFIT_EVERY_COMPARISONS:
+                    model = fit_pairwise_gp(X_fit, train_comp, warm_start=warm, warm_start_maxiter=WARM_START_MAXITER)
+                    m_tuned = m
+                else:
+                    model = fit_pairwise_gp(X_fit, train_comp, warm_start=warm, warm_start_maxiter=0)
+            elapsed = time.perf_counter() - t0
+            logger.debug(
+                "PairwiseGP cache miss %s (n=%d, m=%d, warm=%s, hyperparams tuned at m=%d)",
+                key[:8], X_fit.shape[0], m, found is not None, m_tuned,
+            )
+            with self._lock:
+                self.stats.fit_seconds += elapsed
+                if found is not None:
+                    self.stats.warm_starts += 1
+                self._insert(key, (model, X64, comp, m_tuned))
+            if state_path is not None:
+                self._save(state_path, model, X64, comp, m_tuned)
+            return model
+        finally:
+            self._release_key_lock(key, key_lock)
+
+    def save_state(self, train_X: torch.Tensor, train_comp: torch.LongTensor, state_path: Path) -> bool:
+        """
+        (train_X, train_comp) で学習済みのモデルがキャッシュにあれば state_path に保存する
+        （保存せずに学習したモデル（先読み）を、使うと決まってから保存するため）。
+
+        Returns:
+            保存したか（キャッシュに無い・persist が False なら False）。
+        """
+        if not self.persist:
+            return False
+        X_fit = trim_unreferenced_tail(train_X, train_comp)
+        key = data_fingerprint(X_fit, train_comp)
+        with self._lock:
+            entry = self._models.get(key)
+        if entry is None:
+            return False
+        model, X64, comp, m_tuned = entry
+        self._save(state_path, model, X64, comp, m_tuned)
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self.stats = ModelCacheStats()
+
+_DEFAULT_CACHE = PairwiseGPCache()
+
+def default_model_cache() -> PairwiseGPCache:
+    return _DEFAULT_CACHE
+
+def get_or_fit_pairwise_gp(
+    train_X: torch.Tensor,
+    train_comp: torch.LongTensor,
+    cache: PairwiseGPCache | None = None,
+    state_path: Path | None = None,
+) -> PairwiseGP:
+    """
+    fit_pairwise_gp のキャッシュ付き版（既定はプロセス共有のキャッシュ）。
+    state_path を渡すと学習済み状態をディスクにも保存・復元する。
+    """
+    return (_DEFAULT_CACHE if cache is None else cache).get_or_fit(train_X, train_comp, state_path=state_path)
+
+def save_pairwise_gp_state(
+    train_X: torch.Tensor,
+    train_comp: torch.LongTensor,
+    state_path: Path,
+    cache: PairwiseGPCache | None = None,
+) -> bool:
+    """
+    PairwiseGPCache.save_state の既定キャッシュ版。
+    """
+    return (_DEFAULT_CACHE if cache is None else cache).save_state(train_X, train_comp, state_path)
@@ -1,17 +1,60 @@
 # src/printtune/core/botorch/pairwise_gp_fit.py
 from __future__ import annotations
 
+import copy
+
 import torch
 from botorch.models import PairwiseGP
 from botorch.fit import fit_gpytorch_mll
 from botorch.models.transforms import Normalize
 from botorch.models.pairwise_gp import PairwiseGP, PairwiseLaplaceMarginalLogLikelihood
 
-def fit_pairwise_gp(train_X: torch.Tensor, train_comp: torch.LongTensor) -> PairwiseGP:
+# ウォームスタート時のハイパーパラメータ最適化（L-BFGS-B）の反復上限
+WARM_START_MAXITER = 25
+
+def fit_pairwise_gp(
+    train_X: torch.Tensor,
+    train_comp: torch.LongTensor,
+    warm_start: PairwiseGP | None = None,
+    warm_start_maxiter: int = WARM_START_MAXITER,
+) -> PairwiseGP:
+    """
+    Args:
+        train_X: (n, d) 候補。
+        train_comp: (m, 2) 比較（winner, loser）。
+        warm_start: 前ラウンドの学習済みモデル。渡すとハイパーパラメータ（カーネル）を引き継ぎ、
+            Laplace近似のMAP探索も前モデルの事後平均から始めるので、最適化は数反復で収束する。
+        warm_start_maxiter: ウォームスタート時の最適化反復上限。0 ならハイパーパラメータは最適化せず、
+            引き継いだ値のまま新しい比較でLaplace近似だけを計算し直す（条件付けのみ。最も速い）。
+
+    Returns:
+        学習済みモデル。
+    """
     # BoTorch requires double precision (float64) for numerical stability
     train_X = train_X.to(dtype=torch.float64)
     d = train_X.shape[-1]
-    model = PairwiseGP(train_X, train_comp, input_transform=Normalize(d=d))
+
+    if warm_start is None:
+        model = PairwiseGP(train_X, train_comp, input_transform=Normalize(d=d))
+        mll = PairwiseLaplaceMarginalLogLikelihood(model.likelihood, model)
+        fit_gpytorch_mll(mll)
+        return model
+
+    model = PairwiseGP(
+        train_X,
+        train_comp,
+        covar_module=copy.deepcopy(warm_start.covar_module),
+        input_transform=Normalize(d=d),
+    )
+    if warm_start_maxiter <= 0:
+        model.eval()
+        return model
+
+    # 効用（MAP）の初期値: 前モデルの事後平均（候補の並びが変わっても位置で対応づく）
+    with torch.no_grad():
+        x0 = warm_start.posterior(model.datapoints).mean.squeeze(-1)
+    model._x0 = x0.detach().cpu().numpy().astype("float64")
+
     mll = PairwiseLaplaceMarginalLogLikelihood(model.likelihood, model)
-    fit_gpytorch_mll(mll)
+    fit_gpytorch_mll(mll, optimizer_kwargs={"options": {"maxiter": int(warm_start_maxiter)}})
     return model
@@ -0,0 +1,154 @@
+# src/printtune/core/botorch/posterior_best.py
+"""
+事後平均の最大点を連続空間で探す
+
+観測済み候補の argmax だと中心が離散的な点の間を飛ぶので、
+1. 探索範囲（既定は Identity + optimizer.bounds.default_bounds と観測点の範囲を合わせた箱）の
+   Sobol 点をまとめて1回の posterior() で評価し
+2. 上位 n_refine 点から事後平均の勾配で決まった回数（steps）だけ登る（Adam）
+
+結果は学習データのフィンガープリント（model_cache.data_fingerprint）と探索範囲をキーにキャッシュする。
+レイテンシの予算はステップ数で決める（既定の 50 ステップで初回 200ms 程度）。
+best_params.json に保存される値なので、同じデータなら CPU の負荷によらず同じ結果になるよう、
+既定では時間で打ち切らない（time_budget_sec は対話的な用途向けの opt-in）。
+観測点の最良を下回る結果にはしない（そのときは観測点を返す）。
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Literal
+
+import torch
+from botorch.models.pairwise_gp import PairwiseGP
+
+from ..optimizer.bounds import default_bounds
+from ..optimizer.param_space_v1 import PARAM_KEYS_V1, default_globals_v1
+from .model_cache import data_fingerprint
+
+DEFAULT_N_SAMPLES = 1024
+DEFAULT_N_REFINE = 4
+DEFAULT_STEPS = 50
+_MAX_CACHED = 32
+
+@dataclass(frozen=True)
+class PosteriorBest:
+    x: torch.Tensor  # (d,) float64
+    mean: float      # x での事後平均
+    source: Literal["refined", "observed"]
+    steps: int       # 実行した勾配ステップ数
+
+def search_bounds(train_X: torch.Tensor) -> torch.Tensor:
+    """
+    Identity + default_bounds と、観測点の範囲を合わせた箱（(2, d) float64）。
+    """
+    X = train_X.detach().to(dtype=torch.float64, device="cpu")
+    d = X.shape[-1]
+    b = default_bounds(d).to(torch.float64)
+    if d == len(PARAM_KEYS_V1):
+        g = default_globals_v1()
+        b = b + torch.tensor([g[k] for k in PARAM_KEYS_V1], dtype=torch.float64)
+    lo = torch.minimum(b[0], X.min(dim=0).values)
+    hi = torch.maximum(b[1], X.max(dim=0).values)
+    return torch.stack([lo, hi])
+
+def _posterior_mean(model: PairwiseGP, X: torch.Tensor) -> torch.Tensor:
+    return model.posterior(X).mean.squeeze(-1)
+
+def maximize_posterior_mean(
+    model: PairwiseGP,
+    train_X: torch.Tensor,
+    bounds: torch.Tensor | None = None,
+    n_samples: int = DEFAULT_N_SAMPLES,
+    n_refine: int = DEFAULT_N_REFINE,
+    steps: int = DEFAULT_STEPS,
+    lr: float = 0.02,
+    time_budget_sec: float | None = None,
+    seed: int = 0,
+) -> PosteriorBest:
+    """
+    Args:
+        model: 学習済みモデル。
+        train_X: (n, d) 観測済み候補（初期点と下限の保証に使う）。
+        bounds: (2, d) 探索範囲。None なら search_bounds(train_X)。
+        n_samples: Sobol 点の数。
+        n_refine: 勾配で登る点の数（Sobol と観測点を合わせた上位）。
+        steps: 勾配ステップ数。
+        lr: Adam の学習率（[0, 1] に正規化した座標で）。
+        time_budget_sec: 全体の時間予算。None（既定）なら打ち切らない（結果が負荷に依存しないように）。
+        seed: Sobol の seed（同じ入力なら同じ結果にする）。
+
+    Returns:
+        PosteriorBest。
+    """
+    t0 = time.perf_counter()
+    X_obs = train_X.detach().to(dtype=torch.float64, device="cpu")
+    bounds = search_bounds(X_obs) if bounds is None else bounds.to(torch.float64)
+    lo, span = bounds[0], (bounds[1] - bounds[0]).clamp_min(1e-12)
+
+    with torch.no_grad():
+        mean_obs = _posterior_mean(model, X_obs)
+        i_obs = int(torch.argmax(mean_obs))
+        observed = (X_obs[i_obs].clone(), float(mean_obs[i_obs]))
+
+        sobol = torch.quasirandom.SobolEngine(X_obs.shape[-1], scramble=True, seed=seed)
+        U = sobol.draw(n_samples, dtype=torch.float64)
+        U = torch.cat([U, ((X_obs - lo) / span).clamp(0.0, 1.0)])
+        mean_U = _posterior_mean(model, lo + span * U)
+    top = torch.argsort(mean_U, descending=True)[:n_refine]
+
+    u = U[top].clone().requires_grad_(True)
+    opt = torch.optim.Adam([u], lr=lr)
+    taken = 0
+    for _ in range(steps):
+        if time_budget_sec is not None and time.perf_counter() - t0 > time_budget_sec:
+            break
+        taken += 1
+        opt.zero_grad()
+        loss = -_posterior_mean(model, lo + span * u).sum()
+        loss.backward()
+        opt.step()
+        with torch.no_grad():
+            u.clamp_(0.0, 1.0)
+
+    with torch.no_grad():
+        X_ref = lo + span * u.detach()
+        mean_ref = _posterior_mean(model, X_ref)
+    i_ref = int(torch.argmax(mean_ref))
+    if float(mean_ref[i_ref]) > observed[1]:
+        return PosteriorBest(x=X_ref[i_ref].clone(), mean=float(mean_ref[i_ref]), source="refined", steps=taken)
+    return PosteriorBest(x=observed[0], mean=observed[1], source="observed", steps=taken)
+
+_CACHE: OrderedDict[tuple, PosteriorBest] = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+def cached_posterior_best(
+    model: PairwiseGP,
+    train_X: torch.Tensor,
+    train_comp: torch.LongTensor,
+    **kwargs,
+) -> PosteriorBest:
+    """
+    maximize_posterior_mean の結果を学習データのフィンガープリントごとにキャッシュする
+    （model は model_cache で同じデータから学習したものを渡すこと）。
+    """
+    bounds = kwargs.get("bounds")
+    bounds = search_bounds(train_X) if bounds is None else bounds.to(torch.float64)
+    key = (
+        data_fingerprint(train_X, train_comp),
+        tuple(bounds.flatten().tolist()),
+        tuple(sorted((k, v) for k, v in kwargs.items() if k != "bounds")),
+    )
+    with _CACHE_LOCK:
+        hit = _CACHE.get(key)
+        if hit is not None:
+            _CACHE.move_to_end(key)
+            return hit
+    best = maximize_posterior_mean(model, train_X, **{**kwargs, "bounds": bounds})
+    with _CACHE_LOCK:
+        _CACHE[key] = best
+        while len(_CACHE) > _MAX_CACHED:
+            _CACHE.popitem(last=False)
+    return best
@@ -2,14 +2,21 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Sequence
+
 import torch
 from botorch.optim import optimize_acqf
-from botorch.acquisition.preference import AnalyticExpectedUtilityOfBestOption
+from botorch.acquisition import AcquisitionFunction
+from botorch.acquisition.preference import AnalyticExpectedUtilityOfBestOption, qExpectedUtilityOfBestOption
+from botorch.sampling import SobolQMCNormalSampler
+from botorch.utils.sampling import draw_sobol_samples
 from .bounds_builder import build_bounds
 
 @dataclass(frozen=True)
 class ProposedBatch:
     X_next: torch.Tensor  # (q, d)
+    acq_value: float | None = None  # 獲得関数値（fast モード / q>2 のみ）
+    num_restarts: int | None = None # 実際に回したリスタート数（fast モード / q>2 のみ）
 
 def propose_next_pair(
     model,
@@ -31,4 +38,154 @@ def propose_next_pair(
         num_restarts=num_restarts,
         raw_samples=raw_samples,
     )
-    return ProposedBatch(X_next=X_next)
\ No newline at end of file
+    return ProposedBatch(X_next=X_next)
+
+def warm_start_batches(
+    center: torch.Tensor,
+    bounds: torch.Tensor,
+    q: int,
+    previous_X: torch.Tensor | None = None,
+) -> list[torch.Tensor]:
+    """
+    局所最適化の初期値にする (q, d) バッチ。
+
+    - 前ラウンドの提案（previous_X。形が (q, d) のときだけ）
+    - 事後平均が最大の点（center）と、前ラウンドの提案のうち center から遠い点
+      （無ければ bounds の内側に center から振った点）の組
+
+    Returns:
+        bounds 内に切り詰めたバッチのリスト。
+    """
+    lo, hi = bounds[0], bounds[1]
+    center = torch.minimum(torch.maximum(center.to(bounds), lo), hi)
+    batches: list[torch.Tensor] = []
+
+    prev = None
+    if previous_X is not None and tuple(previous_X.shape) == (q, center.numel()):
+        prev = torch.minimum(torch.maximum(previous_X.to(bounds), lo), hi)
+        batches.append(prev)
+
+    if prev is not None:
+        far = torch.argsort((prev - center).norm(dim=-1), descending=True)
+        others = [prev[i] for i in far[: q - 1].tolist()]
+    else:
+        # 上下交互に、bounds の中ほどまで振る
+        others = [center + 0.5 * ((hi if k % 2 == 0 else lo) - center) for k in range(q - 1)]
+    batches.append(torch.stack([center, *others]))
+    return batches
+
+def propose_next_pair_fast(
+    model,
+    center: torch.Tensor,
+    active_mask: torch.Tensor,
+    delta: float,
+    micro_ratio: float = 0.15,
+    q: int = 2,
+    previous_X: torch.Tensor | None = None,
+    min_restarts: int = 3,
+    max_restarts: int = 10,
+    raw_samples: int = 64,
+    timeout_sec: float | None = 1.0,
+) -> ProposedBatch:
+    """
+    待ち時間を抑えた propose_next_pair。
+
+    warm_start_batches と、Sobol の raw_samples 点のうち獲得関数値が高い上位をまとめて1回だけ局所最適化する。
+    リスタート数は最適化前の獲得関数値で決める:
+    - ウォームスタートが raw sample の最良以上なら（事後分布があまり動いていない）min_restarts 本
+    - そうでなければ max_restarts 本
+    timeout_sec は局所最適化（L-BFGS-B）の打ち切り時間。
+    """
+    acqf = AnalyticExpectedUtilityOfBestOption(pref_model=model)
+    bounds = build_bounds(center=center, active_mask=active_mask, delta=delta, micro_ratio=micro_ratio)
+
+    warm = torch.stack(warm_start_batches(center, bounds, q, previous_X=previous_X))
+    with torch.no_grad():
+        raw = draw_sobol_samples(bounds=bounds, n=raw_samples, q=q).to(bounds)
+        v_raw = acqf(raw)
+        v_warm = acqf(warm)
+    converged = bool(v_warm.max() >= v_raw.max())
+    n_restarts = max(min_restarts if converged else max_restarts, warm.shape[0] + 1)
+    top = torch.argsort(v_raw, descending=True)[: n_restarts - warm.shape[0]]
+
+    X_all, values = optimize_acqf(
+        acq_function=acqf,
+        bounds=bounds,
+        q=q,
+        num_restarts=n_restarts,
+        batch_initial_conditions=torch.cat([warm, raw[top]]),
+        return_best_only=False,
+        timeout_sec=timeout_sec,
+    )
+    best = int(torch.argmax(values))
+    return ProposedBatch(X_next=X_all[best], acq_value=float(values[best]), num_restarts=X_all.shape[0])
+
+
+# q>2 の提案での多様性ペナルティ（bounds で [0, 1] に正規化した距離で測る）
+DIVERSITY_WEIGHT = 0.1
+DIVERSITY_LENGTHSCALE = 0.15
+
+class DiversityPenalizedAcquisition(AcquisitionFunction):
+    """
+    base(X) - weight * mean_{i<j} exp(-|x_i - x_j|^2 / (2 l^2))
+
+    バッチ内の候補が近すぎると（印刷して見分けられない）減点する。距離は bounds で正規化する。
+    """
+    def __init__(
+        self,
+        base: AcquisitionFunction,
+        bounds: torch.Tensor,
+        weight: float = DIVERSITY_WEIGHT,
+        lengthscale: float = DIVERSITY_LENGTHSCALE,
+    ) -> None:
+        super().__init__(model=base.model)
+        self.base = base
+        self.weight = float(weight)
+        self.lengthscale = float(lengthscale)
+        self.register_buffer("lo", bounds[0].clone())
+        self.register_buffer("span", (bounds[1] - bounds[0]).clamp_min(1e-12))
+
+    def forward(self, X: torch.Tensor) -> torch.Tensor:
+        value = self.base(X)
+        q = X.shape[-2]
+        if q < 2 or self.weight == 0.0:
+            return value
+        U = (X - self.lo.to(X)) / self.span.to(X)
+        d2 = (U.unsqueeze(-2) - U.unsqueeze(-3)).pow(2).sum(-1)  # (..., q, q)
+        i, j = torch.triu_indices(q, q, offset=1, device=X.device)
+        sim = torch.exp(-d2[..., i, j] / (2.0 * self.lengthscale**2))
+        return value - self.weight * sim.mean(-1)
+
+def propose_next_batch(
+    model,
+    center: torch.Tensor,
+    active_mask: torch.Tensor,
+    delta: float,
+    micro_ratio: float = 0.15,
+    q: int = 4,
+    num_restarts: int = 8,
+    raw_samples: int = 128,
+    mc_samples: int = 128,
+    diversity_weight: float = DIVERSITY_WEIGHT,
+    timeout_sec: float | None = None,
+) -> ProposedBatch:
+    """
+    q>2 の提案（4-up / 6-up / 9-up シート用）。
+
+    解析的な EUBO は q=2 専用なので、モンテカルロ版の qEUBO に多様性ペナルティを足して最適化する。
+    1回の判定で「選ばれた1枚 vs 残り q-1 枚」の q-1 個の比較が得られる。
+    """
+    bounds = build_bounds(center=center, active_mask=active_mask, delta=delta, micro_ratio=micro_ratio)
+    sampler = SobolQMCNormalSampler(sample_shape=torch.Size([mc_samples]), seed=0)
+    base = qExpectedUtilityOfBestOption(pref_model=model, sampler=sampler)
+    acqf = DiversityPenalizedAcquisition(base, bounds=bounds, weight=diversity_weight)
+
+    X_next, value = optimize_acqf(
+        acq_function=acqf,
+        bounds=bounds,
+        q=q,
+        num_restarts=num_restarts,
+        raw_samples=raw_samples,
+        timeout_sec=timeout_sec,
+    )
+    return ProposedBatch(X_next=X_next, acq_value=float(value), num_restarts=num_restarts)
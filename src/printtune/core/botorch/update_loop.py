@@ -7,13 +7,17 @@ from typing import Optional
 
 import torch
 
+from ..io.paths import gp_state_path
 from ..log_types import SessionRecord
 from ..optimizer.param_space_v1 import PARAM_KEYS_V1
 from ..optimizer.best_selector import estimate_best_params
+from ..optimizer.bradley_terry import fit_bradley_terry, propose_thompson
+from ..policy import PREFERENCE_POLICY, PROPOSAL_POLICY, PreferencePolicy, ProposalPolicy
 from ..policy_axes import schedule_for_round
-from .build_data import build_torch_data
-from .pairwise_gp_fit import fit_pairwise_gp
-from .propose_next import propose_next_pair
+from .bounds_builder import build_bounds
+from .build_data import TorchPreferenceData, build_torch_data
+from .model_cache import get_or_fit_pairwise_gp, save_pairwise_gp_state
+from .propose_next import ProposedBatch, propose_next_batch, propose_next_pair, propose_next_pair_fast
 
 
 @dataclass(frozen=True)
@@ -27,12 +31,88 @@ def _keys_to_mask(active_keys: list[str]) -> torch.Tensor:
     return torch.tensor([k in active for k in PARAM_KEYS_V1], dtype=torch.bool)
 
 
-def _center_tensor_from_session(session: SessionRecord) -> torch.Tensor:
-    g_best = estimate_best_params(session)
+def _center_tensor_from_session(
+    session: SessionRecord, preference: PreferencePolicy = PREFERENCE_POLICY, persist: bool = True
+) -> torch.Tensor:
+    g_best = estimate_best_params(session, preference=preference, persist=persist)
     center_list = [float(g_best[k]) for k in PARAM_KEYS_V1]
     return torch.tensor(center_list, dtype=torch.float)
 
 
+def _previous_X(session: SessionRecord) -> torch.Tensor | None:
+    # 直前のラウンドの候補（fast モードのウォームスタート用）
+    if not session.rounds:
+        return None
+    rows = [[float(c.params["globals"][k]) for k in PARAM_KEYS_V1] for c in session.rounds[-1].candidates]
+    return torch.tensor(rows, dtype=torch.float) if rows else None
+
+
+def _propose(
+    data: TorchPreferenceData,
+    session: SessionRecord,
+    center: torch.Tensor,
+    mask: torch.Tensor,
+    delta: float,
+    micro_ratio: float,
+    q: int,
+    policy: ProposalPolicy,
+    preference: PreferencePolicy,
+    persist: bool = True,
+) -> tuple[ProposedBatch, dict]:
+    """
+    Returns:
+        (提案, schedule に残す提案方法の情報)。
+    """
+    if preference.backend_for(data.train_comp.shape[0]) == "bradley_terry":
+        # 序盤: Bradley–Terry の事後平均最大点＋Thompson sampling（torch の乱数から seed を取り、manual_seed で再現できるようにする）
+        bt = fit_bradley_terry(data.train_X.detach().double().numpy(), data.train_comp.numpy())
+        bounds = build_bounds(center=center, active_mask=mask, delta=delta, micro_ratio=micro_ratio)
+        seed = int(torch.randint(0, 2**31 - 1, ()).item())
+        X_next = propose_thompson(bt, bounds.double().numpy(), q=q, seed=seed)
+        return ProposedBatch(X_next=torch.tensor(X_next, dtype=torch.float)), {"preference_model": "bradley_terry"}
+
+    state_path = gp_state_path(session.session_id) if persist else None
+    model = get_or_fit_pairwise_gp(data.train_X, data.train_comp, state_path=state_path)
+    if q > 2:
+        proposed = propose_next_batch(
+            model,
+            center=center,
+            active_mask=mask,
+            delta=delta,
+            micro_ratio=micro_ratio,
+            q=q,
+            diversity_weight=policy.diversity_weight,
+            timeout_sec=policy.timeout_sec if policy.mode == "fast" else None,
+        )
+        return proposed, {"preference_model": "gp", "proposal_mode": "batch", "q": q, "diversity_weight": policy.diversity_weight}
+
+    if policy.mode == "fast":
+        proposed = propose_next_pair_fast(
+            model,
+            center=center,
+            active_mask=mask,
+            delta=delta,
+            micro_ratio=micro_ratio,
+            q=q,
+            previous_X=_previous_X(session),
+            min_restarts=policy.min_restarts,
+            max_restarts=policy.max_restarts,
+            raw_samples=policy.raw_samples,
+            timeout_sec=policy.timeout_sec,
+        )
+        return proposed, {"preference_model": "gp", "proposal_mode": "fast", "num_restarts": proposed.num_restarts}
+
+    proposed = propose_next_pair(
+        model,
+        center=center,
+        active_mask=mask,
+        delta=delta,
+        micro_ratio=micro_ratio,
+        q=q,
+    )
+    return proposed, {"preference_model": "gp", "proposal_mode": "default"}
+
+
 def _fallback_reprint_x(
     session: SessionRecord,
     phase_round_index: int,
@@ -41,7 +121,7 @@ def _fallback_reprint_x(
     q: int,
 ) -> NextProposal:
     """
-    GP学習に必要な比較データが不足している場合のフォールバック。
+    GP学習に必要な比較データが不足している場合のフォールバック（reprint と、比較が無い場合の pairwise 提案）。
     - schedule（active_keys/delta/micro_ratio）は残す（可観測性を優先）
     - Xは「中心の1軸だけを±deltaで動かす」簡易生成
     """
@@ -67,17 +147,18 @@ def _fallback_reprint_x(
         x[idx] = clamp(x[idx] + sign * delta)
         X_next.append(x)
 
-    if q == 4:
-        # 追加でもう1軸（可能なら2番目のactive_key）も動かして4点にする
-        idx2 = idx
+    if q > 2:
+        # 追加の軸（2番目以降の active_key。無ければ同じ軸）も動かして q 点にする（q=4 なら2番目の active_key）
         active_list = list(sched.active_keys)
-        if len(active_list) >= 2:
-            idx2 = key_to_index.get(active_list[1], idx)
-
-        for sign in (+1.0, -1.0):
-            x = [float(v) for v in center]
-            x[idx2] = clamp(x[idx2] + sign * delta)
-            X_next.append(x)
+        axes = [key_to_index.get(k, idx) for k in active_list[1:]] or [idx]
+        j = 0
+        while len(X_next) < q:
+            idx2 = axes[j % len(axes)]
+            j += 1
+            for sign in (+1.0, -1.0):
+                x = [float(v) for v in center]
+                x[idx2] = clamp(x[idx2] + sign * delta)
+                X_next.append(x)
 
     X_next = X_next[:q]
 
@@ -97,6 +178,9 @@ def propose_from_session_for_round(
     session: SessionRecord,
     phase_round_index: int,
     rubric: Optional[str] = None,
+    policy: ProposalPolicy = PROPOSAL_POLICY,
+    preference: PreferencePolicy = PREFERENCE_POLICY,
+    persist: bool = True,
 ) -> NextProposal:
     """
     次のpairwise提案（探索）を返す。
@@ -105,25 +189,34 @@ def propose_from_session_for_round(
         session: セッション。
         phase_round_index: 「実ラウンド番号」ではなく「スケジュール段階(phase)」。
         rubric: 観点。
+        policy: 獲得関数の最適化の設定（policy.PROPOSAL_POLICY）。
+        preference: 選好モデルの選択（policy.PREFERENCE_POLICY）。
+        persist: False なら学習した GP を gp_state.pt に保存しない（先読みの分岐。使うと決まったら
+            save_session_gp_state で保存する）。
 
     Returns:
-        NextProposal。
+        NextProposal。比較が無い（判定が同点・重複候補どうしの比較だけで、まとめると消える）場合は
+        _fallback_reprint_x の簡易提案（探索幅はそのまま）。
     """
-    data = build_torch_data(session)
-    model = fit_pairwise_gp(data.train_X, data.train_comp)
+    try:
+        data = build_torch_data(session)
+    except ValueError:
+        return _fallback_reprint_x(
+            session=session,
+            phase_round_index=phase_round_index,
+            rubric=rubric,
+            delta_scale=1.0,
+            q=policy.candidates_per_round,
+        )
 
     sched = schedule_for_round(phase_round_index, rubric=rubric)
-    center = _center_tensor_from_session(session)
+    center = _center_tensor_from_session(session, preference, persist=persist)
 
     mask = _keys_to_mask(list(sched.active_keys))
 
-    proposed = propose_next_pair(
-        model,
-        center=center,
-        active_mask=mask,
-        delta=sched.delta,
-        micro_ratio=sched.micro_ratio,
-        q=2,
+    proposed, proposal_info = _propose(
+        data, session, center, mask, delta=sched.delta, micro_ratio=sched.micro_ratio,
+        q=policy.candidates_per_round, policy=policy, preference=preference, persist=persist,
     )
 
     X_next = proposed.X_next.detach().cpu().tolist()
@@ -135,10 +228,26 @@ def propose_from_session_for_round(
             "delta": float(sched.delta),
             "micro_ratio": float(sched.micro_ratio),
             "center_source": "posterior_mean",
+            **proposal_info,
         },
     )
 
 
+def save_session_gp_state(session: SessionRecord) -> bool:
+    """
+    session のデータで学習済みの PairwiseGP がキャッシュにあれば gp_state.pt に保存する
+    （persist=False で計算した提案を採用したとき用）。
+
+    Returns:
+        保存したか。
+    """
+    try:
+        data = build_torch_data(session)
+    except ValueError:
+        return False
+    return save_pairwise_gp_state(data.train_X, data.train_comp, gp_state_path(session.session_id))
+
+
 def propose_reprint_pair(
     session: SessionRecord,
     phase_round_index: int,
@@ -146,6 +255,8 @@ def propose_reprint_pair(
     delta_scale: float = 1.5,
     q: int = 2,
     seed: Optional[int] = None,
+    policy: ProposalPolicy = PROPOSAL_POLICY,
+    preference: PreferencePolicy = PREFERENCE_POLICY,
 ) -> NextProposal:
     """
     Reprint用の提案: 現在のcenter周辺で探索幅を広げて再提案。
@@ -157,6 +268,8 @@ def propose_reprint_pair(
         delta_scale: schedule.delta に掛ける倍率（探索幅の拡大率）。
         q: 提案点数（pairwiseは2、OAは4など）。
         seed: 再現性用の乱数seed（torch.manual_seedに設定）。
+        policy: 獲得関数の最適化の設定（policy.PROPOSAL_POLICY）。
+        preference: 選好モデルの選択（policy.PREFERENCE_POLICY）。
 
     Returns:
         NextProposal。
@@ -178,17 +291,12 @@ def propose_reprint_pair(
             q=q,
         )
 
-    model = fit_pairwise_gp(data.train_X, data.train_comp)
-    center = _center_tensor_from_session(session)
+    center = _center_tensor_from_session(session, preference)
     mask = _keys_to_mask(list(sched.active_keys))
 
-    proposed = propose_next_pair(
-        model,
-        center=center,
-        active_mask=mask,
-        delta=scaled_delta,
-        micro_ratio=sched.micro_ratio,
-        q=q,
+    proposed, proposal_info = _propose(
+        data, session, center, mask, delta=scaled_delta, micro_ratio=sched.micro_ratio, q=q,
+        policy=policy, preference=preference,
     )
 
     X_next = proposed.X_next.detach().cpu().tolist()
@@ -202,5 +310,6 @@ def propose_reprint_pair(
             "delta_scale": float(delta_scale),
             "center_source": "posterior_mean",
             "seed": seed,
+            **proposal_info,
         },
     )
@@ -0,0 +1,161 @@
+# src/printtune/core/imaging/band_source.py
+"""
+行バンド単位で画素を読み出す入力ソース（タイル/ストリーミング描画用）
+
+- TiffStripSource: 非圧縮・チャンキーRGBのTIFF（8/16bit）をストリップ単位で読む（全体をデコードしない）
+- NpyBandSource: HxWx3 の .npy（uint8/uint16）を memmap で読む
+- PilBandSource: メモリ上のPIL画像から切り出す（上記以外の形式のフォールバック）
+"""
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+from typing import BinaryIO, Protocol
+
+import numpy as np
+from PIL import Image
+
+from .load import load_image_rgb
+from .numpy_io import pil_to_rgb_u8
+
+class BandSource(Protocol):
+    width: int
+    height: int
+
+    def read_rows(self, y0: int, y1: int) -> np.ndarray:
+        """
+        [y0, y1) 行を (y1-y0)xWx3 の uint8 または uint16（sRGBエンコード値）で返す。
+        """
+        ...
+
+    def close(self) -> None:
+        ...
+
+class PilBandSource:
+    def __init__(self, img: Image.Image) -> None:
+        self._img = img
+        self.width, self.height = img.size
+
+    def read_rows(self, y0: int, y1: int) -> np.ndarray:
+        return pil_to_rgb_u8(self._img.crop((0, y0, self.width, y1)))
+
+    def close(self) -> None:
+        pass
+
+class NpyBandSource:
+    def __init__(self, path: Path) -> None:
+        arr = np.load(path, mmap_mode="r")
+        if arr.ndim != 3 or arr.shape[2] != 3 or arr.dtype not in (np.uint8, np.uint16):
+            raise ValueError(f"Expected HxWx3 uint8/uint16, got {arr.shape} {arr.dtype}")
+        self._arr = arr
+        self.height, self.width = int(arr.shape[0]), int(arr.shape[1])
+
+    def read_rows(self, y0: int, y1: int) -> np.ndarray:
+        return np.array(self._arr[y0:y1])
+
+    def close(self) -> None:
+        self._arr = None
+
+# TIFFタグ番号
+_TAG_WIDTH = 256
+_TAG_HEIGHT = 257
+_TAG_BITS = 258
+_TAG_COMPRESSION = 259
+_TAG_PHOTOMETRIC = 262
+_TAG_STRIP_OFFSETS = 273
+_TAG_SAMPLES = 277
+_TAG_ROWS_PER_STRIP = 278
+_TAG_STRIP_BYTES = 279
+_TAG_PLANAR = 284
+
+_TIFF_TYPE_SIZE = {1: 1, 3: 2, 4: 4}
+_TIFF_TYPE_CODE = {1: "B", 3: "H", 4: "I"}
+
+def _read_tiff_ifd0(f: BinaryIO) -> tuple[str, dict[int, list[int]]]:
+    head = f.read(8)
+    if head[:2] == b"II":
+        bo = "<"
+    elif head[:2] == b"MM":
+        bo = ">"
+    else:
+        raise ValueError("not a TIFF file")
+    magic, ifd_offset = struct.unpack(bo + "HI", head[2:8])
+    if magic != 42:
+        raise ValueError("BigTIFF or unknown TIFF variant is not supported")
+
+    f.seek(ifd_offset)
+    (n,) = struct.unpack(bo + "H", f.read(2))
+    entries = [struct.unpack(bo + "HHI4s", f.read(12)) for _ in range(n)]
+
+    tags: dict[int, list[int]] = {}
+    for tag, typ, count, raw in entries:
+        size = _TIFF_TYPE_SIZE.get(typ)
+        if size is None:
+            continue  # 有理数などの未使用タグ
+        fmt = bo + _TIFF_TYPE_CODE[typ] * count
+        if size * count <= 4:
+            data = raw[: size * count]
+        else:
+            (offset,) = struct.unpack(bo + "I", raw)
+            pos = f.tell()
+            f.seek(offset)
+            data = f.read(size * count)
+            f.seek(pos)
+        tags[tag] = list(struct.unpack(fmt, data))
+    return bo, tags
+
+class TiffStripSource:
+    """
+    非圧縮・チャンキー(RGBRGB...)・8/16bitのRGB TIFFをストリップ単位で読む。
+    """
+    def __init__(self, path: Path) -> None:
+        self._f = open(path, "rb")
+        try:
+            bo, tags = _read_tiff_ifd0(self._f)
+            self.width = int(tags[_TAG_WIDTH][0])
+            self.height = int(tags[_TAG_HEIGHT][0])
+            bits = tags.get(_TAG_BITS, [1])
+            if tags.get(_TAG_COMPRESSION, [1])[0] != 1:
+                raise ValueError("compressed TIFF is not supported")
+            if tags.get(_TAG_PHOTOMETRIC, [2])[0] != 2 or tags.get(_TAG_SAMPLES, [1])[0] != 3:
+                raise ValueError("only RGB TIFF is supported")
+            if tags.get(_TAG_PLANAR, [1])[0] != 1 or len(set(bits)) != 1 or bits[0] not in (8, 16):
+                raise ValueError(f"unsupported TIFF sample layout: bits={bits}")
+        except Exception:
+            self._f.close()
+            raise
+
+        self._dtype = np.dtype(np.uint8) if bits[0] == 8 else np.dtype(bo + "u2")
+        self._strip_offsets = tags[_TAG_STRIP_OFFSETS]
+        self._rows_per_strip = int(tags.get(_TAG_ROWS_PER_STRIP, [self.height])[0])
+        self._row_bytes = self.width * 3 * self._dtype.itemsize
+
+    def read_rows(self, y0: int, y1: int) -> np.ndarray:
+        out = np.empty((y1 - y0, self.width, 3), dtype=self._dtype)
+        flat = out.reshape(y1 - y0, -1).view(np.uint8)
+        y = y0
+        while y < y1:
+            strip, row_in_strip = divmod(y, self._rows_per_strip)
+            n = min(y1 - y, self._rows_per_strip - row_in_strip)
+            self._f.seek(self._strip_offsets[strip] + row_in_strip * self._row_bytes)
+            self._f.readinto(memoryview(flat[y - y0:y - y0 + n]).cast("B"))
+            y += n
+        return out.astype(out.dtype.newbyteorder("="), copy=False)
+
+    def close(self) -> None:
+        self._f.close()
+
+def open_band_source(path: Path) -> BandSource:
+    """
+    パスから最適なBandSourceを選ぶ。ストリーミング非対応の形式はPILで全体をデコードする。
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".npy":
+        return NpyBandSource(path)
+    if suffix in (".tif", ".tiff"):
+        try:
+            return TiffStripSource(path)
+        except (ValueError, KeyError):
+            pass  # 圧縮TIFFなどはPILへフォールバック
+    return PilBandSource(load_image_rgb(path))
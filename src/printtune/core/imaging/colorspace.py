@@ -1,13 +1,41 @@
 # src/printtune/core/imaging/colorspace.py
+from functools import lru_cache
+
 import numpy as np
 
+# sRGB(D65) Linear RGB → XYZ 変換行列
+_SRGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+], dtype=np.float64)
+
+# D65 白色点（Y=1正規化）
+_WHITE_D65 = np.array([0.95047, 1.0, 1.08883], dtype=np.float64)
+
+def srgb_encoded_to_linear(x: np.ndarray) -> np.ndarray:
+    """
+    x: sRGBエンコード済みの値（0..1, float）
+    returns: linear light（xと同じdtype）
+    """
+    return np.where(x <= 0.04045, x / 12.92, ((x + 0.055) / 1.055) ** 2.4)
+
+def linear_to_srgb_encoded(lin: np.ndarray) -> np.ndarray:
+    """
+    lin: linear light（float、範囲外は0..1にクリップ）
+    returns: sRGBエンコード済みの値（0..1, float32）
+    """
+    lin = np.clip(lin, 0.0, 1.0).astype(np.float32)
+    x = np.where(lin <= 0.0031308, lin * 12.92, 1.055 * (lin ** (1 / 2.4)) - 0.055)
+    return np.clip(x, 0.0, 1.0)
+
 def srgb_u8_to_linear_f32(rgb_u8: np.ndarray) -> np.ndarray:
     """
     rgb_u8: HxWx3 uint8 (0..255)
     returns: HxWx3 float32 (0..1) linear light
     """
     x = rgb_u8.astype(np.float32) / 255.0
-    lin = np.where(x <= 0.04045, x / 12.92, ((x + 0.055) / 1.055) ** 2.4)
+    lin = srgb_encoded_to_linear(x)
     return lin.astype(np.float32)
 
 def linear_f32_to_srgb_u8(lin: np.ndarray) -> np.ndarray:
@@ -15,7 +43,99 @@ def linear_f32_to_srgb_u8(lin: np.ndarray) -> np.ndarray:
     lin: HxWx3 float32 (0..1) linear light
     returns: HxWx3 uint8 (0..255) sRGB encoded
     """
-    lin = np.clip(lin, 0.0, 1.0).astype(np.float32)
-    x = np.where(lin <= 0.0031308, lin * 12.92, 1.055 * (lin ** (1 / 2.4)) - 0.055)
-    x = np.clip(x, 0.0, 1.0)
-    return (x * 255.0 + 0.5).astype(np.uint8)
\ No newline at end of file
+    x = linear_to_srgb_encoded(lin)
+    return (x * 255.0 + 0.5).astype(np.uint8)
+
+# LUT版エンコードの量子化段数（[0,1]を65535等分, uint16 index）
+# sRGBエンコードの傾きは最大でも 12.92*255 ≒ 3295 code/単位 なので、
+# 量子化誤差は高々 0.025 code 程度 → 出力は厳密版と同一か ±1 code 以内。
+SRGB_ENCODE_LUT_SIZE = 1 << 16
+
+@lru_cache(maxsize=1)
+def _srgb_decode_table() -> np.ndarray:
+    # uint8の256値すべてを厳密版で評価した表（厳密版とビット一致）
+    table = srgb_u8_to_linear_f32(np.arange(256, dtype=np.uint8))
+    table.flags.writeable = False
+    return table
+
+@lru_cache(maxsize=1)
+def _srgb_encode_table() -> np.ndarray:
+    n = SRGB_ENCODE_LUT_SIZE
+    lin = np.arange(n, dtype=np.float32) / np.float32(n - 1)
+    table = linear_f32_to_srgb_u8(lin)
+    table.flags.writeable = False
+    return table
+
+# LUT変換を一度に処理する要素数（indexのintp変換などの一時配列を小さく保つ）
+_LUT_CHUNK = 1 << 18
+
+@lru_cache(maxsize=1)
+def _srgb_u16_decode_table() -> np.ndarray:
+    x = np.arange(1 << 16, dtype=np.float32) / 65535.0
+    table = srgb_encoded_to_linear(x).astype(np.float32)
+    table.flags.writeable = False
+    return table
+
+def _take_chunked(table: np.ndarray, idx: np.ndarray, out: np.ndarray | None) -> np.ndarray:
+    if out is None:
+        out = np.empty(idx.shape, dtype=table.dtype)
+    src = idx.reshape(-1)
+    dst = out.reshape(-1)
+    for s in range(0, src.size, _LUT_CHUNK):
+        dst[s:s + _LUT_CHUNK] = table[src[s:s + _LUT_CHUNK]]
+    return out
+
+def srgb_u8_to_linear_f32_lut(rgb_u8: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    srgb_u8_to_linear_f32 のLUT版（256エントリ表を引くだけ、出力はビット一致）
+    out: 書き込み先（rgb_u8と同shapeのC連続float32）。Noneなら新規確保。
+    """
+    return _take_chunked(_srgb_decode_table(), rgb_u8, out)
+
+def srgb_u16_to_linear_f32(rgb_u16: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    rgb_u16: HxWx3 uint16 (0..65535, sRGBエンコード。16bitスキャン等)
+    returns: HxWx3 float32 (0..1) linear light（65536エントリ表引き）
+    """
+    return _take_chunked(_srgb_u16_decode_table(), rgb_u16, out)
+
+def linear_f32_to_srgb_u8_lut(lin: np.ndarray) -> np.ndarray:
+    """
+    linear_f32_to_srgb_u8 のLUT版（65536段に量子化して表を引く、差は ±1 code 以内）
+    """
+    table = _srgb_encode_table()
+    scale = np.float32(SRGB_ENCODE_LUT_SIZE - 1)
+    out = np.empty(lin.shape, dtype=np.uint8)
+    src = lin.reshape(-1)
+    dst = out.reshape(-1)
+    for s in range(0, src.size, _LUT_CHUNK):
+        x = np.clip(src[s:s + _LUT_CHUNK], 0.0, 1.0).astype(np.float32, copy=False)
+        x *= scale
+        x += np.float32(0.5)
+        dst[s:s + _LUT_CHUNK] = table[x.astype(np.uint16)]
+    return out
+
+def linear_to_lab(lin: np.ndarray) -> np.ndarray:
+    """
+    lin: ...x3 linear light（sRGB原色, D65）
+    returns: ...x3 float64 CIE L*a*b*（D65）
+    """
+    xyz = np.asarray(lin, dtype=np.float64) @ _SRGB_TO_XYZ.T
+    t = xyz / _WHITE_D65
+    eps = (6.0 / 29.0) ** 3
+    f = np.where(t > eps, np.cbrt(t), t / (3.0 * (6.0 / 29.0) ** 2) + 4.0 / 29.0)
+    L = 116.0 * f[..., 1] - 16.0
+    a = 500.0 * (f[..., 0] - f[..., 1])
+    b = 200.0 * (f[..., 1] - f[..., 2])
+    return np.stack([L, a, b], axis=-1)
+
+def delta_e76_srgb_u8(a_u8: np.ndarray, b_u8: np.ndarray) -> np.ndarray:
+    """
+    2つのsRGB(u8)画像の画素ごとの色差 ΔE*ab (CIE76) を返す。
+
+    Returns:
+        a_u8.shape[:-1] の float64 配列
+    """
+    lab_a = linear_to_lab(srgb_u8_to_linear_f32(a_u8))
+    lab_b = linear_to_lab(srgb_u8_to_linear_f32(b_u8))
+    return np.linalg.norm(lab_a - lab_b, axis=-1)
@@ -1,9 +1,78 @@
 # src/printtune/core/imaging/final.py
 from __future__ import annotations
 
+from pathlib import Path
+from typing import BinaryIO, Hashable
+
 from PIL import Image
+from .band_source import PilBandSource
+from .frame import EvaluationFrameWriter, evaluation_framed_size
 from .parametric_linear import GlobalParams
-from .pipeline import render_image_with_global_params
+from .pipeline import RenderConfig, render_image_with_global_params
+from .render_cache import ImageDigestMemo, RenderCache, default_digest_memo, default_render_cache, render_cache_key
+from .stream_writer import StreamFormat, StreamWriter, open_stream_writer
+from .tiled import render_tiled
+
+# 最終画像の描画設定: exactエンジンのまま行バンドをCPUコア数で並列描画
+FINAL_RENDER_CONFIG = RenderConfig(workers=0)
+
+def render_final_image(img: Image.Image, best_params: GlobalParams, cfg: RenderConfig | None = None) -> Image.Image:
+    return render_image_with_global_params(img, best_params, cfg or FINAL_RENDER_CONFIG)
+
+def write_final_image(
+    img: Image.Image,
+    best_params: GlobalParams,
+    fp: BinaryIO,
+    fmt: StreamFormat = "PNG",
+    cfg: RenderConfig | None = None,
+    use_frame: bool = False,
+) -> None:
+    """
+    best_paramsを適用した最終画像をバンド単位で描画し、そのまま fp へエンコードする。
+    フル解像度の float 一時配列を作らないので、大きな画像でもピークメモリが増えない。
+    use_frame なら評価用フレームもバンドごとに付ける（EvaluationFrameWriter）。
+    """
+    source = PilBandSource(img)
+    out_w, out_h = evaluation_framed_size(img.size) if use_frame else img.size
+    writer: StreamWriter = open_stream_writer(fp, out_w, out_h, fmt=fmt)
+    if use_frame:
+        writer = EvaluationFrameWriter(writer, img.size)
+    render_tiled(source, best_params, writer, cfg=cfg)
+    writer.close()
+
+def render_final_image_file(
+    img: Image.Image,
+    best_params: GlobalParams,
+    cache_dir: Path,
+    use_frame: bool = False,
+    cfg: RenderConfig | None = None,
+    cache: RenderCache | None = None,
+    source: Hashable | None = None,
+    digests: ImageDigestMemo | None = None,
+) -> Path:
+    """
+    最終画像（＋評価用フレーム）のPNGファイルをキャッシュ経由で返す。
+    無ければ write_final_image で cache_dir へ直接ストリーミング描画する（画像全体をメモリに持たない）。
+
+    Args:
+        img: 入力画像。
+        best_params: 適用するパラメータ。
+        cache_dir: PNGの保存先（ディスク層）。
+        use_frame: 評価用フレームを付けるか。
+        cfg: 描画設定（既定は FINAL_RENDER_CONFIG）。
+        cache: 使うキャッシュ（既定は default_render_cache()）。
+        source: img の出どころ（render_cache.file_source_key など）。入力画像のダイジェストをこれごとに覚えておく
+            （None なら img のオブジェクトごと）。
+        digests: ダイジェストのメモ（既定は default_digest_memo()）。
 
-def render_final_image(img: Image.Image, best_params: GlobalParams) -> Image.Image:
-    return render_image_with_global_params(img, best_params)
+    Returns:
+        PNGファイルのパス。
+    """
+    cfg = cfg or FINAL_RENDER_CONFIG
+    cache = default_render_cache() if cache is None else cache
+    digests = default_digest_memo() if digests is None else digests
+    key = render_cache_key(digests.digest(img, source), best_params, cfg, use_frame=use_frame)
+    path = cache.get(key, cache_dir)
+    if path is not None:
+        return path
+    return cache.put(key, cache_dir, lambda f: write_final_image(img, best_params, f, cfg=cfg, use_frame=use_frame))
@@ -1,94 +1,240 @@
 # src/printtune/core/imaging/frame.py
 """
 評価用フレーム（グレーグラデーション＋原色パッチ）の合成処理
+
+フレームの描画内容（グラデーションとパッチ）は写真サイズだけで決まるので、
+サイズごとに上辺・左辺・右辺のピースを NumPy で一度だけ作ってキャッシュし、
+写真と並べて貼り合わせる（候補ごと・最終画像ごとに描き直さない）。
+
+出力は従来の ImageDraw 実装と画素単位で一致させている:
+- ImageDraw.rectangle は両端を含むので、各矩形は (x1+1, y1+1) まで塗る
+- グラデーションは写真の1行目（y=frame_width）と右フレームの1列目まで掛かる
+- 左パッチは写真の1列目まで掛かる。重なった場合は後から描いたものが勝つ
 """
 from __future__ import annotations
 
-from PIL import Image, ImageDraw
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+from .numpy_io import rgb_u8_to_pil
+
+_LEFT_PATCHES = (
+    (255, 0, 0),    # R
+    (0, 255, 0),    # G
+    (0, 0, 255),    # B
+)
+_RIGHT_PATCHES = (
+    (0, 255, 255),      # C
+    (255, 0, 255),      # M
+    (255, 255, 0),      # Y
+    (128, 128, 128),    # Neutral gray (50%)
+)
+
+def evaluation_frame_width(photo_size: tuple[int, int]) -> int:
+    """
+    写真サイズ (W, H) に対するフレーム幅（写真の短辺の12%、最小40px）。
+    """
+    return max(40, int(min(photo_size) * 0.12))
+
+def evaluation_framed_size(photo_size: tuple[int, int]) -> tuple[int, int]:
+    """
+    compose_with_evaluation_frame の出力サイズ（左右と上辺にフレームを足す）。
+    """
+    fw = evaluation_frame_width(photo_size)
+    return photo_size[0] + 2 * fw, photo_size[1] + fw
+
+@dataclass(frozen=True)
+class _PaintOp:
+    # キャンバス座標の矩形 [x0, x1) x [y0, y1)。colors は (3,) または列ごとの (x1-x0, 3)
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+    colors: np.ndarray
+
+def _frame_ops(width: int, height: int) -> list[_PaintOp]:
+    # 従来実装の描画順（グラデーション → 左パッチ → 右パッチ）どおりに並べる
+    fw = evaluation_frame_width((width, height))
+    ps = fw
+    ops: list[_PaintOp] = []
+
+    # 1. 上辺: 列 x に int(255 * (x - fw) / W)。x と x+1 の2列を塗る矩形を左から順に描いていたので、
+    #    最後の矩形の右端（右フレームの1列目）は最終列と同じ値になる
+    #    （np.linspace だと丸めが変わるので整数演算で求める）
+    gray = (np.arange(width, dtype=np.int64) * 255) // width
+    gray = np.append(gray, gray[-1]).astype(np.uint8)
+    ops.append(_PaintOp(fw, 0, fw + width + 1, fw + 1, np.repeat(gray[:, None], 3, axis=1)))
+
+    # 2. 左辺: R, G, B
+    sp = (height - len(_LEFT_PATCHES) * ps) // (len(_LEFT_PATCHES) + 1)
+    for i, color in enumerate(_LEFT_PATCHES):
+        y = fw + sp + i * (ps + sp)
+        ops.append(_PaintOp(0, y, ps + 1, y + ps + 1, np.array(color, dtype=np.uint8)))
+
+    # 3. 右辺: C, M, Y, neutral gray
+    x = fw + width
+    sp = (height - len(_RIGHT_PATCHES) * ps) // (len(_RIGHT_PATCHES) + 1)
+    for i, color in enumerate(_RIGHT_PATCHES):
+        y = fw + sp + i * (ps + sp)
+        ops.append(_PaintOp(x, y, x + ps + 1, y + ps + 1, np.array(color, dtype=np.uint8)))
+    return ops
+
+def _paint(target: np.ndarray, origin: tuple[int, int], ops: list[_PaintOp]) -> None:
+    # target はキャンバスの (ox, oy) から始まる部分領域。はみ出した部分は切り捨てる
+    ox, oy = origin
+    h, w = target.shape[:2]
+    for op in ops:
+        x0, x1 = max(op.x0, ox), min(op.x1, ox + w)
+        y0, y1 = max(op.y0, oy), min(op.y1, oy + h)
+        if x0 >= x1 or y0 >= y1:
+            continue
+        colors = op.colors if op.colors.ndim == 1 else op.colors[x0 - op.x0:x1 - op.x0]
+        target[y0 - oy:y1 - oy, x0 - ox:x1 - ox] = colors
+
+def _clip_op(op: _PaintOp, x0: int, y0: int, x1: int, y1: int) -> _PaintOp | None:
+    cx0, cx1 = max(op.x0, x0), min(op.x1, x1)
+    cy0, cy1 = max(op.y0, y0), min(op.y1, y1)
+    if cx0 >= cx1 or cy0 >= cy1:
+        return None
+    colors = op.colors if op.colors.ndim == 1 else op.colors[cx0 - op.x0:cx1 - op.x0]
+    return _PaintOp(cx0, cy0, cx1, cy1, colors)
+
+@dataclass(frozen=True)
+class _FrameChrome:
+    frame_width: int
+    top: np.ndarray     # fw x CW x 3
+    left: np.ndarray    # H x fw x 3
+    right: np.ndarray   # H x fw x 3
+    photo_ops: list[_PaintOp]  # 写真の上に掛かる描画（写真領域に切り詰め済み。写真を貼った後に塗る）
+    # PIL版で使うピース（Image.paste はC実装なので、PIL入力ならNumPyを経由しない方が速い）
+    top_img: Image.Image
+    left_img: Image.Image
+    right_img: Image.Image
+    photo_pastes: list[tuple[tuple[int, int, int] | Image.Image, tuple[int, int, int, int]]]
+
+@lru_cache(maxsize=8)
+def _frame_chrome(width: int, height: int) -> _FrameChrome:
+    fw = evaluation_frame_width((width, height))
+    cw = width + 2 * fw
+    ops = _frame_ops(width, height)
+
+    def piece(x: int, y: int, w: int, h: int) -> np.ndarray:
+        arr = np.full((h, w, 3), 255, dtype=np.uint8)
+        _paint(arr, (x, y), ops)
+        arr.setflags(write=False)
+        return arr
+
+    photo_ops = [
+        clipped for op in ops
+        if (clipped := _clip_op(op, fw, fw, fw + width, fw + height)) is not None
+    ]
+    photo_pastes = []
+    for op in photo_ops:
+        box = (op.x0, op.y0, op.x1, op.y1)
+        if op.colors.ndim == 1:
+            photo_pastes.append((tuple(int(c) for c in op.colors), box))
+        else:
+            strip = np.ascontiguousarray(np.broadcast_to(op.colors, (op.y1 - op.y0, *op.colors.shape)))
+            photo_pastes.append((rgb_u8_to_pil(strip), box))
+
+    top = piece(0, 0, cw, fw)
+    left = piece(0, fw, fw, height)
+    right = piece(fw + width, fw, fw, height)
+    return _FrameChrome(
+        frame_width=fw,
+        top=top,
+        left=left,
+        right=right,
+        photo_ops=photo_ops,
+        top_img=rgb_u8_to_pil(top),
+        left_img=rgb_u8_to_pil(left),
+        right_img=rgb_u8_to_pil(right),
+        photo_pastes=photo_pastes,
+    )
+
+def compose_with_evaluation_frame_u8(photo_u8: np.ndarray) -> np.ndarray:
+    """
+    compose_with_evaluation_frame の NumPy版。
+
+    Args:
+        photo_u8: HxWx3 uint8 (sRGB)
+
+    Returns:
+        (H+fw)x(W+2fw)x3 uint8
+    """
+    h, w = photo_u8.shape[:2]
+    chrome = _frame_chrome(w, h)
+    fw = chrome.frame_width
+
+    out = np.empty((h + fw, w + 2 * fw, 3), dtype=np.uint8)
+    out[:fw] = chrome.top
+    out[fw:, :fw] = chrome.left
+    out[fw:, fw + w:] = chrome.right
+    photo_region = out[fw:, fw:fw + w]
+    photo_region[...] = photo_u8
+    _paint(photo_region, (fw, fw), chrome.photo_ops)
+    return out
 
 def compose_with_evaluation_frame(photo: Image.Image) -> Image.Image:
     """
     写真の周囲にグレーグラデーションと原色パッチを付けた評価用画像を返す。
-    
+
     レイアウト:
     - 上辺: 横長のグレーグラデーション（左:黒→右:白）
     - 左辺: 縦に R, G, B のパッチ
     - 右辺: 縦に C, M, Y, neutral gray (50%) のパッチ
-    
+
     Args:
         photo: 元の写真（PIL Image）
-        
+
     Returns:
         フレーム付き画像
     """
-    # フレーム幅を決定（写真の短辺の10-15%程度）
-    short_side = min(photo.width, photo.height)
-    frame_width = max(40, int(short_side * 0.12))  # 最小40px
-    
-    # パッチサイズ（正方形）
-    patch_size = frame_width
-    
-    # キャンバスサイズを計算
-    canvas_w = photo.width + 2 * frame_width
-    canvas_h = photo.height + frame_width  # 上辺のみ追加
-    
-    # 白地のキャンバスを作成
-    canvas = Image.new("RGB", (canvas_w, canvas_h), (255, 255, 255))
-    
-    # 写真を中央に配置
-    photo_x = frame_width
-    photo_y = frame_width
-    canvas.paste(photo, (photo_x, photo_y))
-    
-    draw = ImageDraw.Draw(canvas)
-    
-    # 1. 上辺: グレーグラデーション（横ストリップ）
-    grad_y = 0
-    grad_h = frame_width
-    for x in range(photo_x, photo_x + photo.width):
-        # 0 (黒) → 255 (白) の線形グラデーション
-        gray_value = int(255 * (x - photo_x) / photo.width)
-        draw.rectangle(
-            [(x, grad_y), (x + 1, grad_y + grad_h)],
-            fill=(gray_value, gray_value, gray_value)
-        )
-    
-    # 2. 左辺: R, G, B パッチ（縦に配置）
-    left_x = 0
-    patches_per_side = 3  # R, G, B
-    patch_spacing = (photo.height - patches_per_side * patch_size) // (patches_per_side + 1)
-    
-    left_patches = [
-        (255, 0, 0),    # R
-        (0, 255, 0),    # G
-        (0, 0, 255),    # B
-    ]
-    
-    for i, color in enumerate(left_patches):
-        patch_y = photo_y + patch_spacing + i * (patch_size + patch_spacing)
-        draw.rectangle(
-            [(left_x, patch_y), (left_x + patch_size, patch_y + patch_size)],
-            fill=color
-        )
-    
-    # 3. 右辺: C, M, Y, neutral gray パッチ（縦に配置）
-    right_x = photo_x + photo.width
-    patches_per_side_right = 4  # C, M, Y, Gray
-    patch_spacing_right = (photo.height - patches_per_side_right * patch_size) // (patches_per_side_right + 1)
-    
-    right_patches = [
-        (0, 255, 255),      # C
-        (255, 0, 255),      # M
-        (255, 255, 0),       # Y
-        (128, 128, 128),     # Neutral gray (50%)
-    ]
-    
-    for i, color in enumerate(right_patches):
-        patch_y = photo_y + patch_spacing_right + i * (patch_size + patch_spacing_right)
-        draw.rectangle(
-            [(right_x, patch_y), (right_x + patch_size, patch_y + patch_size)],
-            fill=color
-        )
-    
+    chrome = _frame_chrome(photo.width, photo.height)
+    fw = chrome.frame_width
+
+    canvas = Image.new("RGB", (photo.width + 2 * fw, photo.height + fw))
+    canvas.paste(chrome.top_img, (0, 0))
+    canvas.paste(chrome.left_img, (0, fw))
+    canvas.paste(chrome.right_img, (fw + photo.width, fw))
+    canvas.paste(photo, (fw, fw))
+    for fill, box in chrome.photo_pastes:
+        canvas.paste(fill, box)
     return canvas
 
+class EvaluationFrameWriter:
+    """
+    写真の行バンドに評価用フレームを付けて inner へ書き出す StreamWriter
+    （compose_with_evaluation_frame_u8 のストリーミング版。出力は画素単位で一致する）。
+
+    inner は evaluation_framed_size(photo_size) の大きさで開いておくこと。上辺のフレームは生成時に書き出す。
+    """
+    def __init__(self, inner, photo_size: tuple[int, int]) -> None:
+        self._inner = inner
+        self._width, self._height = photo_size
+        self._chrome = _frame_chrome(self._width, self._height)
+        self._y = 0
+        inner.write_rows(self._chrome.top)
+
+    def write_rows(self, rows_u8: np.ndarray) -> None:
+        n = rows_u8.shape[0]
+        if self._y + n > self._height:
+            raise ValueError(f"too many rows: {self._y + n} > {self._height}")
+        fw = self._chrome.frame_width
+        w = self._width
+        y = self._y
+
+        out = np.empty((n, w + 2 * fw, 3), dtype=np.uint8)
+        out[:, :fw] = self._chrome.left[y:y + n]
+        out[:, fw + w:] = self._chrome.right[y:y + n]
+        photo_region = out[:, fw:fw + w]
+        photo_region[...] = rows_u8
+        _paint(photo_region, (fw, fw + y), self._chrome.photo_ops)
+        self._inner.write_rows(out)
+        self._y += n
+
+    def close(self) -> None:
+        self._inner.close()
@@ -0,0 +1,110 @@
+# src/printtune/core/imaging/fused_linear.py
+"""
+apply_global_params_linear の省メモリ版（fusedエンジン）
+
+- exposure + contrast を1回のアフィン演算（lin * k + b）に畳み込む
+- すべて out= 付きufuncで入力配列を上書きし、輝度(Y)用のHxWバッファは ScratchPool から使い回す
+- 恒等になる段（exposure=0&contrast=1, saturation=1, gamma=1, temp=tint=0のゲイン）は省略
+
+ピークメモリは「入力(HxWx3 float32) + HxW float32 ×2」≒ 入力の約1.7倍。
+結果は apply_global_params_linear と float32 の丸め誤差の範囲で一致する。
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from .parametric_linear import GlobalParams
+
+_LUMA709 = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+_PIVOT = 0.18
+
+class ScratchPool:
+    """
+    名前・shape・dtypeごとに作業バッファを保持して使い回す（スレッド間で共有しないこと）。
+    """
+    def __init__(self) -> None:
+        self._bufs: dict[tuple[str, tuple[int, ...], str], np.ndarray] = {}
+
+    def get(self, name: str, shape: tuple[int, ...], dtype=np.float32) -> np.ndarray:
+        key = (name, tuple(shape), np.dtype(dtype).str)
+        buf = self._bufs.get(key)
+        if buf is None:
+            # 同名で別shapeのバッファは捨てる（画像サイズが変わった場合）
+            for k in [k for k in self._bufs if k[0] == name]:
+                del self._bufs[k]
+            buf = np.empty(shape, dtype=dtype)
+            self._bufs[key] = buf
+        return buf
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.nbytes for b in self._bufs.values())
+
+    def clear(self) -> None:
+        self._bufs.clear()
+
+def _luma709_into(lin: np.ndarray, out: np.ndarray) -> np.ndarray:
+    return np.matmul(lin, _LUMA709, out=out)
+
+def apply_global_params_linear_inplace(
+    lin: np.ndarray,
+    p: GlobalParams,
+    pool: ScratchPool | None = None,
+    eps: float = 1e-6,
+) -> np.ndarray:
+    """
+    lin を上書きしながら GlobalParams を適用する。
+
+    Args:
+        lin: HxWx3 float32（C連続）の linear light。呼び出し後は結果で上書きされる。
+        p: パラメータ。
+        pool: 輝度用バッファのプール。Noneなら呼び出しごとに確保。
+        eps: Y保存時のゼロ除算回避。
+
+    Returns:
+        lin（同じ配列）。
+    """
+    if lin.dtype != np.float32 or not lin.flags.c_contiguous:
+        raise ValueError("lin must be a C-contiguous float32 array")
+
+    pool = pool or ScratchPool()
+    y_shape = lin.shape[:-1]
+
+    # 1) exposure + contrast: ((lin * 2^e) - pivot) * c + pivot = lin * k + pivot * (1 - c)
+    e = float(p.exposure_stops)
+    c = float(p.contrast)
+    if not (e == 0.0 and c == 1.0):
+        lin *= np.float32((2.0 ** e) * c)
+        if c != 1.0:
+            lin += np.float32(_PIVOT * (1.0 - c))
+
+    # 2) temp/tint（チャネルゲイン → クリップ → Y保存 → クリップ）
+    #    temp=tint=0 でもクリップとY保存は元実装どおり行う（恒等ではないため）
+    t = float(p.temp)
+    ti = float(p.tint)
+    y_ref = _luma709_into(lin, pool.get("y_ref", y_shape))
+    if not (t == 0.0 and ti == 0.0):
+        lin *= np.array([1.0 + 0.10 * t, 1.0 - 0.05 * ti, 1.0 - 0.10 * t], dtype=np.float32)
+    np.clip(lin, 0.0, 1.0, out=lin)
+    y_new = _luma709_into(lin, pool.get("y_new", y_shape))
+    y_new += np.float32(eps)
+    np.divide(y_ref, y_new, out=y_ref)
+    lin *= y_ref[..., None]
+    np.clip(lin, 0.0, 1.0, out=lin)
+
+    # 3) saturation: y + (lin - y) * s
+    s = float(p.saturation)
+    if s != 1.0:
+        y = _luma709_into(lin, pool.get("y_new", y_shape))[..., None]
+        lin -= y
+        lin *= np.float32(s)
+        lin += y
+
+    # 4) gamma（負値クリップ → べき乗）。saturationを省略した場合は既に0..1
+    g = float(p.gamma)
+    if s != 1.0 or g != 1.0:
+        np.maximum(lin, 0.0, out=lin)
+    if g != 1.0:
+        np.power(lin, np.float32(g), out=lin)
+
+    return lin
@@ -0,0 +1,188 @@
+# src/printtune/core/imaging/lut3d.py
+"""
+GlobalParams を 3D LUT にコンパイルして uint8 画像へ適用するレンダエンジン
+
+- 格子点は sRGB エンコード空間（0..1）に等間隔で置き、各格子点で厳密な
+  「gamma解除 → Linear演算 → gamma再適用」を評価して出力値（0..1）を保持する。
+- 適用時は uint8 入力から格子位置を引き、三線形補間 または 四面体補間で求める。
+  三線形は Pillow の Color3DLUT（C実装）、四面体は NumPy 実装。
+- 画素ごとの float 演算は補間のみなので、フル解像度の一時配列が大幅に減る。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Literal
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from .colorspace import (
+    srgb_encoded_to_linear,
+    linear_to_srgb_encoded,
+    srgb_u8_to_linear_f32,
+    linear_f32_to_srgb_u8,
+    delta_e76_srgb_u8,
+)
+from .parametric_linear import GlobalParams, apply_global_params_linear
+
+LutInterpolation = Literal["trilinear", "tetrahedral"]
+
+# 一度に補間する画素数（一時配列のピークを抑える）
+_CHUNK_PIXELS = 1 << 18
+
+@dataclass(frozen=True)
+class Lut3D:
+    size: int
+    table: np.ndarray  # (size**3, 3) float32, sRGBエンコード値(0..1), index = (r*size + g)*size + b
+    pil_filter: ImageFilter.Color3DLUT  # 同じ表をPillow順（r最速）に並べ替えたもの
+
+@lru_cache(maxsize=16)
+def compile_lut3d(params: GlobalParams, size: int = 33) -> Lut3D:
+    """
+    GlobalParams を size^3 の 3D LUT にコンパイルする（同一params/sizeはキャッシュ）。
+    """
+    if size < 2:
+        raise ValueError(f"LUT size must be >= 2, got {size}")
+
+    nodes = np.linspace(0.0, 1.0, size, dtype=np.float32)
+    r, g, b = np.meshgrid(nodes, nodes, nodes, indexing="ij")
+    enc = np.stack([r, g, b], axis=-1).reshape(-1, 1, 3)
+
+    lin = srgb_encoded_to_linear(enc).astype(np.float32)
+    lin2 = apply_global_params_linear(lin, params)
+    table = linear_to_srgb_encoded(lin2).reshape(-1, 3).astype(np.float32)
+    table.flags.writeable = False
+
+    # Pillow の Color3DLUT は r が最も速く変化する並び（b, g, r の順）
+    pil_table = table.reshape(size, size, size, 3).transpose(2, 1, 0, 3).reshape(-1, 3)
+    pil_filter = ImageFilter.Color3DLUT(size, pil_table, channels=3)
+    return Lut3D(size=size, table=table, pil_filter=pil_filter)
+
+@lru_cache(maxsize=8)
+def _u8_index_tables(size: int) -> tuple[np.ndarray, np.ndarray]:
+    # uint8値 → (下側の格子index, 格子内の小数位置) の256エントリ表
+    pos = np.arange(256, dtype=np.float64) * (size - 1) / 255.0
+    i0 = np.minimum(np.floor(pos), size - 2).astype(np.intp)
+    f = (pos - i0).astype(np.float32)
+    i0.flags.writeable = False
+    f.flags.writeable = False
+    return i0, f
+
+def _interp_tetrahedral(lut: Lut3D, base, fr, fg, fb) -> np.ndarray:
+    n = lut.size
+    t = lut.table
+    sr, sg = n * n, n
+
+    # 小数位置の大きい軸から順に1格子ずつ進む経路（c000 → c1 → c2 → c111）で補間
+    rg = fr >= fg
+    gb = fg >= fb
+    rb = fr >= fb
+    first = np.where(rg & rb, sr, np.where(gb, sg, 1))   # 最大の軸
+    last = np.where(gb & rb, 1, np.where(rg, sg, sr))    # 最小の軸
+
+    f_max = np.maximum(np.maximum(fr, fg), fb)
+    f_min = np.minimum(np.minimum(fr, fg), fb)
+    f_mid = fr + fg + fb - f_max - f_min
+
+    i1 = base + first
+    i3 = base + (sr + sg + 1)
+    i2 = i3 - last
+
+    w0 = (1 - f_max)[:, None]
+    w1 = (f_max - f_mid)[:, None]
+    w2 = (f_mid - f_min)[:, None]
+    w3 = f_min[:, None]
+    out = np.take(t, base, axis=0) * w0
+    out += np.take(t, i1, axis=0) * w1
+    out += np.take(t, i2, axis=0) * w2
+    out += np.take(t, i3, axis=0) * w3
+    return out
+
+def apply_lut3d_u8(rgb_u8: np.ndarray, lut: Lut3D, interpolation: LutInterpolation = "trilinear") -> np.ndarray:
+    """
+    rgb_u8: HxWx3 uint8 (sRGB)
+    returns: HxWx3 uint8 (sRGB)
+    """
+    if interpolation == "trilinear":
+        # mode= は渡さない（Pillow で非推奨。HxWx3 の uint8 配列は RGB として読まれる）
+        im = Image.fromarray(np.ascontiguousarray(rgb_u8, dtype=np.uint8))
+        return np.asarray(im.filter(lut.pil_filter), dtype=np.uint8).reshape(rgb_u8.shape)
+    if interpolation != "tetrahedral":
+        raise ValueError(f"unknown LUT interpolation: {interpolation}")
+
+    n = lut.size
+    i0, f = _u8_index_tables(n)
+    src = rgb_u8.reshape(-1, 3)
+    out = np.empty_like(src)
+
+    for s in range(0, src.shape[0], _CHUNK_PIXELS):
+        px = src[s:s + _CHUNK_PIXELS]
+        r, g, b = px[:, 0], px[:, 1], px[:, 2]
+        base = (i0[r] * n + i0[g]) * n + i0[b]
+        enc = _interp_tetrahedral(lut, base, f[r], f[g], f[b])
+        # linear_f32_to_srgb_u8 と同じ丸め
+        out[s:s + _CHUNK_PIXELS] = (np.clip(enc, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+    return out.reshape(rgb_u8.shape)
+
+def render_rgb_u8_with_lut3d(
+    rgb_u8: np.ndarray,
+    params: GlobalParams,
+    size: int = 33,
+    interpolation: LutInterpolation = "trilinear",
+) -> np.ndarray:
+    return apply_lut3d_u8(rgb_u8, compile_lut3d(params, size), interpolation=interpolation)
+
+@dataclass(frozen=True)
+class LutAccuracyReport:
+    size: int
+    interpolation: str
+    n_samples: int
+    max_delta_e: float
+    mean_delta_e: float
+    p99_delta_e: float
+    max_code_diff: int
+
+def _default_accuracy_samples(levels: int = 64) -> np.ndarray:
+    # 格子点と揃わないよう 0..255 を levels 段で刻んだ全組み合わせ（levels^3 色）
+    v = np.round(np.linspace(0, 255, levels)).astype(np.uint8)
+    r, g, b = np.meshgrid(v, v, v, indexing="ij")
+    return np.stack([r, g, b], axis=-1).reshape(-1, 1, 3)
+
+def lut_accuracy_report(
+    params: GlobalParams,
+    size: int = 33,
+    interpolation: LutInterpolation = "tetrahedral",
+    samples_u8: np.ndarray | None = None,
+) -> LutAccuracyReport:
+    """
+    3D LUT 出力と厳密パイプライン出力の差を ΔE*ab(CIE76) とコード値差で評価する。
+
+    Args:
+        params: 評価するパラメータ。
+        size: LUTの格子数（1軸あたり）。
+        interpolation: 補間方式。
+        samples_u8: 評価に使う uint8 画像（...x3）。Noneなら 64^3 色の格子サンプル。
+
+    Returns:
+        LutAccuracyReport（max/mean/p99 ΔE と最大コード値差）。
+    """
+    if samples_u8 is None:
+        samples_u8 = _default_accuracy_samples()
+    src = np.ascontiguousarray(samples_u8, dtype=np.uint8).reshape(-1, 1, 3)
+
+    exact = linear_f32_to_srgb_u8(apply_global_params_linear(srgb_u8_to_linear_f32(src), params))
+    approx = render_rgb_u8_with_lut3d(src, params, size=size, interpolation=interpolation)
+
+    de = delta_e76_srgb_u8(exact, approx).ravel()
+    code_diff = np.abs(exact.astype(np.int16) - approx.astype(np.int16))
+    return LutAccuracyReport(
+        size=size,
+        interpolation=interpolation,
+        n_samples=int(de.size),
+        max_delta_e=float(de.max()),
+        mean_delta_e=float(de.mean()),
+        p99_delta_e=float(np.percentile(de, 99)),
+        max_code_diff=int(code_diff.max()),
+    )
@@ -15,4 +15,4 @@ def rgb_u8_to_pil(arr: np.ndarray) -> Image.Image:
         arr = arr.astype(np.uint8) # Pillowはuint8以外だと壊れやすい
     if arr.ndim != 3 or arr.shape[2] != 3:
         raise ValueError(f"Expected HxWx3, got {arr.shape}")
-    return Image.fromarray(arr, mode="RGB")
+    return Image.fromarray(np.ascontiguousarray(arr))  # HxWx3 uint8 は RGB（mode= は Pillow で非推奨）
@@ -0,0 +1,108 @@
+# src/printtune/core/imaging/parallel.py
+"""
+複数候補の並列描画
+
+- threads: 行バンドをスレッドで分担し、各バンドで全候補を描画（デコードはバンドごとに1回。pipeline側）
+- processes: 候補をワーカープロセスに振り分けて描画。入力と出力は共有メモリで受け渡す
+  （画像をpickleしないので、大きな入力でもプロセス間コピーが発生しない）
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .parametric_linear import GlobalParams
+from .pipeline import RenderConfig, render_rgb_u8_batch_with_global_params, resolve_workers
+
+_PROCESS_POOLS: dict[int, ProcessPoolExecutor] = {}
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    # 起動コストが大きいので、ワーカー数ごとに使い回す（torch等を読み込んだ親をforkしないようspawn）
+    ex = _PROCESS_POOLS.get(workers)
+    if ex is None:
+        ex = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+        _PROCESS_POOLS[workers] = ex
+    return ex
+
+def _render_candidates_in_shm(
+    in_name: str,
+    out_name: str,
+    shape: tuple[int, ...],
+    n: int,
+    indices: list[int],
+    params_list: list[GlobalParams],
+    cfg: RenderConfig,
+) -> None:
+    shm_in = shared_memory.SharedMemory(name=in_name)
+    shm_out = shared_memory.SharedMemory(name=out_name)
+    try:
+        src = np.ndarray(shape, dtype=np.uint8, buffer=shm_in.buf)
+        dst = np.ndarray((n, *shape), dtype=np.uint8, buffer=shm_out.buf)
+        # 担当分の候補はデコードを共有してまとめて描画する
+        for i, out_u8 in zip(indices, render_rgb_u8_batch_with_global_params(src, params_list, cfg)):
+            dst[i] = out_u8
+        del src, dst
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+def _render_candidates_processes(
+    rgb_u8: np.ndarray,
+    params_list: list[GlobalParams],
+    cfg: RenderConfig,
+    workers: int,
+) -> list[np.ndarray]:
+    shape = tuple(rgb_u8.shape)
+    n = len(params_list)
+    shm_in = shared_memory.SharedMemory(create=True, size=rgb_u8.nbytes)
+    shm_out = shared_memory.SharedMemory(create=True, size=rgb_u8.nbytes * n)
+    try:
+        np.ndarray(shape, dtype=np.uint8, buffer=shm_in.buf)[...] = rgb_u8
+        # ワーカー内ではさらにスレッド並列しない（コア数を食い合わないように）
+        worker_cfg = replace(cfg, workers=1)
+        n_procs = min(workers, n)
+        ex = _process_pool(n_procs)
+        futures = []
+        for k in range(n_procs):
+            indices = list(range(k, n, n_procs))
+            chunk = [params_list[i] for i in indices]
+            futures.append(ex.submit(
+                _render_candidates_in_shm, shm_in.name, shm_out.name, shape, n, indices, chunk, worker_cfg,
+            ))
+        for fut in futures:
+            fut.result()
+        outs = np.ndarray((n, *shape), dtype=np.uint8, buffer=shm_out.buf)
+        results = [np.array(outs[i]) for i in range(n)]
+        del outs
+        return results
+    finally:
+        shm_in.close()
+        shm_in.unlink()
+        shm_out.close()
+        shm_out.unlink()
+
+def render_candidates_rgb_u8(
+    rgb_u8: np.ndarray,
+    params_list: list[GlobalParams],
+    cfg: RenderConfig | None = None,
+) -> list[np.ndarray]:
+    """
+    1枚の入力に複数の GlobalParams を適用した結果を、params_list と同じ順で返す。
+
+    Args:
+        rgb_u8: HxWx3 uint8 (sRGB)
+        params_list: 候補ごとのパラメータ。
+        cfg: 描画設定。workers / parallel_backend で並列化の方式を決める。
+
+    Returns:
+        HxWx3 uint8 のリスト。
+    """
+    cfg = cfg or RenderConfig()
+    workers = resolve_workers(cfg.workers)
+    if cfg.parallel_backend == "processes" and workers > 1 and len(params_list) > 1:
+        return _render_candidates_processes(np.ascontiguousarray(rgb_u8), params_list, cfg, workers)
+    return render_rgb_u8_batch_with_global_params(rgb_u8, params_list, cfg)
@@ -1,19 +1,236 @@
 # src/printune/core/imaging/pipeline.py
-from dataclasses import dataclass
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Literal
+
+import numpy as np
 from PIL import Image
 from .numpy_io import pil_to_rgb_u8, rgb_u8_to_pil
-from .colorspace import srgb_u8_to_linear_f32, linear_f32_to_srgb_u8
+from .colorspace import (
+    srgb_u8_to_linear_f32,
+    linear_f32_to_srgb_u8,
+    srgb_u8_to_linear_f32_lut,
+    srgb_u16_to_linear_f32,
+    linear_f32_to_srgb_u8_lut,
+)
 from .parametric_linear import GlobalParams, apply_global_params_linear
+from .lut3d import LutInterpolation, compile_lut3d, render_rgb_u8_with_lut3d
+from .fused_linear import ScratchPool, apply_global_params_linear_inplace
+
+# exact: 画素ごとに float32 で全演算 / lut3d: GlobalParamsを3D LUTにコンパイルして適用
+# fused: exactと同じ演算を入力バッファ上書き＋scratch再利用で行う（省メモリ。transfer="lut"と併用でピーク≒入力の2倍）
+RenderEngine = Literal["exact", "lut3d", "fused"]
+# sRGB変換（gamma解除/再適用）の方式。lut: デコードはビット一致、エンコードは ±1 code 以内
+TransferMode = Literal["exact", "lut"]
+# 並列化の方式。threads: 行バンドをスレッドで分担（NumPy/PillowはGILを解放）
+# processes: 候補ごとにプロセスで分担（共有メモリで入力を渡す。render_candidates_rgb_u8 のみ）
+ParallelBackend = Literal["threads", "processes"]
+
+# スレッド並列時の1バンドの最小行数
+_MIN_BAND_ROWS = 64
 
 @dataclass(frozen=True)
 class RenderConfig:
-    # 将来: ここにLUT解像度やクリップ方針、dither等を入れる
+    # 将来: ここにクリップ方針、dither等を入れる
     clip: bool = True
+    engine: RenderEngine = "exact"
+    lut_size: int = 33  # lut3d時の1軸あたり格子数（33^3 / 65^3 など）
+    lut_interpolation: LutInterpolation = "trilinear"  # trilinear: Pillow(C実装)で高速 / tetrahedral: NumPy実装
+    transfer: TransferMode = "exact"
+    workers: int = 1  # 1: 逐次 / 0以下: CPUコア数
+    parallel_backend: ParallelBackend = "threads"
 
-def render_image_with_global_params(img: Image.Image, params: GlobalParams, cfg: RenderConfig | None = None) -> Image.Image:
-    _ = cfg
-    rgb_u8 = pil_to_rgb_u8(img)
-    lin = srgb_u8_to_linear_f32(rgb_u8)            # 1) gamma解除
+def resolve_workers(workers: int) -> int:
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+def _transfer_funcs(cfg: RenderConfig):
+    if cfg.transfer == "lut":
+        return srgb_u8_to_linear_f32_lut, linear_f32_to_srgb_u8_lut
+    if cfg.transfer == "exact":
+        return srgb_u8_to_linear_f32, linear_f32_to_srgb_u8
+    raise ValueError(f"unknown transfer mode: {cfg.transfer}")
+
+def _render_rgb_u8_fused(rgb_u8: np.ndarray, params: GlobalParams, cfg: RenderConfig, pool: ScratchPool | None) -> np.ndarray:
+    pool = pool or ScratchPool()
+    # デコードは表引き（厳密版とビット一致）で、プールのバッファへ直接書き込む
+    lin = srgb_u8_to_linear_f32_lut(rgb_u8, out=pool.get("lin", rgb_u8.shape))
+    apply_global_params_linear_inplace(lin, params, pool=pool)
+    if cfg.transfer == "lut":
+        return linear_f32_to_srgb_u8_lut(lin)
+    return linear_f32_to_srgb_u8(lin)
+
+def _render_rgb_u8_threaded(rgb_u8: np.ndarray, params: GlobalParams, cfg: RenderConfig, workers: int) -> np.ndarray:
+    # 演算はすべて画素ごとなので、行バンドに分けて各スレッドで描画して結果配列へ書き込む
+    single = replace(cfg, workers=1)
+    if cfg.engine == "lut3d":
+        compile_lut3d(params, cfg.lut_size)  # 各スレッドで重複コンパイルしないよう先に作る
+
+    h = rgb_u8.shape[0]
+    band_rows = max(_MIN_BAND_ROWS, -(-h // (workers * 4)))
+    out = np.empty(rgb_u8.shape, dtype=np.uint8)
+    local = threading.local()
+
+    def work(y0: int) -> None:
+        pool = getattr(local, "pool", None)
+        if pool is None:
+            pool = local.pool = ScratchPool()
+        y1 = min(h, y0 + band_rows)
+        out[y0:y1] = render_rgb_u8_with_global_params(rgb_u8[y0:y1], params, single, pool=pool)
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        list(ex.map(work, range(0, h, band_rows)))
+    return out
+
+def render_rgb_u8_with_global_params(
+    rgb_u8: np.ndarray,
+    params: GlobalParams,
+    cfg: RenderConfig | None = None,
+    pool: ScratchPool | None = None,
+) -> np.ndarray:
+    """
+    rgb_u8: HxWx3 uint8 (sRGB)
+    pool: fusedエンジンの作業バッファ。複数候補を同サイズで描く場合に渡すと再確保を避けられる。
+    returns: HxWx3 uint8 (sRGB)
+    """
+    cfg = cfg or RenderConfig()
+    workers = resolve_workers(cfg.workers)
+    if workers > 1 and rgb_u8.shape[0] >= 2 * _MIN_BAND_ROWS:
+        return _render_rgb_u8_threaded(rgb_u8, params, cfg, workers)
+    if cfg.engine == "lut3d":
+        return render_rgb_u8_with_lut3d(rgb_u8, params, size=cfg.lut_size, interpolation=cfg.lut_interpolation)
+    if cfg.engine == "fused":
+        return _render_rgb_u8_fused(rgb_u8, params, cfg, pool)
+    if cfg.engine != "exact":
+        raise ValueError(f"unknown render engine: {cfg.engine}")
+
+    decode, encode = _transfer_funcs(cfg)
+    lin = decode(rgb_u8)                           # 1) gamma解除
     lin2 = apply_global_params_linear(lin, params) # 2) Linear領域で演算
-    out_u8 = linear_f32_to_srgb_u8(lin2)           # 3) gamma再適用
+    return encode(lin2)                            # 3) gamma再適用
+
+def _render_rgb_u8_batch_into(
+    rgb_u8: np.ndarray,
+    params_list: list[GlobalParams],
+    cfg: RenderConfig,
+    out: np.ndarray,
+    pool: ScratchPool,
+) -> None:
+    # out: NxHxWx3 uint8。デコードは1回だけ行い、候補ごとにLinearバッファを共有する
+    if cfg.engine == "lut3d":
+        for i, p in enumerate(params_list):
+            out[i] = render_rgb_u8_with_lut3d(rgb_u8, p, size=cfg.lut_size, interpolation=cfg.lut_interpolation)
+        return
+
+    if cfg.engine == "fused":
+        # 共有デコード結果を作業バッファへコピーしてから上書き演算する
+        lin_src = srgb_u8_to_linear_f32_lut(rgb_u8, out=pool.get("lin_src", rgb_u8.shape))
+        encode = linear_f32_to_srgb_u8_lut if cfg.transfer == "lut" else linear_f32_to_srgb_u8
+        lin = pool.get("lin", rgb_u8.shape)
+        for i, p in enumerate(params_list):
+            np.copyto(lin, lin_src)
+            apply_global_params_linear_inplace(lin, p, pool=pool)
+            out[i] = encode(lin)
+        return
+    if cfg.engine != "exact":
+        raise ValueError(f"unknown render engine: {cfg.engine}")
+
+    # exact: apply_global_params_linear は入力を書き換えないので、そのまま共有できる
+    decode, encode = _transfer_funcs(cfg)
+    lin_src = decode(rgb_u8)
+    for i, p in enumerate(params_list):
+        out[i] = encode(apply_global_params_linear(lin_src, p))
+
+def render_rgb_u8_batch_with_global_params(
+    rgb_u8: np.ndarray,
+    params_list: list[GlobalParams],
+    cfg: RenderConfig | None = None,
+    pool: ScratchPool | None = None,
+) -> list[np.ndarray]:
+    """
+    1枚の入力に複数の GlobalParams を適用する（sRGBデコードは1回だけ）。
+
+    Args:
+        rgb_u8: HxWx3 uint8 (sRGB)
+        params_list: 候補ごとのパラメータ。
+        cfg: 描画設定。workers > 1 なら行バンドごとに全候補をスレッドで描画する。
+        pool: 作業バッファ（逐次時のみ使用）。
+
+    Returns:
+        HxWx3 uint8 のリスト（params_list と同じ順。結果は render_rgb_u8_with_global_params と一致）。
+    """
+    cfg = cfg or RenderConfig()
+    n = len(params_list)
+    out = np.empty((n, *rgb_u8.shape), dtype=np.uint8)
+    if n == 0:
+        return []
+
+    workers = resolve_workers(cfg.workers)
+    h = rgb_u8.shape[0]
+    if workers > 1 and h >= 2 * _MIN_BAND_ROWS:
+        single = replace(cfg, workers=1)
+        if cfg.engine == "lut3d":
+            for p in params_list:
+                compile_lut3d(p, cfg.lut_size)
+        band_rows = max(_MIN_BAND_ROWS, -(-h // (workers * 4)))
+        local = threading.local()
+
+        def work(y0: int) -> None:
+            band_pool = getattr(local, "pool", None)
+            if band_pool is None:
+                band_pool = local.pool = ScratchPool()
+            y1 = min(h, y0 + band_rows)
+            _render_rgb_u8_batch_into(rgb_u8[y0:y1], params_list, single, out[:, y0:y1], band_pool)
+
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            list(ex.map(work, range(0, h, band_rows)))
+    else:
+        _render_rgb_u8_batch_into(rgb_u8, params_list, cfg, out, pool or ScratchPool())
+    return list(out)
+
+def render_rgb_u16_with_global_params(
+    rgb_u16: np.ndarray,
+    params: GlobalParams,
+    cfg: RenderConfig | None = None,
+    pool: ScratchPool | None = None,
+) -> np.ndarray:
+    """
+    rgb_u16: HxWx3 uint16 (sRGB, 16bitスキャン等)
+    returns: HxWx3 uint8 (sRGB)
+
+    lut3d は8bit入力専用のため、16bit入力では fused と同じ Linear 演算で処理する。
+    """
+    cfg = cfg or RenderConfig()
+    pool = pool or ScratchPool()
+    lin = srgb_u16_to_linear_f32(rgb_u16, out=pool.get("lin", rgb_u16.shape))
+    if cfg.engine == "exact":
+        lin = apply_global_params_linear(lin, params)
+    else:
+        apply_global_params_linear_inplace(lin, params, pool=pool)
+    if cfg.transfer == "lut":
+        return linear_f32_to_srgb_u8_lut(lin)
+    return linear_f32_to_srgb_u8(lin)
+
+def render_image_with_global_params(
+    img: Image.Image,
+    params: GlobalParams,
+    cfg: RenderConfig | None = None,
+    pool: ScratchPool | None = None,
+) -> Image.Image:
+    rgb_u8 = pil_to_rgb_u8(img)
+    out_u8 = render_rgb_u8_with_global_params(rgb_u8, params, cfg, pool=pool)
     return rgb_u8_to_pil(out_u8)
+
+def render_images_with_global_params_batch(
+    img: Image.Image,
+    params_list: list[GlobalParams],
+    cfg: RenderConfig | None = None,
+) -> list[Image.Image]:
+    """
+    1枚の写真から候補ごとの画像をまとめて描画する（PIL→NumPy変換とsRGBデコードは1回）。
+    """
+    rgb_u8 = pil_to_rgb_u8(img)
+    return [rgb_u8_to_pil(o) for o in render_rgb_u8_batch_with_global_params(rgb_u8, params_list, cfg)]
@@ -0,0 +1,138 @@
+# src/printtune/core/imaging/proxy.py
+"""
+ラウンドシート用のプロキシ（縮小）画像
+
+シートの各セルは _fit_into で cell_w x cell_h に縮小されるため、候補を元解像度で描画する必要はない。
+元画像を1回だけセルの画素格子に合わせて縮小し、その上で候補を描画する（make_sheet_proxy）。
+縮小はどちらの経路も downsample_rgb_u8_linear（Linear light。sRGB値のまま平均すると暗部寄りに偏る）。
+Linear light での縮小は露出・色温度などの Linear light での線形な操作と入れ替えられるので、
+「縮小してから描画」と「描画してから縮小」の差はコントラスト・ガンマなどの非線形な操作の分だけになる。
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+from PIL import Image
+
+from .colorspace import linear_f32_to_srgb_u8, srgb_u8_to_linear_f32_lut
+from .frame import compose_with_evaluation_frame_u8, evaluation_frame_width
+
+def downsample_rgb_u8_linear(
+    rgb_u8: np.ndarray,
+    size: tuple[int, int],
+    box: tuple[float, float, float, float] | None = None,
+    resample: Image.Resampling = Image.Resampling.LANCZOS,
+) -> np.ndarray:
+    """
+    HxWx3 uint8 (sRGB) を Linear light で size=(w, h) に縮小する。
+
+    チャネルごとに float32 の PIL画像（mode "F"）として縮小するので、
+    作業メモリは「1チャネル分の float32」程度で済む。box は Image.resize の box（元画像上の縮小範囲）。
+    """
+    w, h = size
+    out = np.empty((h, w, 3), dtype=np.float32)
+    for c in range(3):
+        lin_c = srgb_u8_to_linear_f32_lut(np.ascontiguousarray(rgb_u8[..., c]))
+        ch = Image.fromarray(lin_c).resize((w, h), resample, box=box, reducing_gap=2.0)
+        out[..., c] = np.asarray(ch)
+        del lin_c, ch
+    np.clip(out, 0.0, 1.0, out=out)  # LANCZOS / BICUBIC のオーバーシュート
+    return linear_f32_to_srgb_u8(out)
+
+def thumbnail_size(size: tuple[int, int], box: tuple[int, int]) -> tuple[int, int]:
+    """
+    size=(w, h) の画像を比率を保って box=(w, h) に収めたサイズ（Image.thumbnail と同じ丸め。収まるなら size のまま）。
+    """
+    w, h = size
+    x, y = math.floor(box[0]), math.floor(box[1])
+    if x >= w and y >= h:
+        return w, h
+
+    def round_aspect(number: float, key: Callable[[int], float]) -> int:
+        return max(min(math.floor(number), math.ceil(number), key=key), 1)
+
+    aspect = w / h
+    if x / y >= aspect:
+        x = round_aspect(y * aspect, key=lambda n: abs(aspect - n / y))
+    else:
+        y = round_aspect(x / aspect, key=lambda n: 0 if n == 0 else abs(aspect - x / n))
+    return x, y
+
+@dataclass(frozen=True)
+class SheetProxy:
+    """
+    縮小描画したセル画像を、元解像度のシートと同じレイアウトで組み立てるための材料。
+
+    canvas_u8 は「元写真にフレームを付けた画像」を sheet_layout._fit_into と同じく縮小したもの
+    （フレームと、写真とフレームの境目の画素はここから取る）。
+    photo_u8 は写真の内側（canvas の photo_box）を同じ縮尺・同じ画素中心で元写真から縮小したもので、
+    候補の描画はこの上で行い、canvas の photo_box に貼り戻す。
+    """
+    photo_u8: np.ndarray
+    canvas_u8: np.ndarray
+    photo_box: tuple[int, int, int, int]  # canvas 上の (x0, y0, x1, y1)
+
+    def compose(self, rendered_u8: np.ndarray) -> np.ndarray:
+        """
+        photo_u8 を描画した結果をフレーム込みのセル画像にする。
+        """
+        x0, y0, x1, y1 = self.photo_box
+        out = self.canvas_u8.copy()
+        out[y0:y1, x0:x1] = rendered_u8
+        return out
+
+def make_sheet_proxy(
+    rgb_u8: np.ndarray,
+    cell_size: tuple[int, int],
+    use_evaluation_frame: bool = True,
+) -> SheetProxy | None:
+    """
+    シート描画用のプロキシを作る。縮小不要（セルに等倍で収まる）なら None（元解像度で描画する）。
+
+    元解像度のシートでは「描画 → フレーム合成 → セルへ縮小（_fit_into）」の順に処理される。
+    ここでは同じ縮小を元写真のフレーム付き画像に1回だけ掛けてセル画像の大きさと縮尺を決め、
+    写真の内側は box 指定でその縮尺の画素格子に揃えて縮小する（どちらも Linear light）。
+    こうするとセル画像のサイズ・写真とパッチの位置は元解像度の経路と画素単位で一致し、
+    違いは「縮小してから色変換するか、色変換してから縮小するか」と境目の1〜2画素だけになる。
+
+    Args:
+        rgb_u8: HxWx3 uint8 (sRGB) の元写真。
+        cell_size: シートのセル (cell_w, cell_h)。
+        use_evaluation_frame: 評価用フレームを付けるか。
+
+    Returns:
+        SheetProxy または None。
+    """
+    h, w = rgb_u8.shape[:2]
+    if use_evaluation_frame:
+        framed = compose_with_evaluation_frame_u8(rgb_u8)
+        origin = evaluation_frame_width((w, h))
+        inset = origin + 1  # フレームは写真の1行目（グラデーション）と1列目（左パッチ）にも掛かる
+    else:
+        framed = rgb_u8
+        origin = inset = 0
+
+    full_w, full_h = framed.shape[1], framed.shape[0]
+    cw, ch = thumbnail_size((full_w, full_h), cell_size)  # sheet_layout._fit_into と同じ縮小
+    if (cw, ch) == (full_w, full_h):
+        return None
+    canvas = downsample_rgb_u8_linear(framed, (cw, ch), resample=Image.Resampling.BICUBIC)
+    del framed
+
+    sx = cw / full_w
+    sy = ch / full_h
+    x0, y0 = math.ceil(inset * sx), math.ceil(inset * sy)
+    x1, y1 = math.floor((origin + w) * sx), math.floor((origin + h) * sy)
+    if x1 <= x0 or y1 <= y0:
+        return None
+
+    box = (x0 / sx - origin, y0 / sy - origin, x1 / sx - origin, y1 / sy - origin)
+    photo = downsample_rgb_u8_linear(rgb_u8, (x1 - x0, y1 - y0), box=box, resample=Image.Resampling.BICUBIC)
+    return SheetProxy(
+        photo_u8=photo,
+        canvas_u8=canvas,
+        photo_box=(x0, y0, x1, y1),
+    )
@@ -0,0 +1,264 @@
+# src/printtune/core/imaging/render_cache.py
+"""
+描画結果のコンテンツアドレス型キャッシュ
+
+キー = blake2b(入力画像の画素, 正規化した GlobalParams, 出力に影響する RenderConfig, フレーム有無)。
+- ディスク層: <disk_dir>/<key>.png。描画結果はバンド単位でここへ直接エンコードする（再起動後も再利用）
+- メモリ層: キー → ファイルパスの対応だけを件数上限つきLRU（OrderedDict）で持つ
+
+フル解像度の画像そのものはメモリに保持しない（最終画像のストリーミング描画を活かすため）。
+ディスク層はディレクトリごとに合計バイト数の上限があり、超えたら更新時刻の古いファイルから消す。
+メモリ層の1件はパス1つ（百数十バイト）なので、件数の上限でバイト数も決まる（既定の256件で数十KB）。
+
+入力画像のダイジェストは全画素を読むので、ImageDigestMemo でソース（ファイルのパス・更新時刻・サイズ、
+または同じ Image オブジェクト）ごとに覚えておき、Streamlit の rerun のたびに計算し直さない。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import asdict
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Callable, Hashable
+
+from PIL import Image
+
+from .parametric_linear import GlobalParams
+from .pipeline import RenderConfig
+
+# キーの形式や描画結果が変わったら上げる（古いディスクキャッシュを無効にする）
+RENDER_CACHE_VERSION = 1
+DEFAULT_RENDER_CACHE_ENTRIES = 256
+DEFAULT_RENDER_CACHE_DISK_BYTES = 2 << 30
+DEFAULT_DIGEST_MEMO_ENTRIES = 64
+# 書き込み途中で落ちたプロセスの一時ファイルを消すまでの秒数
+_STALE_TMP_SEC = 3600.0
+
+_DIGEST_BAND_ROWS = 256
+
+# 出力画素に影響しない設定（並列化の方式）はキーに含めない
+_CFG_KEY_EXCLUDE = ("workers", "parallel_backend")
+
+def image_digest(img: Image.Image) -> str:
+    """
+    画像のモード・サイズ・画素からダイジェストを作る（行バンドごとに読むので画像全体のコピーを作らない）。
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{img.mode}:{img.width}x{img.height}".encode("ascii"))
+    for y0 in range(0, img.height, _DIGEST_BAND_ROWS):
+        h.update(img.crop((0, y0, img.width, min(img.height, y0 + _DIGEST_BAND_ROWS))).tobytes())
+    return h.hexdigest()
+
+def file_source_key(path: Path) -> tuple[str, str, int, int]:
+    """
+    ファイルから読んだ画像の ImageDigestMemo 用のキー（パス・更新時刻・サイズ。書き換えられたら変わる）。
+    """
+    p = Path(path).resolve()
+    st = p.stat()
+    return ("file", str(p), st.st_mtime_ns, st.st_size)
+
+class ImageDigestMemo:
+    """
+    image_digest の結果をソースごとに覚えておく（件数上限つきLRU）。スレッドセーフ。
+
+    - source を渡したら source をキーにする（file_source_key など、画素が変われば変わる値を渡すこと）
+    - 渡さなければ Image オブジェクトごと（session_state に置いた同じ画像など。覚えた後に画素を書き換えないこと）
+    """
+    def __init__(self, max_entries: int = DEFAULT_DIGEST_MEMO_ENTRIES) -> None:
+        self.max_entries = int(max_entries)
+        # key -> (Image への弱参照（source なしのとき）, ダイジェスト)
+        self._entries: OrderedDict[Hashable, tuple[weakref.ref | None, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, img: Image.Image, source: Hashable | None = None) -> str:
+        key = ("object", id(img)) if source is None else source
+        with self._lock:
+            entry = self._entries.get(key)
+            # id は回収後に別の Image で使い回されうるので、弱参照で同じオブジェクトか確かめる
+            if entry is not None and (entry[0] is None or entry[0]() is img):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        digest = image_digest(img)
+        ref = weakref.ref(img) if source is None else None
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (ref, digest)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return digest
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+def render_cache_key(
+    digest: str,
+    params: GlobalParams,
+    cfg: RenderConfig | None = None,
+    use_frame: bool = False,
+) -> str:
+    """
+    Args:
+        digest: image_digest の結果。
+        params: 適用するパラメータ（float は repr で正規化。-0.0 は 0.0 に揃える）。
+        cfg: 描画設定（None は既定値として扱う）。
+        use_frame: 評価用フレームを付けた結果か。
+
+    Returns:
+        32桁の16進文字列。
+    """
+    cfg_d = {k: v for k, v in asdict(cfg or RenderConfig()).items() if k not in _CFG_KEY_EXCLUDE}
+    payload = {
+        "v": RENDER_CACHE_VERSION,
+        "image": digest,
+        "params": {k: repr(float(v) + 0.0) for k, v in asdict(params).items()},
+        "cfg": cfg_d,
+        "frame": bool(use_frame),
+    }
+    s = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(s.encode("utf-8"), digest_size=16).hexdigest()
+
+def _touch(path: Path) -> None:
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+class RenderCache:
+    """
+    キー → PNGファイルのキャッシュ。スレッドセーフ（Streamlitのセッションごとのスレッドから共有される）。
+    ディスクへの書き込みは一意な一時ファイル経由の os.replace なので、別スレッド・別プロセスと競合しても壊れない。
+
+    メモリ層はパスしか持たないので max_entries（件数）で抑え、描画結果の実体があるディスク層は
+    max_disk_bytes（バイト数）で抑える。
+    """
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_RENDER_CACHE_ENTRIES,
+        max_disk_bytes: int = DEFAULT_RENDER_CACHE_DISK_BYTES,
+    ) -> None:
+        self.max_entries = int(max_entries)
+        self.max_disk_bytes = int(max_disk_bytes)
+        self._entries: OrderedDict[str, Path] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, path: Path) -> None:
+        with self._lock:
+            self._entries[key] = path
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str, disk_dir: Path) -> Path | None:
+        """
+        key の描画結果ファイルを返す（無ければ None）。見つかったファイルは更新時刻を進める（ディスク層のLRU）。
+        """
+        with self._lock:
+            path = self._entries.get(key)
+        if path is None:
+            path = Path(disk_dir) / f"{key}.png"
+        if path.exists():
+            _touch(path)
+            self._remember(key, path)
+            self.hits += 1
+            return path
+
+        with self._lock:
+            self._entries.pop(key, None)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, disk_dir: Path, write: Callable[[BinaryIO], None]) -> Path:
+        """
+        write(fp) で描画結果をエンコードして <disk_dir>/<key>.png に置き、そのパスを返す。
+        既にあれば書かない。
+        """
+        disk_dir = Path(disk_dir)
+        disk_dir.mkdir(parents=True, exist_ok=True)
+        path = disk_dir / f"{key}.png"
+        if not path.exists():
+            fd, tmp_name = tempfile.mkstemp(prefix=f"{key}.", suffix=".tmp", dir=disk_dir)
+            tmp = Path(tmp_name)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    write(f)
+                os.replace(tmp, path)
+            except OSError:
+                tmp.unlink(missing_ok=True)
+                if not path.exists():
+                    raise
+                # 同じキーを別の書き手が先に置いた（内容は同じ）
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+        self._remember(key, path)
+        self.prune(disk_dir, keep=path)
+        return path
+
+    def prune(self, disk_dir: Path, keep: Path | None = None) -> None:
+        """
+        disk_dir の合計が max_disk_bytes を超えていたら、更新時刻の古いファイルから消す（keep は残す）。
+        古い一時ファイルも消す。他のプロセスが同時に消していても構わない。
+        """
+        files: list[tuple[float, int, Path]] = []
+        now = time.time()
+        for p in Path(disk_dir).iterdir():
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            if p.suffix == ".tmp":
+                if now - st.st_mtime > _STALE_TMP_SEC:
+                    p.unlink(missing_ok=True)
+                continue
+            if p.suffix == ".png":
+                files.append((st.st_mtime, st.st_size, p))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, p in sorted(files, key=lambda t: t[0]):
+            if total <= self.max_disk_bytes:
+                break
+            if keep is not None and p == keep:
+                continue
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+@lru_cache(maxsize=1)
+def default_render_cache() -> RenderCache:
+    """
+    プロセス全体で共有する既定のキャッシュ。
+    """
+    return RenderCache()
+
+@lru_cache(maxsize=1)
+def default_digest_memo() -> ImageDigestMemo:
+    """
+    プロセス全体で共有する既定のダイジェストのメモ。
+    """
+    return ImageDigestMemo()
@@ -4,6 +4,9 @@ from __future__ import annotations
 from dataclasses import dataclass
 from PIL import Image, ImageDraw
 
+from .numpy_io import pil_to_rgb_u8, rgb_u8_to_pil
+from .proxy import downsample_rgb_u8_linear, thumbnail_size
+
 @dataclass(frozen=True)
 class SheetCell:
     slot: str
@@ -11,29 +14,47 @@ class SheetCell:
     image: Image.Image  # RGB
 
 def _fit_into(img: Image.Image, w: int, h: int) -> Image.Image:
-    # アスペクト比を維持して枠に収める（thumbnailは比率を保つ）[web:457]
+    # アスペクト比を維持して枠に収める（サイズの丸めは thumbnail と同じ。縮小は Linear light）[web:457]
     canvas = Image.new("RGB", (w, h), (255, 255, 255))
-    im = img.copy()
-    im.thumbnail((w, h))
+    size = thumbnail_size(img.size, (w, h))
+    im = img
+    if size != img.size:
+        im = rgb_u8_to_pil(downsample_rgb_u8_linear(pil_to_rgb_u8(img), size, resample=Image.Resampling.BICUBIC))
     x = (w - im.width) // 2
     y = (h - im.height) // 2
     canvas.paste(im, (x, y))
     return canvas
 
-def render_sheet_2x2(cells: list[SheetCell], cell_w: int, cell_h: int, margin: int = 20) -> Image.Image:
-    if len(cells) != 4:
-        raise ValueError("cells must be 4 items (A-D).")
+def sheet_grid_shape(n: int) -> tuple[int, int]:
+    """
+    候補数 n を並べるグリッド (cols, rows)。4枚までは2x2（2枚なら下段は空き）、6枚は3x2、9枚は3x3。
+    """
+    if n <= 4:
+        return 2, 2
+    if n <= 6:
+        return 3, 2
+    if n <= 9:
+        return 3, 3
+    raise ValueError(f"sheet supports up to 9 candidates, got {n}")
+
+def render_sheet_grid(
+    cells: list[SheetCell], cols: int, rows: int, cell_w: int, cell_h: int, margin: int = 20
+) -> Image.Image:
+    """
+    cells を左上から行優先で並べる（cells は cols * rows 個）。
+    """
+    if len(cells) != cols * rows:
+        raise ValueError(f"cells must be {cols * rows} items ({cols}x{rows}).")
 
-    sheet_w = margin * 3 + cell_w * 2
-    sheet_h = margin * 3 + cell_h * 2
+    sheet_w = margin * (cols + 1) + cell_w * cols
+    sheet_h = margin * (rows + 1) + cell_h * rows
     sheet = Image.new("RGB", (sheet_w, sheet_h), (255, 255, 255))
     draw = ImageDraw.Draw(sheet)
 
     positions = [
-        (margin, margin),
-        (margin * 2 + cell_w, margin),
-        (margin, margin * 2 + cell_h),
-        (margin * 2 + cell_w, margin * 2 + cell_h),
+        (margin + c * (margin + cell_w), margin + r * (margin + cell_h))
+        for r in range(rows)
+        for c in range(cols)
     ]
 
     for cell, (x, y) in zip(cells, positions, strict=True):
@@ -43,3 +64,8 @@ def render_sheet_2x2(cells: list[SheetCell], cell_w: int, cell_h: int, margin: i
         draw.text((x + 10, y + 10), label, fill=(0, 0, 0))  # Pillow標準のテキスト描画 [web:442]
 
     return sheet
+
+def render_sheet_2x2(cells: list[SheetCell], cell_w: int, cell_h: int, margin: int = 20) -> Image.Image:
+    if len(cells) != 4:
+        raise ValueError("cells must be 4 items (A-D).")
+    return render_sheet_grid(cells, cols=2, rows=2, cell_w=cell_w, cell_h=cell_h, margin=margin)
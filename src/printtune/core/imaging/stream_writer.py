@@ -0,0 +1,194 @@
+# src/printtune/core/imaging/stream_writer.py
+"""
+行バンドを順に受け取って書き出すインクリメンタルなPNG/TIFFエンコーダ
+
+画像全体をメモリに持たずに、8bit RGB の PNG（zlibストリーム）/ 非圧縮TIFF（ストリップ）を出力する。
+"""
+from __future__ import annotations
+
+import struct
+import zlib
+from typing import BinaryIO, Literal, Protocol
+
+import numpy as np
+
+StreamFormat = Literal["PNG", "TIFF"]
+
+_PNG_FILTER_ROWS = 32
+
+class StreamWriter(Protocol):
+    def write_rows(self, rows_u8: np.ndarray) -> None:
+        """
+        rows_u8: hxWx3 uint8 を上から順に追記する。
+        """
+        ...
+
+    def close(self) -> None:
+        ...
+
+def _check_rows(rows_u8: np.ndarray, width: int) -> np.ndarray:
+    if rows_u8.dtype != np.uint8 or rows_u8.ndim != 3 or rows_u8.shape[1:] != (width, 3):
+        raise ValueError(f"Expected hx{width}x3 uint8, got {rows_u8.shape} {rows_u8.dtype}")
+    return np.ascontiguousarray(rows_u8)
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+def _paeth_filter(rows: np.ndarray, prev: np.ndarray) -> np.ndarray:
+    # PNG filter type 4 (Paeth) をバンド全体でベクトル化。prev は直前行（先頭行の上）
+    x = rows.reshape(rows.shape[0], -1).astype(np.int16)
+    up = np.empty_like(x)
+    up[0] = prev
+    up[1:] = x[:-1]
+    left = np.zeros_like(x)
+    left[:, 3:] = x[:, :-3]
+    upleft = np.zeros_like(x)
+    upleft[:, 3:] = up[:, :-3]
+
+    p = left + up - upleft
+    pa = np.abs(p - left)
+    pb = np.abs(p - up)
+    pc = np.abs(p - upleft)
+    pred = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upleft))
+
+    out = np.empty((x.shape[0], x.shape[1] + 1), dtype=np.uint8)
+    out[:, 0] = 4
+    out[:, 1:] = (x - pred).astype(np.uint8)
+    return out
+
+class PngStreamWriter:
+    """
+    8bit RGB PNG を行バンド単位で書き出す（IDATはzlibの出力が溜まるごとに分割）。
+    """
+    def __init__(self, fp: BinaryIO, width: int, height: int, compress_level: int = 6) -> None:
+        self._fp = fp
+        self.width = int(width)
+        self.height = int(height)
+        self._rows_written = 0
+        self._prev = np.zeros(self.width * 3, dtype=np.int16)
+        self._z = zlib.compressobj(compress_level)
+        self._pending = bytearray()
+
+        fp.write(b"\x89PNG\r\n\x1a\n")
+        fp.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)))
+
+    def _flush_idat(self, force: bool = False) -> None:
+        if self._pending and (force or len(self._pending) >= (1 << 20)):
+            self._fp.write(_png_chunk(b"IDAT", bytes(self._pending)))
+            self._pending.clear()
+
+    def write_rows(self, rows_u8: np.ndarray) -> None:
+        rows = _check_rows(rows_u8, self.width)
+        if self._rows_written + rows.shape[0] > self.height:
+            raise ValueError("too many rows for PNG height")
+        # フィルタ計算の int16 一時配列が大きくならないよう、少しずつ処理する
+        for y in range(0, rows.shape[0], _PNG_FILTER_ROWS):
+            part = rows[y:y + _PNG_FILTER_ROWS]
+            self._pending += self._z.compress(_paeth_filter(part, self._prev).tobytes())
+            self._prev = part[-1].reshape(-1).astype(np.int16)
+        self._rows_written += rows.shape[0]
+        self._flush_idat()
+
+    def close(self) -> None:
+        if self._rows_written != self.height:
+            raise ValueError(f"PNG expects {self.height} rows, got {self._rows_written}")
+        self._pending += self._z.flush()
+        self._flush_idat(force=True)
+        self._fp.write(_png_chunk(b"IEND", b""))
+
+class TiffStreamWriter:
+    """
+    8bit RGB 非圧縮TIFFをストリップ単位で書き出す（IFDは末尾に置き、close時にヘッダを書き換える）。
+    fp はシーク可能であること。write_rows の行数は最後の呼び出し以外すべて同じにする。
+    """
+    def __init__(self, fp: BinaryIO, width: int, height: int, dpi: int = 72) -> None:
+        self._fp = fp
+        self.width = int(width)
+        self.height = int(height)
+        self._dpi = int(dpi)
+        self._start = fp.tell()
+        self._rows_per_strip: int | None = None
+        self._last_short = False
+        self._offsets: list[int] = []
+        self._counts: list[int] = []
+        self._rows_written = 0
+        fp.write(b"II*\x00" + struct.pack("<I", 0))  # IFDオフセットはclose時に書き換え
+
+    def write_rows(self, rows_u8: np.ndarray) -> None:
+        rows = _check_rows(rows_u8, self.width)
+        n = rows.shape[0]
+        if self._rows_per_strip is None:
+            self._rows_per_strip = n
+        elif self._last_short or n > self._rows_per_strip:
+            raise ValueError("TIFF strips must have equal row counts (except the last)")
+        self._last_short = n < self._rows_per_strip
+        if self._rows_written + n > self.height:
+            raise ValueError("too many rows for TIFF height")
+
+        self._offsets.append(self._fp.tell() - self._start)
+        data = rows.tobytes()
+        self._fp.write(data)
+        self._counts.append(len(data))
+        self._rows_written += n
+
+    def close(self) -> None:
+        if self._rows_written != self.height:
+            raise ValueError(f"TIFF expects {self.height} rows, got {self._rows_written}")
+        fp = self._fp
+        if fp.tell() % 2:
+            fp.write(b"\x00")  # IFDはワード境界に置く
+
+        n_strips = len(self._offsets)
+        extra = bytearray()
+        ifd_pos = fp.tell() - self._start
+        n_entries = 11
+        extra_base = ifd_pos + 2 + 12 * n_entries + 4
+
+        def add_extra(data: bytes) -> int:
+            off = extra_base + len(extra)
+            extra.extend(data)
+            if len(extra) % 2:
+                extra.append(0)
+            return off
+
+        bits_off = add_extra(struct.pack("<3H", 8, 8, 8))
+        if n_strips == 1:
+            offsets_val, counts_val = self._offsets[0], self._counts[0]
+        else:
+            offsets_val = add_extra(struct.pack(f"<{n_strips}I", *self._offsets))
+            counts_val = add_extra(struct.pack(f"<{n_strips}I", *self._counts))
+        res_off = add_extra(struct.pack("<II", self._dpi, 1))
+
+        entries = [
+            (256, 4, 1, self.width),              # ImageWidth
+            (257, 4, 1, self.height),             # ImageLength
+            (258, 3, 3, bits_off),                # BitsPerSample
+            (259, 3, 1, 1),                       # Compression: none
+            (262, 3, 1, 2),                       # Photometric: RGB
+            (273, 4, n_strips, offsets_val),      # StripOffsets
+            (277, 3, 1, 3),                       # SamplesPerPixel
+            (278, 4, 1, self._rows_per_strip or self.height),  # RowsPerStrip
+            (279, 4, n_strips, counts_val),       # StripByteCounts
+            (282, 5, 1, res_off),                 # XResolution
+            (283, 5, 1, res_off),                 # YResolution
+        ]
+        ifd = bytearray(struct.pack("<H", n_entries))
+        for tag, typ, count, value in entries:
+            if typ == 3 and count == 1:
+                ifd += struct.pack("<HHIHH", tag, typ, count, value, 0)
+            else:
+                ifd += struct.pack("<HHII", tag, typ, count, value)
+        ifd += struct.pack("<I", 0)
+        fp.write(bytes(ifd) + bytes(extra))
+
+        end = fp.tell()
+        fp.seek(self._start + 4)
+        fp.write(struct.pack("<I", ifd_pos))
+        fp.seek(end)
+
+def open_stream_writer(fp: BinaryIO, width: int, height: int, fmt: StreamFormat = "PNG") -> StreamWriter:
+    if fmt == "PNG":
+        return PngStreamWriter(fp, width, height)
+    if fmt == "TIFF":
+        return TiffStreamWriter(fp, width, height)
+    raise ValueError(f"unknown stream format: {fmt}")
@@ -0,0 +1,143 @@
+# src/printtune/core/imaging/tiled.py
+"""
+行バンド単位のタイル描画（プリントサイズ画像向け）
+
+parametric_linear の演算はすべて画素ごとなので、バンド同士は干渉しない。
+BandSource から1バンドずつ読み、描画してそのまま StreamWriter へ書くため、
+メモリ使用量は画像サイズによらず「バンド数行分」で一定になる。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+
+from .band_source import BandSource, open_band_source
+from .fused_linear import ScratchPool
+from .globals_adapter import globals_dict_to_params
+from .parametric_linear import GlobalParams
+from .pipeline import (
+    RenderConfig,
+    render_rgb_u8_with_global_params,
+    render_rgb_u16_with_global_params,
+    resolve_workers,
+)
+from .stream_writer import StreamFormat, StreamWriter, open_stream_writer
+
+DEFAULT_BAND_ROWS = 256
+
+# タイル描画の既定設定: 省メモリのfusedエンジン + LUT変換、バンドをCPUコア数で並列描画
+TILED_RENDER_CONFIG = RenderConfig(engine="fused", transfer="lut", workers=0)
+
+def render_band(rows: np.ndarray, params: GlobalParams, cfg: RenderConfig, pool: ScratchPool | None = None) -> np.ndarray:
+    """
+    rows: hxWx3 uint8/uint16 (sRGB)
+    returns: hxWx3 uint8 (sRGB)
+    """
+    if rows.dtype == np.uint16:
+        return render_rgb_u16_with_global_params(rows, params, cfg, pool=pool)
+    return render_rgb_u8_with_global_params(rows, params, cfg, pool=pool)
+
+def render_tiled(
+    source: BandSource,
+    params: GlobalParams,
+    writer: StreamWriter,
+    cfg: RenderConfig | None = None,
+    band_rows: int = DEFAULT_BAND_ROWS,
+) -> None:
+    """
+    source の全行をバンド単位で描画して writer に書き込む（writer.close() は呼び出し側）。
+    cfg.workers > 1 なら複数バンドをスレッドで同時に描画し、書き込みは上から順に行う
+    （同時に保持するバンドは workers*2 個まで）。
+    """
+    cfg = cfg or TILED_RENDER_CONFIG
+    workers = resolve_workers(cfg.workers)
+    single = replace(cfg, workers=1)
+    bands = [(y0, min(source.height, y0 + band_rows)) for y0 in range(0, source.height, band_rows)]
+
+    if workers == 1:
+        pool = ScratchPool()
+        for y0, y1 in bands:
+            writer.write_rows(render_band(source.read_rows(y0, y1), params, single, pool=pool))
+        return
+
+    local = threading.local()
+
+    def work(rows: np.ndarray) -> np.ndarray:
+        pool = getattr(local, "pool", None)
+        if pool is None:
+            pool = local.pool = ScratchPool()
+        return render_band(rows, params, single, pool=pool)
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        for y0, y1 in bands:
+            pending.append(ex.submit(work, source.read_rows(y0, y1)))
+            if len(pending) >= workers * 2:
+                writer.write_rows(pending.popleft().result())
+        while pending:
+            writer.write_rows(pending.popleft().result())
+
+def render_tiled_to_stream(
+    source: BandSource,
+    params: GlobalParams,
+    fp: BinaryIO,
+    fmt: StreamFormat = "PNG",
+    cfg: RenderConfig | None = None,
+    band_rows: int = DEFAULT_BAND_ROWS,
+) -> None:
+    writer = open_stream_writer(fp, source.width, source.height, fmt=fmt)
+    render_tiled(source, params, writer, cfg=cfg, band_rows=band_rows)
+    writer.close()
+
+def render_tiled_to_file(
+    src_path: Path,
+    params: GlobalParams,
+    out_path: Path,
+    cfg: RenderConfig | None = None,
+    band_rows: int = DEFAULT_BAND_ROWS,
+) -> Path:
+    """
+    画像ファイルをタイル描画して PNG/TIFF（拡張子で判定）に書き出す。
+
+    Args:
+        src_path: 入力（非圧縮TIFF/.npy はストリーミング、その他はPILで全体デコード）。
+        params: 適用するパラメータ。
+        out_path: 出力先（.tif/.tiff ならTIFF、それ以外はPNG）。
+        cfg: 描画設定（既定は TILED_RENDER_CONFIG）。
+        band_rows: 1バンドの行数。
+
+    Returns:
+        out_path。
+    """
+    fmt: StreamFormat = "TIFF" if Path(out_path).suffix.lower() in (".tif", ".tiff") else "PNG"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    source = open_band_source(src_path)
+    try:
+        with out_path.open("wb") as f:
+            render_tiled_to_stream(source, params, f, fmt=fmt, cfg=cfg, band_rows=band_rows)
+    finally:
+        source.close()
+    return out_path
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="best_params.json を大判画像にタイル描画で適用する")
+    ap.add_argument("src", type=Path)
+    ap.add_argument("out", type=Path)
+    ap.add_argument("--params", type=Path, required=True, help="best_params.json")
+    ap.add_argument("--band-rows", type=int, default=DEFAULT_BAND_ROWS)
+    args = ap.parse_args(argv)
+
+    with args.params.open("r", encoding="utf-8") as f:
+        params = globals_dict_to_params(json.load(f))
+    render_tiled_to_file(args.src, params, args.out, band_rows=args.band_rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# src/printtune/core/io/gp_state_store.py
+"""
+学習済み PairwiseGP の状態を session_dir/gp_state.pt に保存・復元する
+
+保存するのはテンソルと基本型だけ（torch.load(weights_only=True) で読める形）。
+データのフィンガープリントが一致すれば学習をやり直さずにモデルを組み立て直せる。
+"""
+from __future__ import annotations
+
+import os
+import pickle
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import torch
+
+GP_STATE_VERSION = 1
+
+@dataclass(frozen=True)
+class GPState:
+    fingerprint: str                     # train_X / train_comp のダイジェスト（model_cache.data_fingerprint）
+    train_X: torch.Tensor                # (n, d) float64
+    train_comp: torch.Tensor             # (m, 2) long
+    m_tuned: int                         # ハイパーパラメータを最適化した時点の比較数
+    model_state: dict[str, torch.Tensor] # PairwiseGP.state_dict()（カーネル・入力変換の統計を含む）
+    utility: torch.Tensor                # (n',) Laplace近似のMAP効用（重複統合後の候補ごと）
+
+def save_gp_state(path: Path, state: GPState) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "version": GP_STATE_VERSION,
+        "fingerprint": state.fingerprint,
+        "train_X": state.train_X.detach().cpu(),
+        "train_comp": state.train_comp.detach().cpu(),
+        "m_tuned": int(state.m_tuned),
+        "model_state": {k: v.detach().cpu() for k, v in state.model_state.items()},
+        "utility": state.utility.detach().cpu(),
+    }
+    # 書き込み途中のファイルを読まないよう、一時ファイルに書いてから置き換える
+    # （同じセッションの別データのモデルが並行して保存されることがあるので、一時ファイル名は書き手ごとに分ける）
+    fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=path.parent)
+    tmp = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            torch.save(payload, f)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+def load_gp_state(path: Path) -> GPState | None:
+    """
+    保存済みの状態を読む。ファイルが無い・壊れている・形式が古い場合は None。
+    """
+    if not path.exists():
+        return None
+    try:
+        d = torch.load(path, map_location="cpu", weights_only=True)
+    except (OSError, RuntimeError, EOFError, pickle.UnpicklingError):
+        return None
+    if not isinstance(d, dict) or d.get("version") != GP_STATE_VERSION:
+        return None
+    return GPState(
+        fingerprint=str(d["fingerprint"]),
+        train_X=d["train_X"],
+        train_comp=d["train_comp"],
+        m_tuned=int(d["m_tuned"]),
+        model_state=dict(d["model_state"]),
+        utility=d["utility"],
+    )
@@ -18,5 +18,20 @@ def session_json_path(session_id: str) -> Path:
 def artifacts_dir(session_id: str) -> Path:
     return session_dir(session_id) / "artifacts"
 
+def render_cache_dir(session_id: str) -> Path:
+    return artifacts_dir(session_id) / "render_cache"
+
+def shared_render_cache_dir() -> Path:
+    # セッションに紐づかない描画（セッション未開始の Final Print など）の保存先
+    return REPO_ROOT / "data" / "output" / "render_cache"
+
+def gp_state_path(session_id: str) -> Path:
+    return session_dir(session_id) / "gp_state.pt"
+
 def best_params_json_path(session_id: str) -> Path:
     return session_dir(session_id) / "best_params.json"
+
+CATALOG_FILENAME = "catalog.sqlite"
+
+def session_catalog_path() -> Path:
+    return sessions_root_dir() / CATALOG_FILENAME
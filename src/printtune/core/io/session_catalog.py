@@ -0,0 +1,464 @@
+# src/printtune/core/io/session_catalog.py
+"""
+セッションの検索用カタログ（SQLite, sessions_root_dir()/catalog.sqlite）
+
+セッションの正本は各セッションディレクトリの snapshot / ジャーナル（session_store）で、
+カタログはそこから作る索引にすぎない（消しても backfill で作り直せる）。
+- sessions:    セッションごとの要約（meta の printer / paper、ラウンド数、chosen 判定の数など）
+- rounds:      ラウンドごとの purpose と判定
+- candidates:  候補ごとの PARAM_KEYS_V1 の値（global_index は comparisons_global の添字）
+- comparisons: comparisons_global（winner / loser は candidates.global_index）
+
+session_store.save_session が保存のたびに（セッションのファイルロックを放した後で）更新する。
+ジャーナルに追記したときはそのイベントだけを反映し、カタログが知っている seq と合わなければ
+（更新に失敗した・backfill 前など）セッションごと入れ直す。
+別プロセスの保存と更新の順序が入れ替わることがあるので、カタログにある version より古い session は反映しない。
+
+使い方:
+    python -m printtune.core.io.session_catalog backfill
+    python -m printtune.core.io.session_catalog sessions --printer PX-S1000 --judgment chosen
+    python -m printtune.core.io.session_catalog near --params '{"exposure_stops": 0.1, "temp": 0.5}' --radius 0.25
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Mapping, Optional
+
+from ..log_types import SessionRecord
+from ..optimizer.param_space_v1 import PARAM_KEYS_V1, default_globals_v1
+
+CATALOG_SCHEMA_VERSION = 2
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    sample_image_relpath TEXT NOT NULL,
+    printer TEXT,
+    paper TEXT,
+    meta_json TEXT NOT NULL,
+    n_rounds INTEGER NOT NULL,
+    n_candidates INTEGER NOT NULL,
+    n_comparisons INTEGER NOT NULL,
+    n_chosen INTEGER NOT NULL,
+    seq INTEGER,
+    indexed_at REAL NOT NULL,
+    version INTEGER
+);
+CREATE INDEX IF NOT EXISTS sessions_printer ON sessions (printer, paper);
+CREATE INDEX IF NOT EXISTS sessions_paper ON sessions (paper);
+
+CREATE TABLE IF NOT EXISTS rounds (
+    session_id TEXT NOT NULL,
+    round_index INTEGER NOT NULL,
+    round_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    mode TEXT,
+    purpose TEXT,
+    judgment_kind TEXT,
+    chosen_slot TEXT,
+    rubric TEXT,
+    judged_at TEXT,
+    PRIMARY KEY (session_id, round_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rounds_judgment ON rounds (judgment_kind, session_id);
+
+CREATE TABLE IF NOT EXISTS candidates (
+    session_id TEXT NOT NULL,
+    global_index INTEGER NOT NULL,
+    round_index INTEGER NOT NULL,
+    slot TEXT NOT NULL,
+    candidate_id TEXT NOT NULL,
+    {", ".join(f"{k} REAL" for k in PARAM_KEYS_V1)},
+    PRIMARY KEY (session_id, global_index)
+) WITHOUT ROWID;
+{"".join(f"CREATE INDEX IF NOT EXISTS candidates_{k} ON candidates ({k});" + chr(10) for k in PARAM_KEYS_V1)}
+CREATE TABLE IF NOT EXISTS comparisons (
+    session_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    winner INTEGER NOT NULL,
+    loser INTEGER NOT NULL,
+    PRIMARY KEY (session_id, idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS comparisons_winner ON comparisons (session_id, winner);
+CREATE INDEX IF NOT EXISTS comparisons_loser ON comparisons (session_id, loser);
+"""
+
+@dataclass(frozen=True)
+class CatalogSession:
+    session_id: str
+    created_at: str
+    printer: Optional[str]
+    paper: Optional[str]
+    n_rounds: int
+    n_comparisons: int
+    n_chosen: int
+
+@dataclass(frozen=True)
+class CatalogComparison:
+    session_id: str
+    idx: int                     # comparisons_global の添字
+    winner: dict[str, float]
+    loser: dict[str, float]
+    distance: float              # winner / loser の近い方と x の距離（radius 単位の最大値ノルム）
+
+def _candidate_rows(session: SessionRecord, first_round: int = 0) -> list[tuple]:
+    """
+    rounds[first_round:] の候補の行。
+    """
+    offset = sum(len(rr.candidates) for rr in session.rounds[:first_round])
+    rows = []
+    for rr in session.rounds[first_round:]:
+        for c in rr.candidates:
+            g = c.params["globals"]
+            rows.append((
+                session.session_id, offset, rr.round_index, c.slot, c.candidate_id,
+                *(float(g[k]) for k in PARAM_KEYS_V1),
+            ))
+            offset += 1
+    return rows
+
+def _round_row(session_id: str, rr_d: Mapping[str, Any]) -> tuple:
+    j = rr_d.get("judgment") or {}
+    return (
+        session_id, int(rr_d["round_index"]), rr_d["round_id"], rr_d["created_at"],
+        rr_d.get("mode"), rr_d.get("purpose"),
+        j.get("kind"), j.get("chosen_slot"), j.get("rubric", rr_d.get("rubric")), j.get("at"),
+    )
+
+class SessionCatalog:
+    """
+    1つの SQLite ファイルへの接続。スレッドセーフ（接続を1本だけ持ち、ロックで直列化する）。
+    複数プロセスからは WAL モードで読み書きする。
+    """
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            # v1 のカタログには sessions.version が無い（後から足した列は末尾に付くので新規作成と同じ並びになる）
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+            if "version" not in columns:
+                self._conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER")
+            self._conn.execute(f"PRAGMA user_version={CATALOG_SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- 更新 ---
+
+    def _update_summary(self, session: SessionRecord, seq: Optional[int]) -> None:
+        n_chosen = self._conn.execute(
+            "SELECT COUNT(*) FROM rounds WHERE session_id = ? AND judgment_kind = 'chosen'",
+            (session.session_id,),
+        ).fetchone()[0]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                session.session_id, session.created_at, session.sample_image_relpath,
+                session.meta.get("printer"), session.meta.get("paper"),
+                json.dumps(session.meta, ensure_ascii=False),
+                len(session.rounds), sum(len(rr.candidates) for rr in session.rounds),
+                len(session.comparisons_global), int(n_chosen), seq, time.time(), int(session.version),
+            ),
+        )
+
+    def _is_stale(self, session: SessionRecord, indexed_version: Optional[int]) -> bool:
+        # カタログに既に新しい版が入っている（保存の後のカタログ更新が追い越された）
+        return indexed_version is not None and session.version < indexed_version
+
+    def _indexed_version(self, session_id: str) -> Optional[int]:
+        row = self._conn.execute("SELECT version FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def _index_session(self, session: SessionRecord, seq: Optional[int]) -> None:
+        sid = session.session_id
+        for table in ("rounds", "candidates", "comparisons"):
+            self._conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (sid,))
+        self._conn.executemany(
+            "INSERT INTO rounds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [_round_row(sid, rr.__dict__) for rr in session.rounds],
+        )
+        self._conn.executemany(
+            f"INSERT INTO candidates VALUES (?, ?, ?, ?, ?, {', '.join('?' for _ in PARAM_KEYS_V1)})",
+            _candidate_rows(session),
+        )
+        self._conn.executemany(
+            "INSERT INTO comparisons VALUES (?, ?, ?, ?)",
+            [(sid, i, int(w), int(l)) for i, (w, l) in enumerate(session.comparisons_global)],
+        )
+        self._update_summary(session, seq)
+
+    def index_session(self, session: SessionRecord, seq: Optional[int] = None) -> None:
+        """
+        セッションの行をすべて入れ直す。seq は session_store のイベント番号（不明なら None）。
+        カタログに session より新しい版が入っていれば何もしない。
+        """
+        with self._lock, self._conn:
+            if self._is_stale(session, self._indexed_version(session.session_id)):
+                return
+            self._index_session(session, seq)
+
+    def index_sessions(self, sessions: Iterable[SessionRecord]) -> int:
+        """
+        まとめて入れ直す（1トランザクション）。Returns: 件数。
+        """
+        n = 0
+        with self._lock, self._conn:
+            for session in sessions:
+                if self._is_stale(session, self._indexed_version(session.session_id)):
+                    continue
+                self._index_session(session, None)
+                n += 1
+        return n
+
+    def record_events(
+        self,
+        session: SessionRecord,
+        events: list[dict[str, Any]],
+        from_seq: int,
+        to_seq: int,
+    ) -> None:
+        """
+        session_store がジャーナルに追記したイベントを反映する。
+
+        Args:
+            session: イベント適用後のセッション。
+            events: session_store.session_events の結果。
+            from_seq: 追記前のイベント番号（カタログの seq と違えばセッションごと入れ直す）。
+            to_seq: 追記後のイベント番号。
+        """
+        sid = session.session_id
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT seq, version FROM sessions WHERE session_id = ?", (sid,)).fetchone()
+            if row is not None and self._is_stale(session, row[1]):
+                return
+            if row is None or row[0] != from_seq:
+                self._index_session(session, to_seq)
+                return
+
+            new_rounds = [ev["round"] for ev in events if ev["type"] == "round"]
+            added = [p for ev in events for p in ev.get("comparisons", [])]
+            for ev in events:
+                if ev["type"] == "judgment":
+                    j = ev["judgment"] or {}
+                    self._conn.execute(
+                        "UPDATE rounds SET judgment_kind = ?, chosen_slot = ?, rubric = COALESCE(?, rubric), judged_at = ? "
+                        "WHERE session_id = ? AND round_index = ?",
+                        (j.get("kind"), j.get("chosen_slot"), j.get("rubric"), j.get("at"), sid, int(ev["round_index"])),
+                    )
+            if new_rounds:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO rounds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [_round_row(sid, rr) for rr in new_rounds],
+                )
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO candidates VALUES (?, ?, ?, ?, ?, {', '.join('?' for _ in PARAM_KEYS_V1)})",
+                    _candidate_rows(session, first_round=len(session.rounds) - len(new_rounds)),
+                )
+            if added:
+                start = len(session.comparisons_global) - len(added)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO comparisons VALUES (?, ?, ?, ?)",
+                    [(sid, start + k, int(w), int(l)) for k, (w, l) in enumerate(added)],
+                )
+            self._update_summary(session, to_seq)
+
+    def remove_session(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            for table in ("sessions", "rounds", "candidates", "comparisons"):
+                self._conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+
+    # --- 検索 ---
+
+    def find_sessions(
+        self,
+        printer: Optional[str] = None,
+        paper: Optional[str] = None,
+        judgment_kind: Optional[str] = None,
+        limit: int = 100,
+    ) -> list[CatalogSession]:
+        """
+        条件に合うセッション（新しい順）。judgment_kind を指定するとその判定を含むセッションに絞る。
+        """
+        where, args = [], []
+        if printer is not None:
+            where.append("s.printer = ?")
+            args.append(printer)
+        if paper is not None:
+            where.append("s.paper = ?")
+            args.append(paper)
+        if judgment_kind is not None:
+            where.append("EXISTS (SELECT 1 FROM rounds r WHERE r.judgment_kind = ? AND r.session_id = s.session_id)")
+            args.append(judgment_kind)
+        sql = (
+            "SELECT session_id, created_at, printer, paper, n_rounds, n_comparisons, n_chosen FROM sessions s"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY created_at DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, (*args, int(limit))).fetchall()
+        return [CatalogSession(*r) for r in rows]
+
+    def comparisons_near(
+        self,
+        params: Mapping[str, float],
+        radius: float | Mapping[str, float],
+        printer: Optional[str] = None,
+        paper: Optional[str] = None,
+        limit: int = 100,
+    ) -> list[CatalogComparison]:
+        """
+        winner か loser が params の近く（各軸 |Δ| <= radius の箱の中）にある比較を、近い順に返す。
+
+        Args:
+            params: PARAM_KEYS_V1 の値（足りないキーは default_globals_v1 の値）。
+            radius: 軸ごとの半径（数値なら全軸共通）。
+            printer / paper: セッションの meta で絞る。
+            limit: 最大件数。
+        """
+        base = default_globals_v1()
+        x = {k: float(params.get(k, base[k])) for k in PARAM_KEYS_V1}
+        r = {k: float(radius[k] if isinstance(radius, Mapping) else radius) for k in PARAM_KEYS_V1}
+        box = " AND ".join(f"c.{k} BETWEEN ? AND ?" for k in PARAM_KEYS_V1)
+        box_args = [v for k in PARAM_KEYS_V1 for v in (x[k] - r[k], x[k] + r[k])]
+        where, args = [], []
+        if printer is not None:
+            where.append("s.printer = ?")
+            args.append(printer)
+        if paper is not None:
+            where.append("s.paper = ?")
+            args.append(paper)
+        session_filter = (
+            " AND c.session_id IN (SELECT s.session_id FROM sessions s WHERE " + " AND ".join(where) + ")"
+            if where else ""
+        )
+        # 箱の中の候補を（軸ごとの索引で）先に絞り、winner / loser の索引でその候補を含む比較を引く
+        sql = f"""
+            WITH near AS (
+                SELECT c.session_id, c.global_index FROM candidates c WHERE {box}{session_filter}
+            ), hits AS (
+                SELECT cmp.session_id, cmp.idx FROM near n
+                JOIN comparisons cmp ON cmp.session_id = n.session_id AND cmp.winner = n.global_index
+                UNION
+                SELECT cmp.session_id, cmp.idx FROM near n
+                JOIN comparisons cmp ON cmp.session_id = n.session_id AND cmp.loser = n.global_index
+            )
+            SELECT cmp.session_id, cmp.idx,
+                   {", ".join(f"w.{k}" for k in PARAM_KEYS_V1)},
+                   {", ".join(f"l.{k}" for k in PARAM_KEYS_V1)}
+            FROM hits h
+            JOIN comparisons cmp ON cmp.session_id = h.session_id AND cmp.idx = h.idx
+            JOIN candidates w ON w.session_id = cmp.session_id AND w.global_index = cmp.winner
+            JOIN candidates l ON l.session_id = cmp.session_id AND l.global_index = cmp.loser
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, (*box_args, *args)).fetchall()
+
+        d = len(PARAM_KEYS_V1)
+
+        def dist(v: dict[str, float]) -> float:
+            return max(abs(v[k] - x[k]) / r[k] if r[k] > 0 else (0.0 if v[k] == x[k] else float("inf")) for k in PARAM_KEYS_V1)
+
+        out = []
+        for row in rows:
+            w = dict(zip(PARAM_KEYS_V1, row[2:2 + d]))
+            l = dict(zip(PARAM_KEYS_V1, row[2 + d:]))
+            out.append(CatalogComparison(session_id=row[0], idx=row[1], winner=w, loser=l, distance=min(dist(w), dist(l))))
+        out.sort(key=lambda c: (c.distance, c.session_id, c.idx))
+        return out[:limit]
+
+_CATALOGS: dict[Path, SessionCatalog] = {}
+_CATALOGS_LOCK = threading.Lock()
+
+def open_catalog(db_path: Path) -> SessionCatalog:
+    """
+    db_path ごとにプロセスで1つの SessionCatalog を返す。
+    """
+    db_path = Path(db_path).resolve()
+    with _CATALOGS_LOCK:
+        cat = _CATALOGS.get(db_path)
+        if cat is None:
+            cat = _CATALOGS[db_path] = SessionCatalog(db_path)
+        return cat
+
+def backfill(root: Path, catalog: SessionCatalog, batch: int = 200) -> int:
+    """
+    root 以下のセッションディレクトリをすべて読み、カタログに入れ直す。
+    従来の session.json だけのセッションは、読み込みの際に snapshot へ取り込まれる。
+
+    Returns:
+        入れ直したセッション数。
+    """
+    from .session_store import load_session, session_stamp
+
+    def sessions() -> Iterable[SessionRecord]:
+        for d in sorted(p for p in Path(root).iterdir() if p.is_dir()):
+            path = d / "session.json"
+            if session_stamp(path) is not None:
+                yield load_session(path)
+
+    n = 0
+    buf: list[SessionRecord] = []
+    for s in sessions():
+        buf.append(s)
+        if len(buf) >= batch:
+            n += catalog.index_sessions(buf)
+            buf = []
+    if buf:
+        n += catalog.index_sessions(buf)
+    return n
+
+def main() -> None:
+    from .paths import session_catalog_path, sessions_root_dir
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", type=Path, default=None, help="カタログのパス（既定は sessions_root_dir()/catalog.sqlite）")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p_back = sub.add_parser("backfill", help="既存のセッションをすべてカタログに入れ直す")
+    p_back.add_argument("--root", type=Path, default=None, help="セッションのディレクトリ（既定は sessions_root_dir()）")
+    p_sess = sub.add_parser("sessions", help="セッションを検索する")
+    p_sess.add_argument("--printer", default=None)
+    p_sess.add_argument("--paper", default=None)
+    p_sess.add_argument("--judgment", default=None, help="この判定を含むセッション（chosen / undecidable / both_bad）")
+    p_sess.add_argument("--limit", type=int, default=100)
+    p_near = sub.add_parser("near", help="params の近くの候補を含む比較を検索する")
+    p_near.add_argument("--params", required=True, help='JSON（例: {"exposure_stops": 0.1}）')
+    p_near.add_argument("--radius", type=float, default=0.25)
+    p_near.add_argument("--printer", default=None)
+    p_near.add_argument("--paper", default=None)
+    p_near.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args()
+
+    catalog = open_catalog(args.db or session_catalog_path())
+    t0 = time.perf_counter()
+    if args.command == "backfill":
+        root = args.root or sessions_root_dir()
+        n = backfill(root, catalog) if root.exists() else 0
+        print(f"indexed {n} sessions in {time.perf_counter() - t0:.2f}s -> {catalog.db_path}")
+    elif args.command == "sessions":
+        rows = catalog.find_sessions(printer=args.printer, paper=args.paper, judgment_kind=args.judgment, limit=args.limit)
+        for r in rows:
+            print(json.dumps(r.__dict__, ensure_ascii=False))
+        print(f"{len(rows)} sessions ({(time.perf_counter() - t0) * 1e3:.1f} ms)")
+    else:
+        rows = catalog.comparisons_near(
+            json.loads(args.params), args.radius, printer=args.printer, paper=args.paper, limit=args.limit,
+        )
+        for r in rows:
+            print(json.dumps(r.__dict__, ensure_ascii=False))
+        print(f"{len(rows)} comparisons ({(time.perf_counter() - t0) * 1e3:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# src/printtune/core/io/session_repository.py
+"""
+読み込んだ SessionRecord をプロセス内で共有するキャッシュ（全ページ共通）
+
+Streamlit は操作のたびにページのスクリプトを頭から実行し直すので、各ページが load_session を呼ぶと
+同じセッションを何度もファイルから読むことになる。SessionRepository は
+- get: session_store.session_stamp（snapshot / ジャーナルの size と mtime）がキャッシュ時と同じならキャッシュを返す。
+  変わっていれば（他のプロセスやタブが保存した）読み直す
+- save: session_store.save_session に書き込み、その結果（version が進んだもの）をキャッシュする（write-through）。
+  別のタブ・プロセスが先に保存していれば SessionConflictError（usecases.submit_judgment_with_retry が読み直してやり直す）
+SessionRecord は不変なので、同じオブジェクトを複数のページ・スレッドに渡してよい。
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from ..log_types import SessionRecord
+from .paths import session_json_path
+from .session_store import (
+    SessionConflictError,
+    forget_session,
+    load_session_stamped,
+    save_session_stamped,
+    session_stamp,
+)
+
+DEFAULT_MAX_SESSIONS = 64
+
+@dataclass
+class SessionRepositoryStats:
+    hits: int = 0
+    misses: int = 0    # キャッシュに無かった
+    reloads: int = 0   # ファイルが変わっていたので読み直した
+    saves: int = 0
+    conflicts: int = 0
+    evictions: int = 0
+
+@dataclass(frozen=True)
+class _Entry:
+    session: SessionRecord
+    stamp: tuple
+
+class SessionRepository:
+    """
+    session_id -> SessionRecord の LRU。スレッドセーフ。
+    """
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS) -> None:
+        self.max_sessions = int(max_sessions)
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = SessionRepositoryStats()
+
+    def _path(self, session_id: str) -> Path:
+        return session_json_path(session_id)
+
+    def _put(self, session_id: str, entry: _Entry) -> None:
+        # self._lock を持った状態で呼ぶ
+        self._entries[session_id] = entry
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_sessions:
+            evicted, _ = self._entries.popitem(last=False)
+            forget_session(self._path(evicted))
+            self.stats.evictions += 1
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id in self._entries:
+                return True
+        return session_stamp(self._path(session_id)) is not None
+
+    def get(self, session_id: str) -> SessionRecord:
+        """
+        Raises:
+            FileNotFoundError: セッションが保存されていない。
+        """
+        path = self._path(session_id)
+        stamp = session_stamp(path)
+        with self._lock:
+            if stamp is None:
+                self._entries.pop(session_id, None)
+                raise FileNotFoundError(path)
+            entry = self._entries.get(session_id)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(session_id)
+                self.stats.hits += 1
+                return entry.session
+            if entry is None:
+                self.stats.misses += 1
+            else:
+                self.stats.reloads += 1
+        # ファイルの読み込みは（セッションごとのロックを持つ）session_store に任せ、ここのロックの外で行う。
+        # stamp は store がファイルロックの下で読んだ内容と一緒に取ったものを使う（読んだ後に別プロセスが
+        # 保存していたら、古い内容を新しい stamp で覚えてしまうため。従来の session.json の取り込みも反映される）
+        session, stamp = load_session_stamped(path)
+        if stamp is not None:
+            with self._lock:
+                self._put(session_id, _Entry(session=session, stamp=stamp))
+        return session
+
+    def save(self, session: SessionRecord) -> SessionRecord:
+        """
+        Returns:
+            保存した SessionRecord（version が進んだもの）。以後はこちらを使う。
+
+        Raises:
+            SessionConflictError: 読み込んだ後に別のタブ・プロセスが保存していた（キャッシュは捨てる）。
+        """
+        path = self._path(session.session_id)
+        try:
+            saved, stamp = save_session_stamped(path, session)
+        except SessionConflictError:
+            with self._lock:
+                self._entries.pop(session.session_id, None)
+                self.stats.conflicts += 1
+            raise
+        with self._lock:
+            if stamp is not None:
+                self._put(session.session_id, _Entry(session=saved, stamp=stamp))
+            self.stats.saves += 1
+        return saved
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+        forget_session(self._path(session_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            for session_id in self._entries:
+                forget_session(self._path(session_id))
+            self._entries.clear()
+
+@lru_cache(maxsize=1)
+def default_session_repository() -> SessionRepository:
+    """
+    プロセス全体で共有する既定のリポジトリ。
+    """
+    return SessionRepository()
@@ -1,49 +1,431 @@
 # src/printtune/core/io/session_store.py
+"""
+セッションの保存（追記型のジャーナル）
+
+判定やラウンド追加のたびに session.json を丸ごと書き直す代わりに、セッションディレクトリに
+- snapshot.json: ある時点のセッション全体（コンパクトなJSON）と、そこまでに反映したイベント番号 seq
+- journal.jsonl: snapshot 以降の変更（1行1イベント）
+    {"seq":..,"type":"round","round":{...}}                                        ラウンドの追加
+    {"seq":..,"type":"judgment","round_index":..,"judgment":{...},"comparisons":[..]} 判定と、それで増えた比較
+    {"seq":..,"type":"comparisons","comparisons":[..]}                               判定を伴わない比較の追加
+を置く。
+
+- save_session は前回保存した状態との差分だけを追記する。イベントが SNAPSHOT_EVERY 件たまるか、
+  差分で表せない変更（既存ラウンドの候補の書き換え・比較の削除など）があれば snapshot を書き直してジャーナルを空にする
+- load_session は snapshot にジャーナルを順に適用する（seq が snapshot 以下のイベントは反映済みとして飛ばす）。
+  途中で切れた最後の行は無視し、次の追記の前に切り詰める
+- 従来の session.json しかないセッションは load_session がそれを読み、snapshot に取り込む（session.json は消さない）
+
+同じセッションを複数のタブ・オペレーターが扱う場合:
+- SessionRecord.version は保存のたびに1つ進む。save_session は保存されている版が渡された session.version と
+  同じときだけ書き込み（compare-and-swap）、違えば SessionConflictError を送出する（判定を黙って失わない）
+- 書き込みはセッションディレクトリの .lock の排他ロック、読み込みは共有ロックの下で行う（プロセス間）。
+  ロックを持つのは保存・読み込みの間だけで、GP の学習や提案の計算は呼び出し側でロックの外で行う
+- snapshot は一時ファイルに書いて fsync してから置き換える
+
+snapshot には session_index の集計値（"derived"）も入れ、ジャーナルに続きが無ければ読み込み時にそのまま使う。
+
+呼び出し側はこれまでどおり session_json_path(sid) を渡す（ジャーナルは同じディレクトリに置く）。
+保存のたびに、セッションディレクトリの親にある検索用カタログ（session_catalog）も更新する。
+"""
 from __future__ import annotations
 
+import dataclasses
 import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 from ..log_types import SessionRecord, RoundRecord, Candidate
+from ..session_index import attach_index, index_from_dict, session_index
+from .paths import CATALOG_FILENAME
+from .session_catalog import open_catalog
 
-def save_session(path: Path, session: SessionRecord) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        # default=lambda o: o.__dict__ は dataclass のネストに対応しきれない場合があるので
-        # asdict を使うか、慎重に行うのが良いが、現状で保存はできている前提とします。
-        # dataclasses.asdict を使うのが一番安全です。
-        import dataclasses
-        json.dump(dataclasses.asdict(session), f, ensure_ascii=False, indent=2)
+logger = logging.getLogger(__name__)
 
-def load_session(path: Path) -> SessionRecord:
-    with path.open("r", encoding="utf-8") as f:
-        d = json.load(f)
-
-    rounds: list[RoundRecord] = []
-    for rr in d["rounds"]:
-        # Candidateの復元
-        cands = [Candidate(**c) for c in rr["candidates"]]
-        
-        # RoundRecordの復元
-        # JSONに mode/purpose が保存されているはずなので、それを取得
-        # キーがない場合のデフォルト値も念のため指定（過去データ互換）
-        rounds.append(RoundRecord(
-            round_id=rr["round_id"],
-            round_index=int(rr["round_index"]),
-            created_at=rr["created_at"],
-            candidates=cands,
-            judgment=rr.get("judgment"),
-            mode=rr.get("mode", "pairwise"),      # ★ ここを追加
-            purpose=rr.get("purpose", "unknown"), # ★ ここを追加
-            delta_scale=float(rr.get("delta_scale", 1.0)), # ★ ここを追加
-            meta=rr.get("meta", {}),              # ★ ここを追加
-        ))
+SNAPSHOT_FILENAME = "snapshot.json"
+JOURNAL_FILENAME = "journal.jsonl"
+LOCK_FILENAME = ".lock"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_EVERY = 32
+
+def _round_from_dict(rr: dict[str, Any]) -> RoundRecord:
+    # キーがない場合のデフォルト値も指定（過去データ互換）
+    return RoundRecord(
+        round_id=rr["round_id"],
+        round_index=int(rr["round_index"]),
+        created_at=rr["created_at"],
+        candidates=[Candidate(**c) for c in rr["candidates"]],
+        judgment=rr.get("judgment"),
+        mode=rr.get("mode", "pairwise"),
+        purpose=rr.get("purpose", "unknown"),
+        rubric=rr.get("rubric"),
+        delta_scale=float(rr.get("delta_scale", 1.0)),
+        meta=rr.get("meta", {}),
+    )
 
+def _session_from_dict(d: dict[str, Any]) -> SessionRecord:
     return SessionRecord(
         session_id=d["session_id"],
         created_at=d["created_at"],
         sample_image_relpath=d["sample_image_relpath"],
-        rounds=rounds,
+        rounds=[_round_from_dict(rr) for rr in d["rounds"]],
         comparisons_global=d.get("comparisons_global", []),
+        meta=d.get("meta", {}),
+        version=int(d.get("version", 0)),
+    )
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def _snapshot_path(path: Path) -> Path:
+    return path.with_name(SNAPSHOT_FILENAME)
+
+def _journal_path(path: Path) -> Path:
+    return path.with_name(JOURNAL_FILENAME)
+
+def _stat_key(p: Path) -> Optional[tuple[int, int, int]]:
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+@dataclass
+class _Tail:
+    """
+    最後に読み書きした時点の状態（差分を取る基準）。
+    """
+    session: SessionRecord
+    seq: int                    # 最後に反映したイベント番号
+    pending: int                # snapshot 以降のイベント数
+    journal_size: int           # journal.jsonl の有効な長さ（バイト）
+    snapshot_key: Optional[tuple[int, int, int]]
+    journal_key: Optional[tuple[int, int, int]]
+
+_TAILS: dict[Path, _Tail] = {}
+_TAILS_LOCK = threading.Lock()
+_PATH_LOCKS: dict[Path, threading.Lock] = {}
+
+class SessionConflictError(RuntimeError):
+    """
+    保存しようとしたセッションの版が、保存されている版と違う（読み込んだ後に別の誰かが保存した）。
+    """
+    def __init__(self, session_id: str, expected: int, actual: Optional[int]) -> None:
+        super().__init__(f"session {session_id} was updated concurrently (expected version {expected}, found {actual})")
+        self.session_id = session_id
+        self.expected = expected
+        self.actual = actual
+
+def _path_lock(path: Path) -> threading.Lock:
+    # プロセス内はセッションごとのロックで直列化する（別のセッションの保存は待たない）
+    with _TAILS_LOCK:
+        lock = _PATH_LOCKS.get(path)
+        if lock is None:
+            lock = _PATH_LOCKS[path] = threading.Lock()
+        return lock
+
+@contextmanager
+def _file_lock(path: Path, exclusive: bool) -> Iterator[None]:
+    """
+    セッションディレクトリの .lock でプロセス間の排他を取る（読み込みは共有、保存は排他）。
+    """
+    lock_path = path.with_name(LOCK_FILENAME)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        else:  # Windows: 共有ロックが無いので常に排他
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def session_events(prev: SessionRecord, new: SessionRecord) -> Optional[list[dict[str, Any]]]:
+    """
+    prev から new への変更をイベント列（seq なし）で表す。イベントで表せない変更なら None。
+    """
+    if (prev.session_id, prev.created_at, prev.sample_image_relpath, prev.meta) != (
+        new.session_id, new.created_at, new.sample_image_relpath, new.meta
+    ):
+        return None
+    n_prev, n_new = len(prev.rounds), len(new.rounds)
+    m_prev = len(prev.comparisons_global)
+    if n_new < n_prev or len(new.comparisons_global) < m_prev:
+        return None
+    if [list(p) for p in new.comparisons_global[:m_prev]] != [list(p) for p in prev.comparisons_global]:
+        return None
+
+    events: list[dict[str, Any]] = []
+    for a, b in zip(prev.rounds, new.rounds):
+        if a is b or a == b:
+            continue
+        if replace(b, judgment=a.judgment) != a:
+            return None
+        events.append({"type": "judgment", "round_index": b.round_index, "judgment": b.judgment, "comparisons": []})
+
+    added = [list(p) for p in new.comparisons_global[m_prev:]]
+    if added:
+        # 比較は判定で増えるので、判定のイベントがあればそれにまとめる（1回の保存で1行になりやすい）
+        if events:
+            events[-1]["comparisons"] = added
+        else:
+            events.append({"type": "comparisons", "comparisons": added})
+    for rr in new.rounds[n_prev:]:
+        events.append({"type": "round", "round": dataclasses.asdict(rr)})
+    return events
+
+def _apply_events(session: SessionRecord, events: list[dict[str, Any]]) -> SessionRecord:
+    rounds = list(session.rounds)
+    comps = list(session.comparisons_global)
+    version = session.version
+    for ev in events:
+        version = int(ev.get("version", version))
+        t = ev["type"]
+        if t == "round":
+            rounds.append(_round_from_dict(ev["round"]))
+        elif t == "judgment":
+            i = int(ev["round_index"]) - 1
+            rounds[i] = replace(rounds[i], judgment=ev["judgment"])
+            comps.extend(ev.get("comparisons", []))
+        elif t == "comparisons":
+            comps.extend(ev["comparisons"])
+        else:
+            raise ValueError(f"unknown session event: {t}")
+    return replace(session, rounds=rounds, comparisons_global=comps, version=version)
+
+def _write_snapshot(path: Path, session: SessionRecord, seq: int) -> _Tail:
+    snap, journal = _snapshot_path(path), _journal_path(path)
+    snap.parent.mkdir(parents=True, exist_ok=True)
+    # snapshot を置き換えてからジャーナルを空にする（間で落ちても seq で二重適用を避けられる）
+    tmp = snap.with_suffix(snap.suffix + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(_dumps({
+            "version": SNAPSHOT_VERSION,
+            "seq": seq,
+            "session": dataclasses.asdict(session),
+            "derived": session_index(session).to_dict(),
+        }).encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+    tmp.replace(snap)
+    journal.write_bytes(b"")
+    return _Tail(
+        session=session, seq=seq, pending=0, journal_size=0,
+        snapshot_key=_stat_key(snap), journal_key=_stat_key(journal),
+    )
+
+def _replay(path: Path) -> Optional[_Tail]:
+    snap, journal = _snapshot_path(path), _journal_path(path)
+    if not snap.exists():
+        if not path.exists():
+            return None
+        # 従来の session.json を取り込む
+        with path.open("r", encoding="utf-8") as f:
+            session = _session_from_dict(json.load(f))
+        return _write_snapshot(path, session, seq=0)
+
+    d = json.loads(snap.read_text(encoding="utf-8"))
+    if d.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported session snapshot version: {d.get('version')}")
+    seq = int(d["seq"])
+    session = _session_from_dict(d["session"])
+
+    events: list[dict[str, Any]] = []
+    valid = 0
+    pending = 0
+    if journal.exists():
+        data = journal.read_bytes()
+        pos = 0
+        while pos < len(data):
+            end = data.find(b"\n", pos)
+            if end < 0:
+                break  # 書き込み途中で切れた行
+            try:
+                ev = json.loads(data[pos:end])
+            except ValueError:
+                break
+            pos = end + 1
+            valid = pos
+            pending += 1
+            if int(ev["seq"]) > seq:
+                events.append(ev)
+                seq = int(ev["seq"])
+    if events:
+        # 索引（session_index）はイベントを反映した後、必要になったときに作り直す
+        session = _apply_events(session, events)
+    elif "derived" in d:
+        index = index_from_dict(session, d["derived"])
+        if index is not None:
+            attach_index(session, index)
+    return _Tail(
+        session=session,
+        seq=seq, pending=pending, journal_size=valid,
+        snapshot_key=_stat_key(snap), journal_key=_stat_key(journal),
+    )
+
+def _current_tail(path: Path) -> Optional[_Tail]:
+    # このプロセスが最後に読み書きしたときからファイルが変わっていなければ、それを基準にする
+    tail = _TAILS.get(path)
+    if (
+        tail is not None
+        and tail.snapshot_key == _stat_key(_snapshot_path(path))
+        and tail.journal_key == _stat_key(_journal_path(path))
+    ):
+        return tail
+    return _replay(path)
+
+def _update_catalog(
+    path: Path,
+    session: SessionRecord,
+    events: Optional[list[dict[str, Any]]],
+    from_seq: int,
+    to_seq: int,
+) -> None:
+    # カタログは索引なので、更新に失敗しても保存は成功させる（次の更新か backfill で入れ直される）。
+    # 呼ばれるのは保存が確定した後なので、どんな例外（読み取り専用の root での OSError、
+    # globals の無い候補の KeyError など）もここで止める
+    try:
+        catalog = open_catalog(path.parent.parent / CATALOG_FILENAME)
+        if events is None:
+            catalog.index_session(session, seq=to_seq)
+        else:
+            catalog.record_events(session, events, from_seq=from_seq, to_seq=to_seq)
+    except Exception as e:
+        logger.warning("session catalog update failed (%s: %s)", type(e).__name__, e)
+
+def _save_locked(
+    path: Path, session: SessionRecord,
+) -> tuple[SessionRecord, Optional[tuple[Optional[list[dict[str, Any]]], int, int]]]:
+    # save_session の本体（排他ロック保持中に呼ぶ）。Returns: (保存した session, カタログに渡す (events, from_seq, to_seq))
+    tail = _current_tail(path)
+    if tail is not None and tail.session.version != session.version:
+        _TAILS[path] = tail
+        raise SessionConflictError(session.session_id, expected=session.version, actual=tail.session.version)
+    if tail is None and session.version != 0:
+        raise SessionConflictError(session.session_id, expected=session.version, actual=None)
+
+    events = None if tail is None else session_events(tail.session, session)
+    if events is not None and not events:
+        _TAILS[path] = tail
+        return session, None
+    # rounds / comparisons_global は同じリストなので、索引もそのまま引き継ぐ
+    saved = attach_index(replace(session, version=session.version + 1), session_index(session))
+    if tail is None or events is None or tail.pending + len(events) > SNAPSHOT_EVERY:
+        seq = 0 if tail is None else tail.seq
+        _TAILS[path] = _write_snapshot(path, saved, seq=seq)
+        return saved, (None, seq, seq)
+
+    journal = _journal_path(path)
+    seq = tail.seq
+    lines = []
+    for ev in events:
+        seq += 1
+        lines.append(_dumps({"seq": seq, "version": saved.version, **ev}))
+    payload = ("\n".join(lines) + "\n").encode("utf-8")
+    with journal.open("ab") as f:
+        if f.tell() != tail.journal_size:
+            f.truncate(tail.journal_size)  # 途中で切れた行を捨てる
+            f.seek(tail.journal_size)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    _TAILS[path] = _Tail(
+        session=saved, seq=seq, pending=tail.pending + len(events),
+        journal_size=tail.journal_size + len(payload),
+        snapshot_key=tail.snapshot_key, journal_key=_stat_key(journal),
     )
+    return saved, (events, tail.seq, seq)
+
+def save_session(path: Path, session: SessionRecord) -> SessionRecord:
+    """
+    session を保存する（楽観的排他）。
+
+    session.version は読み込んだ時点の版。保存されている版がそれと違えば（別のタブ・オペレーターが先に保存した）
+    何も書かずに SessionConflictError を送出する。呼び出し側は読み直して判定をやり直す。
+
+    カタログの更新はファイルロックを放した後に行う（SQLite の待ち時間でセッションのロックを延ばさない）。
+    別の保存と順序が入れ替わっても、カタログは version の古い内容で上書きしない。
+
+    Returns:
+        保存した SessionRecord（version を1つ進めたもの。変更が無ければ session のまま）。
+
+    Raises:
+        SessionConflictError: 保存されている版が session.version と違う。
+    """
+    return save_session_stamped(path, session)[0]
+
+def save_session_stamped(path: Path, session: SessionRecord) -> tuple[SessionRecord, Optional[tuple]]:
+    """
+    save_session と同じ。保存直後の session_stamp も返す（ファイルロックを持ったまま取るので、
+    他のプロセスがその後に保存していても、返す stamp は返す SessionRecord の内容に対応する）。
+    """
+    path = Path(path)
+    with _path_lock(path), _file_lock(path, exclusive=True):
+        saved, catalog_update = _save_locked(path, session)
+        stamp = session_stamp(path)
+    if catalog_update is not None:
+        _update_catalog(path, saved, *catalog_update)
+    return saved, stamp
+
+def load_session(path: Path) -> SessionRecord:
+    return load_session_stamped(path)[0]
+
+def load_session_stamped(path: Path) -> tuple[SessionRecord, Optional[tuple]]:
+    """
+    load_session と同じ。読んだ内容に対応する session_stamp も返す（ファイルロックを持ったまま取る）。
+    """
+    path = Path(path)
+    with _path_lock(path):
+        tail = _TAILS.get(path)
+        if tail is None or not _snapshot_path(path).exists():
+            # 従来の session.json の取り込みは snapshot を書くので排他ロックで行う
+            lock = _file_lock(path, exclusive=True)
+        else:
+            lock = _file_lock(path, exclusive=False)
+        with lock:
+            tail = _current_tail(path)
+            stamp = session_stamp(path)
+        if tail is None:
+            raise FileNotFoundError(path)
+        _TAILS[path] = tail
+        return tail.session, stamp
+
+def session_exists(path: Path) -> bool:
+    path = Path(path)
+    return _snapshot_path(path).exists() or path.exists()
+
+def session_stamp(path: Path) -> Optional[tuple]:
+    """
+    保存内容が変わると変わる値（snapshot とジャーナル、無ければ従来の session.json の size と mtime）。
+    読み込み結果をキャッシュする側が、読み直しが要るかの判定に使う。セッションが無ければ None。
+    """
+    path = Path(path)
+    snap = _stat_key(_snapshot_path(path))
+    if snap is not None:
+        return ("journal", snap, _stat_key(_journal_path(path)))
+    legacy = _stat_key(path)
+    return None if legacy is None else ("json", legacy)
+
+def forget_session(path: Path) -> None:
+    """
+    差分の基準として保持している状態を捨てる（次の保存・読み込みでファイルから読み直す）。
+    """
+    with _TAILS_LOCK:
+        _TAILS.pop(Path(path), None)
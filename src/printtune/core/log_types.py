@@ -6,7 +6,7 @@ from typing import Literal, Optional
 from datetime import datetime, timezone
 
 JudgmentKind = Literal["chosen", "undecidable", "both_bad"]
-RoundMode = Literal["oa", "pairwise"]
+RoundMode = Literal["oa", "pairwise", "batch"]
 RoundPurpose = Literal["initial_oa", "pairwise_explore", "rejudge", "reprint"]
 
 @dataclass(frozen=True)
@@ -44,6 +44,12 @@ class SessionRecord:
     rounds: list[RoundRecord] = field(default_factory=list)
     comparisons_global: list[list[int]] = field(default_factory=list)
 
+    meta: dict = field(default_factory=dict)
+    # meta例: {"printer": "PX-S1000", "paper": "glossy_a4"}（session_catalog で検索に使う）
+
+    # 保存のたびに1つ進む版（session_store の楽観的排他に使う。保存前の新規セッションは 0）
+    version: int = 0
+
 def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
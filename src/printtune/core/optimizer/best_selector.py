@@ -2,24 +2,25 @@
 from __future__ import annotations
 
 import warnings
+from typing import Literal
 
 import torch
 from ..log_types import SessionRecord
+from ..policy import PREFERENCE_POLICY, PreferencePolicy
+from ..session_index import session_index
 from .param_space_v1 import PARAM_KEYS_V1
 
+BestSearch = Literal["continuous", "observed"]
+
 def extract_last_chosen_globals(session: SessionRecord) -> dict:
     """
     最後に選択された候補のパラメータを返す（estimate_best_paramsのフォールバック用）
     """
-    for rr in reversed(session.rounds):
-        j = rr.judgment or {}
-        if j.get("kind") == "chosen":
-            slot = j["chosen_slot"]
-            for c in rr.candidates:
-                if c.slot == slot:
-                    g = c.params["globals"]
-                    return {k: float(g[k]) for k in PARAM_KEYS_V1}
-                    
+    c = session_index(session).last_chosen_candidate()
+    if c is not None:
+        g = c.params["globals"]
+        return {k: float(g[k]) for k in PARAM_KEYS_V1}
+
     # fallback: last round first candidate
     g = session.rounds[-1].candidates[0].params["globals"]
     return {k: float(g[k]) for k in PARAM_KEYS_V1}
@@ -37,24 +38,28 @@ def has_finalized_best_params(session: SessionRecord) -> bool:
     Returns:
         best_paramsが確定している場合True
     """
-    for rr in session.rounds:
-        j = rr.judgment or {}
-        if j.get("kind") == "chosen":
-            return True
-    return False
+    return session_index(session).count_judgment("chosen") > 0
 
-def estimate_best_params(session: SessionRecord) -> dict[str, float]:
+def estimate_best_params(
+    session: SessionRecord,
+    search: BestSearch = "continuous",
+    preference: PreferencePolicy = PREFERENCE_POLICY,
+    persist: bool = True,
+) -> dict[str, float]:
     """
-    PairwiseGPの事後平均を最大化するパラメータを推定する。
+    選好モデル（PairwiseGP、序盤は policy により Bradley–Terry）の事後平均を最大化するパラメータを推定する。
     
     アプローチ:
-    - 観測済み候補（train_X）の中で事後平均が最大のものを選ぶ
+    - continuous: 探索範囲のSobol点＋勾配ステップで事後平均の最大点を探す（botorch.posterior_best。
+      結果は学習データごとにキャッシュ。観測済み候補の最良を下回ることはない）
+    - observed: 観測済み候補（train_X）の中で事後平均が最大のものを選ぶ
     - データ不足時は extract_last_chosen_globals にフォールバック
     
     注意:
     - chosen判定が存在しない場合、extract_last_chosen_globals()は
       最後のラウンドの最初の候補を返すが、これは「確定したbest」ではない
     - この関数は、chosen判定が存在する場合にのみ呼び出すべき
+    - persist=False なら学習したモデルを gp_state.pt に保存しない（先読みなど、捨てるかもしれない分岐用）
     
     Returns:
         globals形式のパラメータ辞書
@@ -72,17 +77,38 @@ def estimate_best_params(session: SessionRecord) -> dict[str, float]:
     try:
         # 1. データ構築
         from ..botorch.build_data import build_torch_data
-        data = build_torch_data(session)
+        try:
+            data = build_torch_data(session)
+        except ValueError:
+            # 重複候補をまとめると比較が残らない（同じ点どうしの比較だけ）
+            return extract_last_chosen_globals(session)
         
         # 念のため再チェック（build_torch_data内でのデータ処理結果が空の可能性）
         if data.train_X.shape[0] < 2 or data.train_comp.shape[0] < 1:
             return extract_last_chosen_globals(session)
 
-        # 2. GPモデル学習
-        from ..botorch.pairwise_gp_fit import fit_pairwise_gp
-        model = fit_pairwise_gp(data.train_X, data.train_comp)
+        # 2'. 序盤は Bradley–Terry（学習・最大化とも数ミリ秒）
+        if preference.backend_for(data.train_comp.shape[0]) == "bradley_terry":
+            from .bradley_terry import fit_bradley_terry
+            X_np = data.train_X.detach().double().numpy()
+            bt = fit_bradley_terry(X_np, data.train_comp.numpy())
+            # 比較が少ないうちの2次の効用は範囲の端へ外挿しがちなので、search によらず観測済み候補から選ぶ
+            best_X = X_np[int(bt.utility(X_np).argmax())]
+            return {k: float(best_X[i]) for i, k in enumerate(PARAM_KEYS_V1)}
+
+        # 2. GPモデル学習（提案時に同じデータで学習済みならキャッシュを使う）
+        from ..botorch.model_cache import get_or_fit_pairwise_gp
+        from ..io.paths import gp_state_path
+        state_path = gp_state_path(session.session_id) if persist else None
+        model = get_or_fit_pairwise_gp(data.train_X, data.train_comp, state_path=state_path)
         
-        # 3. 事後平均の計算（方法A: 観測済み候補から選ぶ）
+        # 3. 事後平均の最大点
+        if search == "continuous":
+            from ..botorch.posterior_best import cached_posterior_best
+            best_X = cached_posterior_best(model, data.train_X, data.train_comp).x
+            return {k: float(best_X[i].item()) for i, k in enumerate(PARAM_KEYS_V1)}
+
+        # 観測済み候補から選ぶ
         with torch.no_grad():
             posterior = model.posterior(data.train_X)
             mean = posterior.mean
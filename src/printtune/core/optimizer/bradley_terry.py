@@ -0,0 +1,142 @@
+# src/printtune/core/optimizer/bradley_terry.py
+"""
+軽量な選好モデル: 2次の特徴量上の Bradley–Terry（ロジスティック）モデル（NumPyのみ）
+
+u(x) = w · φ(z),  z = (x - Identity) / default_bounds の幅,  φ(z) = [z, z^2, z_i z_j (i<j)]
+P(winner ≻ loser) = σ(u(x_w) - u(x_l))
+
+w は正規事前分布 N(0, prior_var I) の下で MAP をニュートン法で求め、ヘッセ行列から Laplace 近似の共分散を作る。
+比較が少ない序盤は PairwiseGP の Laplace 学習より桁違いに速い（数ミリ秒）。
+どちらを使うかは policy.PREFERENCE_POLICY で決める（auto なら比較数で切り替える）。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .bounds import default_bounds
+from .param_space_v1 import PARAM_KEYS_V1, default_globals_v1
+
+NEWTON_STEPS = 20
+NEWTON_TOL = 1e-8
+
+def _scaling(d: int) -> tuple[np.ndarray, np.ndarray]:
+    lim = default_bounds(d)[1].numpy().astype(np.float64)
+    if d == len(PARAM_KEYS_V1):
+        g = default_globals_v1()
+        origin = np.array([g[k] for k in PARAM_KEYS_V1], dtype=np.float64)
+    else:
+        origin = np.zeros(d, dtype=np.float64)
+    return origin, lim
+
+def quadratic_features(X: np.ndarray) -> np.ndarray:
+    """
+    (n, d) -> (n, 2d + d(d-1)/2)。X は正規化済み（z）。
+    """
+    n, d = X.shape
+    i, j = np.triu_indices(d, k=1)
+    return np.concatenate([X, X * X, X[:, i] * X[:, j]], axis=1)
+
+@dataclass(frozen=True)
+class BradleyTerryModel:
+    w: np.ndarray       # (p,) MAP
+    cov: np.ndarray     # (p, p) Laplace近似の共分散
+    origin: np.ndarray  # (d,) 正規化の原点（Identity）
+    scale: np.ndarray   # (d,) 正規化の幅
+
+    def features(self, X: np.ndarray) -> np.ndarray:
+        return quadratic_features((np.asarray(X, dtype=np.float64) - self.origin) / self.scale)
+
+    def utility(self, X: np.ndarray) -> np.ndarray:
+        """
+        (n, d) -> (n,) 効用の事後平均。
+        """
+        return self.features(X) @ self.w
+
+    def sample_weights(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        (n, p) 事後分布からの w のサンプル。
+        """
+        return rng.multivariate_normal(self.w, self.cov, size=n, method="cholesky")
+
+def fit_bradley_terry(
+    train_X: np.ndarray,
+    train_comp: np.ndarray,
+    prior_var: float = 1.0,
+    newton_steps: int = NEWTON_STEPS,
+) -> BradleyTerryModel:
+    """
+    Args:
+        train_X: (n, d) 候補（globals の並び）。
+        train_comp: (m, 2) 比較（winner, loser）。
+        prior_var: w の事前分散。
+        newton_steps: ニュートン法の反復上限。
+
+    Returns:
+        学習済みモデル。
+    """
+    X = np.asarray(train_X, dtype=np.float64)
+    comp = np.asarray(train_comp, dtype=np.int64).reshape(-1, 2)
+    origin, scale = _scaling(X.shape[1])
+    F = quadratic_features((X - origin) / scale)
+    D = F[comp[:, 0]] - F[comp[:, 1]]  # (m, p)
+    p = F.shape[1]
+    prec = np.eye(p) / float(prior_var)
+
+    w = np.zeros(p)
+    for _ in range(newton_steps):
+        s = 1.0 / (1.0 + np.exp(-(D @ w)))
+        grad = D.T @ (1.0 - s) - prec @ w
+        H = (D * (s * (1.0 - s))[:, None]).T @ D + prec  # 負の対数事後のヘッセ行列
+        step = np.linalg.solve(H, grad)
+        w = w + step
+        if float(step @ step) < NEWTON_TOL:
+            break
+    s = 1.0 / (1.0 + np.exp(-(D @ w)))
+    H = (D * (s * (1.0 - s))[:, None]).T @ D + prec
+    cov = np.linalg.inv(H)
+    return BradleyTerryModel(w=w, cov=0.5 * (cov + cov.T), origin=origin, scale=scale)
+
+def _uniform_in(bounds: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+    lo, hi = bounds[0], bounds[1]
+    return lo + (hi - lo) * rng.random((n, lo.shape[0]))
+
+def maximize_utility(
+    model: BradleyTerryModel,
+    bounds: np.ndarray,
+    train_X: np.ndarray | None = None,
+    n_samples: int = 4096,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    bounds (2, d) 内で事後平均の効用が最大の点（一様乱数の点と観測点から選ぶ）。
+    """
+    rng = np.random.default_rng(seed)
+    C = _uniform_in(np.asarray(bounds, dtype=np.float64), n_samples, rng)
+    if train_X is not None:
+        C = np.concatenate([C, np.asarray(train_X, dtype=np.float64)])
+    return C[int(np.argmax(model.utility(C)))]
+
+def propose_thompson(
+    model: BradleyTerryModel,
+    bounds: np.ndarray,
+    q: int = 2,
+    n_samples: int = 4096,
+    seed: int | None = None,
+) -> np.ndarray:
+    """
+    q 点の提案: 1点目は事後平均の最大点、残りは w の事後サンプル（Thompson sampling）ごとの最大点。
+    同じ点が重なったらそのサンプルの次点を使う。
+
+    Returns:
+        (q, d)
+    """
+    rng = np.random.default_rng(seed)
+    C = _uniform_in(np.asarray(bounds, dtype=np.float64), n_samples, rng)
+    F = model.features(C)
+    chosen = [int(np.argmax(F @ model.w))]
+    for w_k in model.sample_weights(q - 1, rng):
+        order = np.argsort(-(F @ w_k))
+        chosen.append(int(next(i for i in order if i not in chosen)))
+    return C[chosen]
@@ -1,10 +1,66 @@
 # src/printtune/core/policy.py
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import Literal
+
 from .log_types import SessionRecord
+from .session_index import session_index
 
 MAX_REJUDGE = 2
 
+ProposalMode = Literal["default", "fast"]
+
+@dataclass(frozen=True)
+class ProposalPolicy:
+    """
+    次の提案（獲得関数の最適化）の設定。
+
+    - default: optimize_acqf(num_restarts=10, raw_samples=128)
+    - fast: 前ラウンドの提案と事後平均最大の点からウォームスタートし、
+      必要なときだけリスタートを増やす（timeout_sec で打ち切る）
+
+    candidates_per_round: pairwise_explore の1ラウンドの候補数（シート1枚に並べる枚数）。
+      2 なら解析的EUBO（上の mode に従う）、3以上なら qEUBO＋多様性ペナルティ（diversity_weight）。
+      4 にすると2x2シートの空きが無くなり、1回の判定で3つの比較が得られる。
+
+    既定は default。fast は提案の質を convergence_sim で確かめてから使う opt-in
+    （--proposal-mode fast で比較できる。ベンチマークでは常に速いとは限らなかった）。
+    """
+    mode: ProposalMode = "default"
+    timeout_sec: float = 1.0
+    min_restarts: int = 3
+    max_restarts: int = 10
+    raw_samples: int = 64
+    candidates_per_round: int = 2
+    diversity_weight: float = 0.1
+
+PROPOSAL_POLICY = ProposalPolicy()
+
+PreferenceBackend = Literal["gp", "bradley_terry", "auto"]
+
+@dataclass(frozen=True)
+class PreferencePolicy:
+    """
+    選好モデルの選択。
+
+    - gp: 常に PairwiseGP
+    - bradley_terry: 常に2次特徴の Bradley–Terry（optimizer.bradley_terry。数ミリ秒）
+    - auto: 比較が gp_min_comparisons 未満の序盤は Bradley–Terry、以降は PairwiseGP
+
+    既定は gp。convergence_sim では Bradley–Terry の判定あたりの時間は数ミリ秒だが、
+    序盤の best params の ΔE は PairwiseGP より悪かった（--preference-backend で比較できる）。
+    """
+    backend: PreferenceBackend = "gp"
+    gp_min_comparisons: int = 6
+
+    def backend_for(self, n_comparisons: int) -> Literal["gp", "bradley_terry"]:
+        if self.backend == "auto":
+            return "gp" if n_comparisons >= self.gp_min_comparisons else "bradley_terry"
+        return self.backend
+
+PREFERENCE_POLICY = PreferencePolicy()
+
 
 def count_rejudge(session: SessionRecord) -> int:
     """
@@ -14,12 +70,7 @@ def count_rejudge(session: SessionRecord) -> int:
         rejudgeは「微妙な差を何度も判定せず、次に進む」ための制限。
         purpose="rejudge"のRoundではなく、judgment.next_action="rejudge"で数える。
     """
-    count = 0
-    for r in session.rounds:
-        j = r.judgment
-        if j and j.get("kind") == "undecidable" and j.get("next_action") == "rejudge":
-            count += 1
-    return count
+    return session_index(session).n_rejudge
 
 
 def can_rejudge(session: SessionRecord) -> bool:
@@ -0,0 +1,431 @@
+# src/printtune/core/session_index.py
+"""
+セッションから導出する状態の索引（ラウンドの追加・判定のたびに O(1) で更新する）
+
+ラウンドを全部なめ直していた関数（count_rejudge, _count_pairwise_explore, _global_offset_for_round,
+has_finalized_best_params, extract_last_chosen_globals / center, build_torch_data）は、ここの値を読む。
+- 候補の通し番号の起点（ラウンドごとのオフセット）と候補の総数
+- 最後に chosen された候補
+- purpose ごと・判定の種類ごとのラウンド数と、rejudge を選んだ回数
+- GP の学習データ（train_X / train_comp。重複候補をまとめたものと、まとめないもの）
+
+索引は SessionRecord のフィールドではなく、モジュールの表に SessionRecord ごとに弱参照で持つ（等価性・asdict・
+replace・pickle・deepcopy の対象外。replace や deepcopy で作った SessionRecord には引き継がれない）。with_round / with_judgment（session_runner.append_round と apply_judgment_* が使う）
+が新しい SessionRecord と一緒に作り、それ以外の経路で作られた SessionRecord では session_index が作り直す
+（1回だけ O(ラウンド数)）。念のため rounds / comparisons_global のリストの同一性も確かめる。
+
+学習データは最初に要求されたときに作り、以後は追記する。追記先のバッファは版どうしで共有し、各版は先頭の
+自分の長さまでしか見ない。同じ版から2つの版が派生した（先読みで各スロットを chosen にした場合など）ときは、
+後から追記する側がバッファを複製する。
+
+集計値（学習データ以外）は snapshot に保存し（session_store）、読み込み時に作り直さずに使う。
+"""
+from __future__ import annotations
+
+import threading
+import weakref
+from dataclasses import dataclass, field, replace
+from typing import Any, Iterable, Mapping, Optional
+
+import numpy as np
+
+from .log_types import Candidate, RoundRecord, SessionRecord
+from .optimizer.param_space_v1 import PARAM_KEYS_V1
+
+# この桁数で丸めて一致するパラメータベクトルは同じ候補とみなす（build_torch_data の dedupe）
+DEDUPE_DECIMALS = 6
+
+def _candidate_x(c: Candidate) -> list[float]:
+    g = c.params.get("globals")
+    if g is None:
+        raise ValueError("candidate params missing 'globals'")
+    return [float(g[k]) for k in PARAM_KEYS_V1]
+
+def _dedupe_key(x: list[float]) -> tuple[float, ...]:
+    return tuple(round(v, DEDUPE_DECIMALS) + 0.0 for v in x)  # + 0.0 で -0.0 を 0.0 に揃える
+
+class _Tape:
+    """
+    版どうしで共有する追記専用のリスト。各版は (tape, n) で先頭 n 要素だけを見る。
+    """
+    def __init__(self, items: Optional[list] = None) -> None:
+        self.items: list = [] if items is None else items
+        self.lock = threading.Lock()
+
+    def extend(self, n: int, new: Iterable) -> tuple["_Tape", int]:
+        new = list(new)
+        with self.lock:
+            if len(self.items) == n:
+                self.items.extend(new)
+                return self, len(self.items)
+        tape = _Tape(self.items[:n] + new)
+        return tape, len(tape.items)
+
+class _Grow:
+    """
+    行を追記する2次元配列（容量を倍々に増やす）。先頭の行は書き換えない。
+    """
+    def __init__(self, width: int, dtype: Any, rows: Optional[np.ndarray] = None) -> None:
+        n = 0 if rows is None else rows.shape[0]
+        self.buf = np.empty((max(16, 2 * n), width), dtype=dtype)
+        if n:
+            self.buf[:n] = rows
+        self.n = n
+
+    def append(self, row: Iterable) -> None:
+        if self.n == self.buf.shape[0]:
+            buf = np.empty((2 * self.buf.shape[0], self.buf.shape[1]), dtype=self.buf.dtype)
+            buf[: self.n] = self.buf[: self.n]
+            self.buf = buf
+        self.buf[self.n] = row
+        self.n += 1
+
+    def head(self, n: int) -> np.ndarray:
+        return self.buf[:n]
+
+@dataclass(frozen=True)
+class PreferenceArrays:
+    X: np.ndarray                # (n, d) float64
+    comparisons: np.ndarray      # (m, 2) int64
+    candidate_ids: list[str]     # 行 -> candidate_id（dedupe 時は初出の候補）
+    raw_to_unique: list[int]     # 全候補の通し番号 -> 行
+
+class _PrefState:
+    """
+    学習データの構築状態（複数の版で共有する）。
+    """
+    def __init__(self) -> None:
+        d = len(PARAM_KEYS_V1)
+        self.lock = threading.Lock()
+        self.X_raw = _Grow(d, np.float64)
+        self.ids_raw: list[str] = []
+        self.raw_to_unique: list[int] = []
+        self.X_unique = _Grow(d, np.float64)
+        self.ids_unique: list[str] = []
+        self.index_of: dict[tuple[float, ...], int] = {}
+        self.comps_raw = _Grow(2, np.int64)
+        self.comps_unique = _Grow(2, np.int64)
+        self.seen: dict[tuple[int, int], int] = {}
+
+    def counts(self) -> tuple[int, int, int, int]:
+        return self.X_raw.n, self.X_unique.n, self.comps_raw.n, self.comps_unique.n
+
+    def fork(self, view: "_PrefView") -> "_PrefState":
+        # view の長さまでを複製する（他の版が追記した分は捨てる）
+        s = _PrefState()
+        s.X_raw = _Grow(self.X_raw.buf.shape[1], np.float64, self.X_raw.head(view.n_raw))
+        s.ids_raw = self.ids_raw[: view.n_raw]
+        s.raw_to_unique = self.raw_to_unique[: view.n_raw]
+        s.X_unique = _Grow(self.X_unique.buf.shape[1], np.float64, self.X_unique.head(view.n_unique))
+        s.ids_unique = self.ids_unique[: view.n_unique]
+        s.index_of = {k: i for k, i in self.index_of.items() if i < view.n_unique}
+        s.comps_raw = _Grow(2, np.int64, self.comps_raw.head(view.n_comp_raw))
+        s.comps_unique = _Grow(2, np.int64, self.comps_unique.head(view.n_comp_unique))
+        s.seen = {p: i for p, i in self.seen.items() if i < view.n_comp_unique}
+        return s
+
+@dataclass(frozen=True)
+class _PrefView:
+    state: _PrefState
+    n_raw: int = 0
+    n_unique: int = 0
+    n_comp_raw: int = 0
+    n_comp_unique: int = 0
+
+    def _mutable_state(self) -> _PrefState:
+        # 呼び出し側で self.state.lock を持っていること。先端の版ならそのまま、そうでなければ複製
+        if self.state.counts() == (self.n_raw, self.n_unique, self.n_comp_raw, self.n_comp_unique):
+            return self.state
+        return self.state.fork(self)
+
+    def add_candidates(self, cands: Iterable[Candidate]) -> "_PrefView":
+        with self.state.lock:
+            s = self._mutable_state()
+            for c in cands:
+                x = _candidate_x(c)
+                s.X_raw.append(x)
+                s.ids_raw.append(c.candidate_id)
+                key = _dedupe_key(x)
+                i = s.index_of.get(key)
+                if i is None:
+                    i = s.index_of[key] = s.X_unique.n
+                    s.X_unique.append(x)
+                    s.ids_unique.append(c.candidate_id)
+                s.raw_to_unique.append(i)
+            return _PrefView(s, *s.counts())
+
+    def add_comparisons(self, comps: Iterable[Iterable[int]]) -> "_PrefView":
+        # 同じ点どうしの比較と、既出と同じ (winner, loser) の組は dedupe 側では落とす（初出を残す）
+        with self.state.lock:
+            s = self._mutable_state()
+            for w, l in comps:
+                w, l = int(w), int(l)
+                s.comps_raw.append((w, l))
+                pair = (s.raw_to_unique[w], s.raw_to_unique[l])
+                if pair[0] == pair[1] or pair in s.seen:
+                    continue
+                s.seen[pair] = s.comps_unique.n
+                s.comps_unique.append(pair)
+            return _PrefView(s, *s.counts())
+
+    def arrays(self, dedupe: bool) -> PreferenceArrays:
+        s = self.state
+        if dedupe:
+            return PreferenceArrays(
+                X=s.X_unique.head(self.n_unique),
+                comparisons=s.comps_unique.head(self.n_comp_unique),
+                candidate_ids=s.ids_unique[: self.n_unique],
+                raw_to_unique=s.raw_to_unique[: self.n_raw],
+            )
+        return PreferenceArrays(
+            X=s.X_raw.head(self.n_raw),
+            comparisons=s.comps_raw.head(self.n_comp_raw),
+            candidate_ids=s.ids_raw[: self.n_raw],
+            raw_to_unique=list(range(self.n_raw)),
+        )
+
+class _PrefBox:
+    # 版ごとの学習データの置き場（必要になったときに作る）
+    def __init__(self, view: Optional[_PrefView] = None) -> None:
+        self.view = view
+        self.lock = threading.Lock()
+
+@dataclass(frozen=True)
+class SessionIndex:
+    rounds: list[RoundRecord] = field(repr=False)          # 対応する session.rounds（同一オブジェクト）
+    comparisons: list[list[int]] = field(repr=False)       # 対応する session.comparisons_global
+    offsets: _Tape = field(repr=False)                      # ラウンドごとの候補の通し番号の起点
+    n_candidates: int = 0
+    last_chosen: Optional[tuple[int, int]] = None           # (round_index, ラウンド内の候補の位置)
+    purpose_counts: Mapping[str, int] = field(default_factory=dict)
+    judgment_counts: Mapping[str, int] = field(default_factory=dict)
+    n_rejudge: int = 0                                      # undecidable で rejudge を選んだ回数
+    _pref: _PrefBox = field(default_factory=_PrefBox, repr=False)
+
+    @property
+    def n_rounds(self) -> int:
+        return len(self.rounds)
+
+    def round_offset(self, round_index: int) -> int:
+        """
+        round_index（1始まり）の最初の候補の通し番号（comparisons_global の添字の起点）。
+        """
+        if round_index == self.n_rounds + 1:
+            return self.n_candidates
+        return self.offsets.items[round_index - 1]
+
+    def count_purpose(self, purpose: str) -> int:
+        return self.purpose_counts.get(purpose, 0)
+
+    def count_judgment(self, kind: str) -> int:
+        return self.judgment_counts.get(kind, 0)
+
+    def last_chosen_candidate(self) -> Optional[Candidate]:
+        if self.last_chosen is None:
+            return None
+        round_index, pos = self.last_chosen
+        return self.rounds[round_index - 1].candidates[pos]
+
+    def preference_arrays(self, dedupe: bool = True) -> PreferenceArrays:
+        """
+        GP の学習データ（全候補と comparisons_global）。返す配列は読み取り専用として扱うこと。
+        """
+        box = self._pref
+        with box.lock:
+            if box.view is None:
+                view = _PrefView(_PrefState())
+                for rr in self.rounds:
+                    view = view.add_candidates(rr.candidates)
+                box.view = view.add_comparisons(self.comparisons)
+            view = box.view
+        return view.arrays(dedupe)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        snapshot に保存する集計値（学習データは含めない）。
+        """
+        return {
+            "n_rounds": self.n_rounds,
+            "n_comparisons": len(self.comparisons),
+            "n_candidates": self.n_candidates,
+            "offsets": self.offsets.items[: self.n_rounds],
+            "last_chosen": None if self.last_chosen is None else list(self.last_chosen),
+            "purpose_counts": dict(self.purpose_counts),
+            "judgment_counts": dict(self.judgment_counts),
+            "n_rejudge": self.n_rejudge,
+        }
+
+def _judgment_deltas(j: Optional[dict], sign: int, judgment_counts: dict[str, int]) -> int:
+    # judgment_counts を更新し、rejudge の増減を返す
+    if not j:
+        return 0
+    kind = j.get("kind")
+    judgment_counts[kind] = judgment_counts.get(kind, 0) + sign
+    return sign if kind == "undecidable" and j.get("next_action") == "rejudge" else 0
+
+def _chosen_pos(rr: RoundRecord) -> Optional[int]:
+    j = rr.judgment or {}
+    if j.get("kind") != "chosen":
+        return None
+    for pos, c in enumerate(rr.candidates):
+        if c.slot == j["chosen_slot"]:
+            return pos
+    return None
+
+def build_index(session: SessionRecord) -> SessionIndex:
+    """
+    session を全部なめて索引を作る（O(ラウンド数)）。
+    """
+    offsets: list[int] = []
+    n = 0
+    purpose_counts: dict[str, int] = {}
+    judgment_counts: dict[str, int] = {}
+    n_rejudge = 0
+    last_chosen = None
+    for rr in session.rounds:
+        offsets.append(n)
+        n += len(rr.candidates)
+        purpose_counts[rr.purpose] = purpose_counts.get(rr.purpose, 0) + 1
+        n_rejudge += _judgment_deltas(rr.judgment, +1, judgment_counts)
+        pos = _chosen_pos(rr)
+        if pos is not None:
+            last_chosen = (rr.round_index, pos)
+    return SessionIndex(
+        rounds=session.rounds, comparisons=session.comparisons_global,
+        offsets=_Tape(offsets), n_candidates=n, last_chosen=last_chosen,
+        purpose_counts=purpose_counts, judgment_counts=judgment_counts, n_rejudge=n_rejudge,
+    )
+
+def index_from_dict(session: SessionRecord, d: Mapping[str, Any]) -> Optional[SessionIndex]:
+    """
+    to_dict で保存した集計値から索引を戻す。session と数が合わなければ None。
+    """
+    try:
+        if (int(d["n_rounds"]), int(d["n_comparisons"])) != (len(session.rounds), len(session.comparisons_global)):
+            return None
+        offsets = [int(v) for v in d["offsets"]]
+        if len(offsets) != len(session.rounds):
+            return None
+        lc = d.get("last_chosen")
+        return SessionIndex(
+            rounds=session.rounds, comparisons=session.comparisons_global,
+            offsets=_Tape(offsets), n_candidates=int(d["n_candidates"]),
+            last_chosen=None if lc is None else (int(lc[0]), int(lc[1])),
+            purpose_counts={str(k): int(v) for k, v in d["purpose_counts"].items()},
+            judgment_counts={str(k): int(v) for k, v in d["judgment_counts"].items()},
+            n_rejudge=int(d["n_rejudge"]),
+        )
+    except (KeyError, TypeError, ValueError, IndexError):
+        return None
+
+# SessionRecord の id → (弱参照, 索引)。索引はロックを持つので SessionRecord 自体には載せない
+# （載せると pickle / deepcopy できなくなる）。SessionRecord はリストを持ち hash できないので id で引く。
+_INDEXES: dict[int, tuple[weakref.ref, "SessionIndex"]] = {}
+
+def _attach(session: SessionRecord, index: SessionIndex) -> SessionRecord:
+    key = id(session)
+
+    def _drop(ref: weakref.ref, key: int = key) -> None:
+        # session が回収されたら表から消す（同じ id を後から別の SessionRecord が使っていれば消さない）
+        entry = _INDEXES.get(key)
+        if entry is not None and entry[0] is ref:
+            _INDEXES.pop(key, None)
+
+    _INDEXES[key] = (weakref.ref(session, _drop), index)
+    return session
+
+def _lookup(session: SessionRecord) -> Optional[SessionIndex]:
+    entry = _INDEXES.get(id(session))
+    if entry is None or entry[0]() is not session:
+        return None
+    return entry[1]
+
+def attach_index(session: SessionRecord, index: SessionIndex) -> SessionRecord:
+    """
+    index_from_dict などで作った索引を session に載せる（session と対応していなければ何もしない）。
+    """
+    if _is_current(index, session):
+        _attach(session, index)
+    return session
+
+def _is_current(index: Optional[SessionIndex], session: SessionRecord) -> bool:
+    return (
+        index is not None
+        and index.rounds is session.rounds
+        and index.comparisons is session.comparisons_global
+    )
+
+def session_index(session: SessionRecord) -> SessionIndex:
+    """
+    session の索引。載っていない（または別の版のもの）なら作り直して session に載せる。
+    """
+    index = _lookup(session)
+    if _is_current(index, session):
+        return index
+    index = build_index(session)
+    _attach(session, index)
+    return index
+
+def with_round(session: SessionRecord, rr: RoundRecord) -> SessionRecord:
+    """
+    rr を末尾に追加した SessionRecord（索引も更新する）。
+    """
+    index = session_index(session)
+    rounds = list(session.rounds) + [rr]
+    offsets, _ = index.offsets.extend(index.n_rounds, [index.n_candidates])
+    purpose_counts = dict(index.purpose_counts)
+    purpose_counts[rr.purpose] = purpose_counts.get(rr.purpose, 0) + 1
+    judgment_counts = dict(index.judgment_counts)
+    n_rejudge = index.n_rejudge + _judgment_deltas(rr.judgment, +1, judgment_counts)
+    pos = _chosen_pos(rr)
+    last_chosen = (rr.round_index, pos) if pos is not None else index.last_chosen
+
+    pref = index._pref.view
+    return _attach(replace(session, rounds=rounds), SessionIndex(
+        rounds=rounds, comparisons=session.comparisons_global,
+        offsets=offsets, n_candidates=index.n_candidates + len(rr.candidates),
+        last_chosen=last_chosen, purpose_counts=purpose_counts, judgment_counts=judgment_counts,
+        n_rejudge=n_rejudge,
+        _pref=_PrefBox(None if pref is None else pref.add_candidates(rr.candidates)),
+    ))
+
+def with_judgment(
+    session: SessionRecord,
+    round_index: int,
+    judgment: dict,
+    comparisons: Iterable[Iterable[int]] = (),
+) -> SessionRecord:
+    """
+    round_index（1始まり）の判定を judgment にし、comparisons_global に comparisons を足した SessionRecord。
+    """
+    index = session_index(session)
+    rounds = list(session.rounds)
+    old = rounds[round_index - 1]
+    rr = replace(old, judgment=judgment)
+    rounds[round_index - 1] = rr
+    added = [list(p) for p in comparisons]
+    comps = list(session.comparisons_global) + added if added else session.comparisons_global
+
+    judgment_counts = dict(index.judgment_counts)
+    n_rejudge = index.n_rejudge
+    n_rejudge += _judgment_deltas(old.judgment, -1, judgment_counts)
+    n_rejudge += _judgment_deltas(judgment, +1, judgment_counts)
+    pos = _chosen_pos(rr)
+    last_chosen = index.last_chosen
+    if pos is not None and (last_chosen is None or round_index >= last_chosen[0]):
+        last_chosen = (round_index, pos)
+    elif pos is None and last_chosen is not None and last_chosen[0] == round_index:
+        # chosen を取り消した（通常は起きない）: 後ろから探し直す
+        last_chosen = next(
+            ((r.round_index, p) for r in reversed(rounds) if (p := _chosen_pos(r)) is not None), None,
+        )
+
+    pref = index._pref.view
+    if pref is not None and added:
+        pref = pref.add_comparisons(added)
+    return _attach(replace(session, rounds=rounds, comparisons_global=comps), SessionIndex(
+        rounds=rounds, comparisons=comps,
+        offsets=index.offsets, n_candidates=index.n_candidates,
+        last_chosen=last_chosen, purpose_counts=index.purpose_counts, judgment_counts=judgment_counts,
+        n_rejudge=n_rejudge, _pref=_PrefBox(pref),
+    ))
@@ -1,7 +1,6 @@
 # src/printtune/core/session_loop.py
 from __future__ import annotations
 
-from dataclasses import replace
 from typing import Literal, Optional
 
 import random
@@ -10,12 +9,16 @@ from .log_types import SessionRecord, RoundRecord, now_iso
 from .ids import RoundId, SessionId
 from .optimizer.candidate_factory import make_candidates_from_X
 from .optimizer.param_space_v1 import PARAM_KEYS_V1
-from .botorch.update_loop import propose_from_session_for_round, propose_reprint_pair
+from .botorch.update_loop import NextProposal, propose_from_session_for_round, propose_reprint_pair
 from .policy_axes import RUBRIC_TO_PRIORITY_KEYS, schedule_for_round
+from .session_index import session_index, with_round
 
 
 Intent = Literal["pairwise_explore", "reprint"]
 
+# 候補のスロット名（9-up まで）
+SLOTS = ["A", "B", "C", "D", "E", "F", "G", "H", "I"]
+
 def _next_round_index(session: SessionRecord) -> int:
     return len(session.rounds) + 1
 
@@ -23,7 +26,7 @@ def _new_round_id(session: SessionRecord, round_index: int) -> RoundId:
     return RoundId.new(SessionId(session.session_id), round_index=round_index)
 
 def append_round(session: SessionRecord, rr: RoundRecord) -> SessionRecord:
-    return replace(session, rounds=list(session.rounds) + [rr])
+    return with_round(session, rr)
 
 def _extract_x_from_candidate(c) -> list[float]:
     # globals 前提でXを抽出
@@ -34,7 +37,7 @@ def _extract_x_from_candidate(c) -> list[float]:
     return [float(g[k]) for k in PARAM_KEYS_V1]
 
 def _count_pairwise_explore(session: SessionRecord) -> int:
-    return sum(1 for r in session.rounds if r.purpose == "pairwise_explore")
+    return session_index(session).count_purpose("pairwise_explore")
 
 def _phase_round_index_for_intent(session: SessionRecord, intent: str) -> int:
     """
@@ -58,9 +61,12 @@ def make_next_round(
     intent: Intent,
     rubric: Optional[str] = None,
     delta_scale: float = 1.0,
+    proposal: Optional[NextProposal] = None,
 ) -> SessionRecord:
     """
     次のラウンドを作成する主要なエントリーポイント。
+
+    proposal: pairwise_explore で使う提案（speculative で先読みしたもの）。None ならここで計算する。
     """
     # フェーズとしてのラウンド番号（スケジュール進行に使う）と
     # セッション内での通算ラウンド番号を取得
@@ -72,11 +78,13 @@ def make_next_round(
     if intent == "pairwise_explore":
         from .botorch.update_loop import propose_from_session_for_round
         # rubric を考慮したスケジュールに基づいて次候補を提案
-        proposal = propose_from_session_for_round(session, phase_round_index, rubric=rubric)
+        if proposal is None:
+            proposal = propose_from_session_for_round(session, phase_round_index, rubric=rubric)
         
+        n = len(proposal.X_next)
         cands = make_candidates_from_X(
             round_id=rid,
-            slots=["A", "B"],
+            slots=SLOTS[:n],
             X=proposal.X_next
         )
         
@@ -85,7 +93,7 @@ def make_next_round(
             round_index=round_index,
             created_at=now_iso(),
             candidates=cands,
-            mode="pairwise",
+            mode="pairwise" if n == 2 else "batch",
             purpose="pairwise_explore",
             rubric=rubric,
             delta_scale=1.0,
@@ -1,27 +1,35 @@
 # src/printtune/core/session_runner.py
 from __future__ import annotations
 
-from dataclasses import replace
 from pathlib import Path
 from PIL import Image
-from typing import Literal
+from typing import Literal, Optional
 
 from .ids import SessionId, RoundId, CandidateId
 from .log_types import SessionRecord, RoundRecord, Candidate, now_iso
 from .optimizer.oa_initial_design import L4, factors_to_globals
 from .optimizer.candidate_factory import make_candidates_from_X
-from .imaging.sheet_layout import SheetCell, render_sheet_2x2
+from .imaging.sheet_layout import SheetCell, render_sheet_2x2, render_sheet_grid, sheet_grid_shape
 from .imaging.params_adapter import candidate_to_global_params
-from .imaging.pipeline import render_image_with_global_params
+from .imaging.pipeline import RenderConfig
+from .imaging.parallel import render_candidates_rgb_u8
+from .imaging.numpy_io import pil_to_rgb_u8, rgb_u8_to_pil
 from .imaging.transform import apply_simple_transform
-from .imaging.frame import compose_with_evaluation_frame
+from .imaging.frame import compose_with_evaluation_frame_u8
+from .imaging.proxy import make_sheet_proxy
 from .io.paths import artifacts_dir
 from .botorch.dataset import build_comparisons_from_choice
+from .session_index import session_index, with_judgment, with_round
 
 Rebric = Literal["overall", "skin", "neutral_gray", "saturation", "shadows", "highlights"]
 NextAction = Literal["rejudge", "reprint"]
 
-def new_session(sample_image_relpath: str) -> SessionRecord:
+# ラウンドシートの描画設定（判定に使う画像なのでプロキシ時も exactエンジン。行バンドをCPUコア数で並列描画）
+SHEET_RENDER_CONFIG = RenderConfig(workers=0)
+# シートPNGの圧縮レベル（写真主体の画像では 6 と比べてサイズはほぼ同じで、保存は数倍速い）
+SHEET_PNG_COMPRESS_LEVEL = 1
+
+def new_session(sample_image_relpath: str, meta: Optional[dict] = None) -> SessionRecord:
     sid = SessionId.new()
     return SessionRecord(
         session_id=sid.value,
@@ -29,6 +37,7 @@ def new_session(sample_image_relpath: str) -> SessionRecord:
         sample_image_relpath=sample_image_relpath,
         rounds=[],
         comparisons_global=[],
+        meta=dict(meta or {}),
     )
 
 # src/printtune/core/session_runner.py
@@ -83,52 +92,66 @@ def create_round1(session: SessionRecord) -> RoundRecord:
         }}
     )
 
-def render_round_sheet(sample_img: Image.Image, round_rec: RoundRecord, out_dir: Path, use_evaluation_frame: bool = True) -> Path:
+def _round_sheet_cell_size(photo_size: tuple[int, int], cols: int = 2, rows: int = 2) -> tuple[int, int]:
+    return max(400, photo_size[0] // cols), max(400, photo_size[1] // rows)
+
+def render_round_sheet(
+    sample_img: Image.Image,
+    round_rec: RoundRecord,
+    out_dir: Path,
+    use_evaluation_frame: bool = True,
+    cfg: RenderConfig | None = None,
+    use_proxy: bool = False,
+) -> Path:
     """
     Args:
         sample_img: 元の写真
         round_rec: ラウンドレコード
         out_dir: 出力ディレクトリ
         use_evaluation_frame: 評価用フレームを適用するか（デフォルト: True）
+        cfg: 候補の描画設定（デフォルト: SHEET_RENDER_CONFIG）
+        use_proxy: 元写真をセルの画素格子に合わせて縮小してから描画するか（高速。レイアウトは同じで、
+            元解像度との差の許容範囲は tests/test_proxy_sheet.py、速度は benchmarks/bench_proxy_sheet.py で確認する）
     """
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    blank = Image.new("RGB", sample_img.size, (255, 255, 255))
+    cols, rows = sheet_grid_shape(len(round_rec.candidates))
+    cell_w, cell_h = _round_sheet_cell_size(sample_img.size, cols, rows)
+    src_u8 = pil_to_rgb_u8(sample_img)
+    proxy = make_sheet_proxy(src_u8, (cell_w, cell_h), use_evaluation_frame) if use_proxy else None
+    if proxy is not None:
+        src_u8 = proxy.photo_u8
+
+    blank = Image.new("RGB", (cell_w, cell_h), (255, 255, 255))
     cells: list[SheetCell] = []
 
-    for c in round_rec.candidates:
-        gp = candidate_to_global_params(c)
-        img_k = render_image_with_global_params(sample_img, gp)
-        # 評価用フレームを適用
-        if use_evaluation_frame:
-            img_k = compose_with_evaluation_frame(img_k)
+    params_list = [candidate_to_global_params(c) for c in round_rec.candidates]
+    rendered = render_candidates_rgb_u8(src_u8, params_list, cfg or SHEET_RENDER_CONFIG)
+
+    for c, out_u8 in zip(round_rec.candidates, rendered, strict=True):
+        # 評価用フレームを適用（フレームの描画内容はサイズごとにキャッシュされ、全候補で共有）
+        if proxy is not None:
+            out_u8 = proxy.compose(out_u8)
+        elif use_evaluation_frame:
+            out_u8 = compose_with_evaluation_frame_u8(out_u8)
+        img_k = rgb_u8_to_pil(out_u8)
         cells.append(SheetCell(slot=c.slot, candidate_id=c.candidate_id, image=img_k))
 
-    while len(cells) < 4:
+    while len(cells) < cols * rows:
         cells.append(SheetCell(slot="-", candidate_id="blank", image=blank))
 
-    if len(cells) != 4:
-        raise ValueError("round sheet currently supports up to 4 candidates.")
-
-    cell_w = max(400, sample_img.width // 2)
-    cell_h = max(400, sample_img.height // 2)
-
-    sheet = render_sheet_2x2(cells, cell_w=cell_w, cell_h=cell_h, margin=20)
+    sheet = render_sheet_grid(cells, cols=cols, rows=rows, cell_w=cell_w, cell_h=cell_h, margin=20)
     out_path = out_dir / f"round{round_rec.round_index:02d}_sheet.png"
-    sheet.save(out_path, format="PNG")
+    sheet.save(out_path, format="PNG", compress_level=SHEET_PNG_COMPRESS_LEVEL)
     return out_path
 
 
 def _global_offset_for_round(session: SessionRecord, round_index: int) -> int:
     # round_indexは1始まり
-    offset = 0
-    for rr in session.rounds[: round_index - 1]:
-        offset += len(rr.candidates)
-    return offset
+    return session_index(session).round_offset(round_index)
 
 def apply_judgment_chosen(session: SessionRecord, round_index: int, chosen_slot: str) -> SessionRecord:
-    rounds = list(session.rounds)
-    rr = rounds[round_index - 1]
+    rr = session.rounds[round_index - 1]
     slots = [c.slot for c in rr.candidates]
     if chosen_slot not in slots:
         raise ValueError(f"unknown slot: {chosen_slot}")
@@ -139,11 +162,8 @@ def apply_judgment_chosen(session: SessionRecord, round_index: int, chosen_slot:
     offset = _global_offset_for_round(session, round_index=round_index)
     comps_global = [[a + offset, b + offset] for a, b in comps_local]
 
-    rr2 = replace(rr, judgment={"kind": "chosen", "chosen_slot": chosen_slot, "at": now_iso()})
-    rounds[round_index - 1] = rr2
-
-    comps2 = list(session.comparisons_global) + comps_global
-    return replace(session, rounds=rounds, comparisons_global=comps2)
+    judgment = {"kind": "chosen", "chosen_slot": chosen_slot, "at": now_iso()}
+    return with_judgment(session, round_index, judgment, comps_global)
 
 
 def apply_judgment_undecidable(
@@ -152,17 +172,13 @@ def apply_judgment_undecidable(
     rubric: Rubric,
     next_action: NextAction,
 ) -> SessionRecord:
-    rounds = list(session.rounds)
-    rr = rounds[round_index - 1]
-    rr2 = replace(rr, judgment={
+    # comparisons_globalは増やさない
+    return with_judgment(session, round_index, {
         "kind": "undecidable",
         "at": now_iso(),
         "rubric": rubric,
         "next_action": next_action,
     })
-    rounds[round_index - 1] = rr2
-    # comparisons_globalは増やさない
-    return replace(session, rounds=rounds)
 
 
 def apply_judgment_both_bad(
@@ -171,16 +187,12 @@ def apply_judgment_both_bad(
     rubric: Rubric,
     next_action: Literal["reprint"] = "reprint",
 ) -> SessionRecord:
-    rounds = list(session.rounds)
-    rr = rounds[round_index - 1]
-    rr2 = replace(rr, judgment={
+    return with_judgment(session, round_index, {
         "kind": "both_bad",
         "at": now_iso(),
         "rubric": rubric,
         "next_action": next_action,
     })
-    rounds[round_index - 1] = rr2
-    return replace(session, rounds=rounds)
 
 
 def artifacts_path_for_session(session_id: str) -> Path:
@@ -213,13 +225,11 @@ def render_round2_sheet(sample_img: Image.Image, round_rec: RoundRecord, out_dir
         SheetCell(slot="-", candidate_id="blank", image=blank),
     ]
 
-    cell_w = max(400, sample_img.width // 2)
-    cell_h = max(400, sample_img.height // 2)
+    cell_w, cell_h = _round_sheet_cell_size(sample_img.size)
     sheet = render_sheet_2x2(cells, cell_w=cell_w, cell_h=cell_h, margin=20)
     out_path = out_dir / f"round{round_rec.round_index:02d}_sheet.png"
-    sheet.save(out_path, format="PNG")
+    sheet.save(out_path, format="PNG", compress_level=SHEET_PNG_COMPRESS_LEVEL)
     return out_path
 
 def append_round(session: SessionRecord, rr: RoundRecord) -> SessionRecord:
-    rounds2 = list(session.rounds) + [rr]
-    return replace(session, rounds=rounds2)
\ No newline at end of file
+    return with_round(session, rr)
\ No newline at end of file
@@ -0,0 +1,153 @@
+# src/printtune/core/speculative.py
+"""
+判定前に次ラウンドの提案を先読みする（ユーザーが印刷・比較している間にバックグラウンドで計算）
+
+判定の結果として GP の学習と獲得関数の最適化が必要になるのは pairwise_explore に進むとき
+（chosen と undecidable+rejudge）だけで、そのときの比較データは「どのスロットを選んだか」で決まる。
+ラウンドが表示された時点で各スロットを選んだ場合の提案を計算しておき、
+判定が確定したら一致するものを使い、それ以外は捨てる。
+
+- reprint は GP を使わない（直前の候補を動かすだけ）ので先読みしない
+- undecidable+rejudge は rubric が提案の入力に入るので、画面で選ばれている rubric について別に予約する
+  （rubric を切り替えるとその rubric の分も予約される。判定時に使われなかったものは捨てる）
+- 先読みの計算も model_cache を通すので、判定後の best_params 更新も学習済みモデルを使う
+- 先読みの分岐では GP を gp_state.pt に保存しない（捨てた分岐のモデルで上書きしないため）。
+  take で採用した分岐のモデルだけを保存する
+- キーは提案の入力（候補・比較・スケジュール段階・rubric）から作るので、判定が想定と違えば単に外れる
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from .botorch.update_loop import NextProposal, propose_from_session_for_round, save_session_gp_state
+from .log_types import SessionRecord
+from .session_loop import _phase_round_index_for_intent
+from .policy import can_rejudge
+from .session_runner import apply_judgment_chosen, apply_judgment_undecidable
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PrefetchStats:
+    scheduled: int = 0
+    hits: int = 0
+    misses: int = 0
+    discarded: int = 0
+
+def proposal_key(session: SessionRecord, phase_round_index: int, rubric: Optional[str]) -> str:
+    """
+    propose_from_session_for_round の入力のダイジェスト。
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(session.session_id.encode("utf-8"))
+    for rr in session.rounds:
+        for c in rr.candidates:
+            h.update(repr(sorted(c.params["globals"].items())).encode("utf-8"))
+    h.update(repr([list(p) for p in session.comparisons_global]).encode("ascii"))
+    h.update(repr((phase_round_index, rubric)).encode("utf-8"))
+    return h.hexdigest()
+
+def _explore_key(session_after_judgment: SessionRecord, rubric: Optional[str]) -> tuple[str, int]:
+    phase = _phase_round_index_for_intent(session_after_judgment, "pairwise_explore")
+    return proposal_key(session_after_judgment, phase, rubric), phase
+
+class ProposalPrefetcher:
+    """
+    先読みした提案を session_id ごとに保持する。スレッドセーフ。
+    """
+    def __init__(self, max_workers: int = 1) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="printtune-prefetch")
+        # session_id -> {key: future}
+        self._futures: dict[str, dict[str, Future]] = {}
+        self._lock = threading.Lock()
+        self.stats = PrefetchStats()
+
+    def prefetch_round(self, session: SessionRecord, round_index: int, rubric: Optional[str] = None) -> int:
+        """
+        未判定のラウンドについて、各スロットを選んだ場合の提案を予約する（予約済みなら何もしない）。
+
+        rubric が None なら chosen、rubric を渡すと undecidable+rejudge（その rubric で各スロットを選ぶ）
+        の場合を予約する（usecases.submit_judgment_and_maybe_create_next_round と同じ順に判定を適用する）。
+        rejudge の上限に達していて reprint になる場合は予約しない。
+
+        Args:
+            session: 判定前のセッション。
+            round_index: 表示中のラウンド（1始まり）。
+            rubric: undecidable+rejudge で渡す rubric（chosen なら None）。
+
+        Returns:
+            新たに予約した数。
+        """
+        rr = session.rounds[round_index - 1]
+        if rr.judgment is not None:
+            return 0
+        base = session
+        if rubric is not None:
+            base = apply_judgment_undecidable(session, round_index=round_index, rubric=rubric, next_action="rejudge")
+            if not can_rejudge(base):
+                return 0
+        n = 0
+        for c in rr.candidates:
+            judged = apply_judgment_chosen(base, round_index=round_index, chosen_slot=c.slot)
+            key, phase = _explore_key(judged, rubric)
+            with self._lock:
+                futures = self._futures.setdefault(session.session_id, {})
+                if key in futures:
+                    continue
+                futures[key] = self._pool.submit(propose_from_session_for_round, judged, phase, rubric, persist=False)
+                self.stats.scheduled += 1
+            n += 1
+        return n
+
+    def take(self, session_after_judgment: SessionRecord, rubric: Optional[str] = None) -> NextProposal | None:
+        """
+        判定を反映したセッションに対する先読み結果を返す（計算中なら待つ）。
+        同じセッションの他の先読みは捨てる。採用した分岐の学習済み GP は gp_state.pt に保存する。
+
+        Returns:
+            提案。先読みしていない・失敗した場合は None（呼び出し側で同期的に計算する）。
+        """
+        key, _ = _explore_key(session_after_judgment, rubric)
+        with self._lock:
+            futures = self._futures.pop(session_after_judgment.session_id, {})
+            fut = futures.pop(key, None)
+            for other in futures.values():
+                other.cancel()
+            self.stats.discarded += len(futures)
+            if fut is None:
+                self.stats.misses += 1
+                return None
+        try:
+            proposal = fut.result()
+        except Exception as e:
+            logger.warning("speculative proposal failed (%s: %s); computing synchronously", type(e).__name__, e)
+            with self._lock:
+                self.stats.misses += 1
+            return None
+        with self._lock:
+            self.stats.hits += 1
+        save_session_gp_state(session_after_judgment)
+        return proposal
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            futures = self._futures.pop(session_id, {})
+            for fut in futures.values():
+                fut.cancel()
+            self.stats.discarded += len(futures)
+
+_DEFAULT_PREFETCHER: ProposalPrefetcher | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+def default_prefetcher() -> ProposalPrefetcher:
+    # 最初に使われたときにワーカーを作る（import だけではスレッドを立てない）
+    global _DEFAULT_PREFETCHER
+    with _DEFAULT_LOCK:
+        if _DEFAULT_PREFETCHER is None:
+            _DEFAULT_PREFETCHER = ProposalPrefetcher()
+        return _DEFAULT_PREFETCHER
@@ -27,10 +27,15 @@ def display_image_png(img: Image.Image, caption: str = "", width: str = "stretch
     # PNG形式でBytesIOに保存
     buf = io.BytesIO()
     img.save(buf, format="PNG")
-    buf.seek(0)
-    
+    display_png_bytes(buf.getvalue(), caption=caption, width=width, download_filename=download_filename)
+
+def display_png_bytes(data: bytes, caption: str = "", width: str = "stretch", download_filename: str | None = None) -> None:
+    """
+    エンコード済みのPNG（ファイルから読んだバイト列など）をデコードせずに表示する。
+    引数は display_image_png と同じ。
+    """
     # Base64エンコード
-    img_base64 = base64.b64encode(buf.getvalue()).decode()
+    img_base64 = base64.b64encode(data).decode()
     
     # HTMLで表示（PNG形式を保持）
     width_style = f"width: {width}px;" if isinstance(width, (int, float)) else "width: 100%;"
@@ -11,6 +11,9 @@ from .session_runner import (
 )
 from .session_loop import make_next_round
 from .policy import can_rejudge
+from .speculative import ProposalPrefetcher
+from .io.session_repository import SessionRepository
+from .io.session_store import SessionConflictError
 
 
 Kind = Literal["chosen", "undecidable", "both_bad"]
@@ -27,6 +30,7 @@ def submit_judgment_and_maybe_create_next_round(
     rubric: Optional[str] = None,
     next_action: Optional[NextAction] = None,
     delta_scale: float = 1.0,
+    prefetcher: Optional[ProposalPrefetcher] = None,
 ) -> SessionRecord:
     """
     判定をSessionに反映し、必要なら次Roundを生成する。
@@ -39,6 +43,7 @@ def submit_judgment_and_maybe_create_next_round(
         rubric: undecidable/both_badのとき必須。
         next_action: undecidableのとき必須（rejudge/reprint）。
         delta_scale: reprint時の探索幅係数。
+        prefetcher: 次の提案を先読みしている場合に渡す（一致する先読みがあればそれを使う）。
 
     Returns:
         更新後のsession。
@@ -98,11 +103,77 @@ def submit_judgment_and_maybe_create_next_round(
     # 2. 次ラウンド生成 (Next Round Creation)
     # 既に最大ラウンドに達している場合は生成しない
     if len(session.rounds) >= MAX_ROUNDS:
+        if prefetcher is not None:
+            prefetcher.discard(session.session_id)
         return session
 
+    proposal = None
+    if prefetcher is not None:
+        if intent == "pairwise_explore":
+            proposal = prefetcher.take(session, rubric=rubric)
+        else:
+            prefetcher.discard(session.session_id)
+
     return make_next_round(
         session, 
         intent=intent, # type: ignore
         rubric=rubric, 
-        delta_scale=delta_scale
-    )
\ No newline at end of file
+        delta_scale=delta_scale,
+        proposal=proposal,
+    )
+
+def submit_judgment_and_save(
+    repository: SessionRepository,
+    session: SessionRecord,
+    round_index: int,
+    kind: Kind,
+    chosen_slot: Optional[str] = None,
+    rubric: Optional[str] = None,
+    next_action: Optional[NextAction] = None,
+    delta_scale: float = 1.0,
+    prefetcher: Optional[ProposalPrefetcher] = None,
+    max_attempts: int = 3,
+) -> SessionRecord:
+    """
+    判定を反映して次Roundを作り、保存する（同じセッションを複数のタブ・オペレーターが扱う場合の入口）。
+
+    GP の学習・提案の計算は保存のロックの外で行い、保存時に別の誰かが先に保存していた（SessionConflictError）ら
+    最新のセッションを読み直して判定をやり直す。
+
+    Args:
+        repository: 保存先。
+        session: 判定した時点で表示していたセッション。
+        round_index 以降: submit_judgment_and_maybe_create_next_round と同じ。
+        max_attempts: 保存を試みる回数の上限。
+
+    Returns:
+        保存したsession。
+
+    Raises:
+        SessionConflictError: 対象のラウンドが既に別の誰かに判定されていた、または max_attempts 回とも競合した。
+    """
+    if max_attempts < 1:
+        raise ValueError("max_attempts must be >= 1")
+    for attempt in range(max_attempts):
+        if attempt > 0:
+            latest = repository.get(session.session_id)
+            rr = latest.rounds[round_index - 1] if round_index <= len(latest.rounds) else None
+            if rr is None or rr.judgment is not None:
+                # 同じラウンドが先に判定された: やり直すと判定が二重になるので呼び出し側に任せる
+                raise SessionConflictError(session.session_id, expected=session.version, actual=latest.version)
+            session = latest
+        updated = submit_judgment_and_maybe_create_next_round(
+            session,
+            round_index=round_index,
+            kind=kind,
+            chosen_slot=chosen_slot,
+            rubric=rubric,
+            next_action=next_action,
+            delta_scale=delta_scale,
+            prefetcher=prefetcher,
+        )
+        try:
+            return repository.save(updated)
+        except SessionConflictError:
+            if attempt == max_attempts - 1:
+                raise
@@ -0,0 +1,53 @@
+# tests/test_colorspace.py
+"""
+colorspace: LUT版の sRGB 変換が厳密版と一致すること（decode はビット一致、encode は ±1 code 以内）
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from printtune.core.imaging.colorspace import (
+    linear_f32_to_srgb_u8,
+    linear_f32_to_srgb_u8_lut,
+    srgb_u16_to_linear_f32,
+    srgb_u8_to_linear_f32,
+    srgb_u8_to_linear_f32_lut,
+)
+from printtune.core.imaging.parametric_linear import GlobalParams
+from printtune.core.imaging.pipeline import RenderConfig, render_rgb_u8_with_global_params
+
+def _random_u8(h: int = 48, w: int = 64, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+
+def test_decode_lut_is_bit_identical():
+    codes = np.arange(256, dtype=np.uint8)
+    assert np.array_equal(srgb_u8_to_linear_f32_lut(codes), srgb_u8_to_linear_f32(codes))
+
+    img = _random_u8()
+    out = np.empty(img.shape, dtype=np.float32)
+    assert srgb_u8_to_linear_f32_lut(img, out=out) is out
+    assert np.array_equal(out, srgb_u8_to_linear_f32(img))
+
+def test_decode_u16_matches_u8_codes():
+    codes = np.arange(256, dtype=np.uint16) * 257  # 8bit値を16bitに広げたもの
+    np.testing.assert_allclose(
+        srgb_u16_to_linear_f32(codes), srgb_u8_to_linear_f32(np.arange(256, dtype=np.uint8)), rtol=0, atol=1e-6,
+    )
+
+def test_encode_lut_within_one_code():
+    lin = np.concatenate([
+        np.linspace(0.0, 1.0, 1_000_001, dtype=np.float32),
+        np.array([-0.5, -1e-9, 0.0031308, 1.0 + 1e-6, 2.0], dtype=np.float32),  # 範囲外はクリップ
+    ])
+    exact = linear_f32_to_srgb_u8(lin).astype(np.int16)
+    lut = linear_f32_to_srgb_u8_lut(lin).astype(np.int16)
+    diff = np.abs(exact - lut)
+    assert diff.max() <= 1
+    assert (diff != 0).mean() < 0.01
+
+def test_exact_engine_with_lut_transfer_within_one_code():
+    img = _random_u8()
+    params = GlobalParams(exposure_stops=0.3, contrast=1.1, saturation=1.1, temp=2.0, tint=1.0, gamma=0.9)
+    exact = render_rgb_u8_with_global_params(img, params, RenderConfig(transfer="exact"))
+    lut = render_rgb_u8_with_global_params(img, params, RenderConfig(transfer="lut"))
+    assert np.abs(exact.astype(np.int16) - lut.astype(np.int16)).max() <= 1
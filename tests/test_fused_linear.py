@@ -0,0 +1,84 @@
+# tests/test_fused_linear.py
+"""
+fused_linear: in-place の演算列が apply_global_params_linear（段ごとに配列を作る版）と一致すること
+"""
+from __future__ import annotations
+
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from printtune.core.imaging.colorspace import linear_f32_to_srgb_u8, srgb_u8_to_linear_f32
+from printtune.core.imaging.fused_linear import ScratchPool, apply_global_params_linear_inplace
+from printtune.core.imaging.parametric_linear import GlobalParams, apply_global_params_linear
+from printtune.core.imaging.pipeline import RenderConfig, render_rgb_u8_with_global_params
+
+PARAMS = [
+    GlobalParams(),
+    GlobalParams(exposure_stops=0.3, contrast=1.1, saturation=1.1, temp=2.0, tint=1.0, gamma=0.9),
+    GlobalParams(exposure_stops=-0.8, contrast=0.8, saturation=0.7, temp=-3.0, tint=-2.0, gamma=1.2),
+    GlobalParams(exposure_stops=1.5, contrast=1.3),  # saturation / gamma / temp / tint の段は省略される
+    GlobalParams(saturation=1.4, gamma=0.8),
+]
+
+def _random_u8(h: int = 48, w: int = 64, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+
+@pytest.mark.parametrize("params", PARAMS)
+def test_matches_unfused_chain(params):
+    lin = srgb_u8_to_linear_f32(_random_u8())
+    ref = apply_global_params_linear(lin, params)
+    work = lin.copy()
+    out = apply_global_params_linear_inplace(work, params, pool=ScratchPool())
+    assert out is work
+    np.testing.assert_allclose(out, ref, rtol=0, atol=1e-6)
+    assert np.array_equal(linear_f32_to_srgb_u8(out), linear_f32_to_srgb_u8(ref))
+
+@pytest.mark.parametrize("transfer", ["exact", "lut"])
+def test_fused_engine_within_one_code_of_exact(transfer):
+    img = _random_u8()
+    for params in PARAMS:
+        exact = render_rgb_u8_with_global_params(img, params, RenderConfig(engine="exact"))
+        fused = render_rgb_u8_with_global_params(img, params, RenderConfig(engine="fused", transfer=transfer))
+        assert np.abs(exact.astype(np.int16) - fused.astype(np.int16)).max() <= 1
+
+def test_scratch_pool_reuses_buffers():
+    pool = ScratchPool()
+    a = pool.get("y", (4, 5))
+    assert pool.get("y", (4, 5)) is a
+    b = pool.get("y", (6, 5))  # 別 shape なら作り直し、古いものは捨てる
+    assert b is not a and b.shape == (6, 5)
+    assert pool.nbytes == b.nbytes
+
+    lin = srgb_u8_to_linear_f32(_random_u8(4, 5))
+    apply_global_params_linear_inplace(lin, PARAMS[1], pool=pool)
+    n = pool.nbytes
+    apply_global_params_linear_inplace(lin, PARAMS[2], pool=pool)
+    assert pool.nbytes == n
+
+def test_rejects_non_contiguous_or_non_float32():
+    lin = srgb_u8_to_linear_f32(_random_u8())
+    with pytest.raises(ValueError):
+        apply_global_params_linear_inplace(lin.astype(np.float64), PARAMS[1])
+    with pytest.raises(ValueError):
+        apply_global_params_linear_inplace(lin[:, ::2], PARAMS[1])
+
+def test_fused_engine_peak_memory_about_twice_the_input():
+    # 入力(float32) + 輝度 HxW ×2 + 出力(uint8) ≒ float 入力の約2.3倍（段ごとに配列を作る exact は約6倍）
+    img = _random_u8(600, 800)  # LUT 変換のチャンク（一時配列）が無視できる大きさ
+    params = PARAMS[1]
+    float_input = img.size * 4
+
+    def peak(cfg: RenderConfig) -> float:
+        render_rgb_u8_with_global_params(img, params, cfg)  # 表のキャッシュを温める
+        tracemalloc.start()
+        try:
+            render_rgb_u8_with_global_params(img, params, cfg)
+            return tracemalloc.get_traced_memory()[1] / float_input
+        finally:
+            tracemalloc.stop()
+
+    fused = peak(RenderConfig(engine="fused", transfer="lut"))
+    assert fused <= 2.5
+    assert fused < peak(RenderConfig(engine="exact"))
@@ -0,0 +1,51 @@
+# tests/test_lut3d.py
+"""
+lut3d: 3D LUT の出力が厳密なパイプライン（画素ごとの float 演算）と許容差内で一致すること
+"""
+from __future__ import annotations
+
+import warnings
+
+import numpy as np
+import pytest
+
+from printtune.core.imaging.lut3d import lut_accuracy_report, render_rgb_u8_with_lut3d
+from printtune.core.imaging.parametric_linear import GlobalParams
+from printtune.core.imaging.pipeline import RenderConfig, render_rgb_u8_with_global_params
+
+PARAMS = [
+    GlobalParams(exposure_stops=0.3, contrast=1.1, saturation=1.1, temp=2.0, tint=1.0, gamma=0.9),
+    GlobalParams(exposure_stops=-0.8, contrast=0.8, saturation=0.7, temp=-3.0, tint=-2.0, gamma=1.2),
+]
+
+@pytest.mark.parametrize("interpolation", ["trilinear", "tetrahedral"])
+def test_identity_params_are_exact(interpolation):
+    report = lut_accuracy_report(GlobalParams(), size=33, interpolation=interpolation)
+    assert report.max_code_diff == 0
+
+@pytest.mark.parametrize("params", PARAMS)
+@pytest.mark.parametrize("interpolation", ["trilinear", "tetrahedral"])
+def test_default_grid_within_tolerance(params, interpolation):
+    # 64^3 色の格子で、33^3 の LUT は平均 ΔE 0.25・p99 ΔE 2 以内（実測は平均 0.17 以下・p99 1.7 以下）
+    report = lut_accuracy_report(params, size=33, interpolation=interpolation)
+    assert report.n_samples == 64 ** 3
+    assert report.mean_delta_e <= 0.25
+    assert report.p99_delta_e <= 2.0
+
+@pytest.mark.parametrize("interpolation", ["trilinear", "tetrahedral"])
+def test_finer_grid_is_more_accurate(interpolation):
+    coarse = lut_accuracy_report(PARAMS[0], size=33, interpolation=interpolation)
+    fine = lut_accuracy_report(PARAMS[0], size=65, interpolation=interpolation)
+    assert fine.mean_delta_e < coarse.mean_delta_e
+    assert fine.p99_delta_e < coarse.p99_delta_e
+    assert fine.max_code_diff <= coarse.max_code_diff
+
+@pytest.mark.parametrize("interpolation", ["trilinear", "tetrahedral"])
+def test_engine_uses_lut(interpolation):
+    img = np.random.default_rng(0).integers(0, 256, size=(40, 56, 3), dtype=np.uint8)
+    cfg = RenderConfig(engine="lut3d", lut_size=33, lut_interpolation=interpolation)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        out = render_rgb_u8_with_global_params(img, PARAMS[0], cfg)
+    assert out.shape == img.shape and out.dtype == np.uint8
+    assert np.array_equal(out, render_rgb_u8_with_lut3d(img, PARAMS[0], size=33, interpolation=interpolation))
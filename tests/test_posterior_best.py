@@ -0,0 +1,67 @@
+# tests/test_posterior_best.py
+"""
+botorch.posterior_best: 連続探索の結果が観測点の最良を下回らないこと、キャッシュと再計算で結果が変わらないこと
+"""
+from __future__ import annotations
+
+import pytest
+import torch
+
+from printtune.core.botorch import posterior_best
+from printtune.core.botorch.model_cache import PairwiseGPCache
+from printtune.core.botorch.posterior_best import (
+    _posterior_mean,
+    cached_posterior_best,
+    maximize_posterior_mean,
+)
+from printtune.core.optimizer.param_space_v1 import PARAM_KEYS_V1, default_globals_v1
+
+def _preference_data(n: int = 12, seed: int = 0) -> tuple[torch.Tensor, torch.LongTensor]:
+    # 効用 = -|x - target|^2 の決定的な比較（隣り合う候補を比べる）
+    g = torch.Generator().manual_seed(seed)
+    d = len(PARAM_KEYS_V1)
+    origin = torch.tensor([default_globals_v1()[k] for k in PARAM_KEYS_V1], dtype=torch.float64)
+    X = origin + 0.3 * torch.randn(n, d, generator=g, dtype=torch.float64)
+    target = origin + 0.1
+    u = -((X - target) ** 2).sum(-1)
+    comp = [[i, i + 1] if u[i] > u[i + 1] else [i + 1, i] for i in range(n - 1)]
+    return X.float(), torch.tensor(comp, dtype=torch.long)
+
+@pytest.fixture(scope="module")
+def fitted():
+    X, comp = _preference_data()
+    cache = PairwiseGPCache()
+    cache.persist = False
+    return cache.get_or_fit(X, comp), X, comp
+
+def test_never_worse_than_observed_argmax(fitted):
+    model, X, _ = fitted
+    with torch.no_grad():
+        observed_max = float(_posterior_mean(model, X.double()).max())
+    for kwargs in ({}, {"steps": 0}, {"n_samples": 8, "n_refine": 1}):
+        best = maximize_posterior_mean(model, X, **kwargs)
+        assert best.mean >= observed_max
+        with torch.no_grad():
+            assert float(_posterior_mean(model, best.x[None])) == pytest.approx(best.mean, abs=1e-9)
+
+def test_fixed_steps_are_reproducible(fitted):
+    model, X, _ = fitted
+    a = maximize_posterior_mean(model, X)
+    b = maximize_posterior_mean(model, X)
+    assert a.steps == b.steps == posterior_best.DEFAULT_STEPS
+    assert torch.equal(a.x, b.x)
+    assert a.source == b.source
+
+def test_cache_hit_keeps_result(fitted, monkeypatch):
+    model, X, comp = fitted
+    monkeypatch.setattr(posterior_best, "_CACHE", type(posterior_best._CACHE)())
+    first = cached_posterior_best(model, X, comp)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cache miss")
+
+    monkeypatch.setattr(posterior_best, "maximize_posterior_mean", fail)
+    second = cached_posterior_best(model, X, comp)
+    assert second is first
+    # キャッシュしていない計算とも一致する（maximize_posterior_mean はこのモジュールが import した実体）
+    assert torch.equal(second.x, maximize_posterior_mean(model, X).x)
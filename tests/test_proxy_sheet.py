@@ -0,0 +1,53 @@
+# tests/test_proxy_sheet.py
+"""
+imaging.proxy: プロキシ描画したラウンドシートが元解像度のシートと許容差内で一致すること
+（benchmarks/bench_proxy_sheet.py の既定の閾値と同じ）
+"""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from printtune.core.imaging.colorspace import delta_e76_srgb_u8
+from printtune.core.imaging.load import load_image_rgb
+from printtune.core.imaging.numpy_io import pil_to_rgb_u8, rgb_u8_to_pil
+from printtune.core.imaging.proxy import thumbnail_size
+from printtune.core.io.paths import get_sample_image_path
+from printtune.core.session_runner import create_round1, new_session, render_round_sheet
+
+MAX_MEAN_DE = 1.0
+MAX_P99_DE = 5.0
+
+def _synthetic_photo(w: int = 1200, h: int = 800, seed: int = 0) -> Image.Image:
+    # 滑らかなグラデーション + 色ブロック + 弱いノイズ
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    img = np.stack([255 * xx / w, 255 * yy / h, 128 + 100 * np.sin(xx / 97.0) * np.cos(yy / 61.0)], axis=-1)
+    bs = w // 16
+    blocks = rng.integers(0, 256, size=(h // bs + 1, w // bs + 1, 3)).astype(np.float32)
+    img = 0.6 * img + 0.4 * np.repeat(np.repeat(blocks, bs, axis=0), bs, axis=1)[:h, :w]
+    img += rng.normal(0.0, 4.0, size=(h, w, 1)).astype(np.float32)
+    return rgb_u8_to_pil(np.clip(img, 0, 255).astype(np.uint8))
+
+@pytest.mark.parametrize("source", ["synthetic", "sample"])
+def test_proxy_sheet_within_tolerance(source, tmp_path):
+    if source == "sample":
+        if not get_sample_image_path().exists():
+            pytest.skip("sample image not available")
+        img = load_image_rgb(get_sample_image_path())
+    else:
+        img = _synthetic_photo()
+    rr = create_round1(new_session("test"))
+    full = pil_to_rgb_u8(Image.open(render_round_sheet(img, rr, out_dir=tmp_path / "full", use_proxy=False)))
+    proxy = pil_to_rgb_u8(Image.open(render_round_sheet(img, rr, out_dir=tmp_path / "proxy", use_proxy=True)))
+    assert full.shape == proxy.shape
+    de = delta_e76_srgb_u8(full, proxy)
+    assert float(de.mean()) <= MAX_MEAN_DE
+    assert float(np.percentile(de, 99)) <= MAX_P99_DE
+
+@pytest.mark.parametrize("size, box", [((6000, 4000), (3000, 2000)), ((864, 1184), (432, 600)), ((333, 97), (100, 100)), ((50, 40), (100, 100))])
+def test_thumbnail_size_matches_pillow(size, box):
+    im = Image.new("RGB", size)
+    im.thumbnail(box)
+    assert thumbnail_size(size, box) == im.size
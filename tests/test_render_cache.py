@@ -0,0 +1,86 @@
+# tests/test_render_cache.py
+"""
+render_cache: 入力画像のダイジェストをソースごとに覚えておき、キャッシュヒット時に全画素をハッシュし直さないこと
+"""
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pytest
+
+from printtune.core.imaging import render_cache
+from printtune.core.imaging.final import render_final_image_file
+from printtune.core.imaging.load import load_image_rgb
+from printtune.core.imaging.numpy_io import rgb_u8_to_pil
+from printtune.core.imaging.parametric_linear import GlobalParams
+from printtune.core.imaging.render_cache import ImageDigestMemo, RenderCache, file_source_key, image_digest
+
+def _image(seed: int = 0):
+    return rgb_u8_to_pil(np.random.default_rng(seed).integers(0, 256, size=(24, 32, 3), dtype=np.uint8))
+
+@pytest.fixture
+def digest_calls(monkeypatch):
+    calls = []
+    real = render_cache.image_digest
+
+    def counting(img):
+        calls.append(img)
+        return real(img)
+
+    monkeypatch.setattr(render_cache, "image_digest", counting)
+    return calls
+
+def test_memo_by_file_source(tmp_path, digest_calls):
+    path = tmp_path / "in.png"
+    _image(0).save(path)
+    memo = ImageDigestMemo()
+
+    d1 = memo.digest(load_image_rgb(path), file_source_key(path))
+    d2 = memo.digest(load_image_rgb(path), file_source_key(path))  # rerun: 同じファイルを読み直した別オブジェクト
+    assert d1 == d2 == image_digest(load_image_rgb(path))
+    assert len(digest_calls) == 1
+
+    _image(1).save(path)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert memo.digest(load_image_rgb(path), file_source_key(path)) != d1
+    assert len(digest_calls) == 2
+
+def test_memo_by_object_identity(digest_calls):
+    memo = ImageDigestMemo()
+    img = _image(0)
+    assert memo.digest(img) == memo.digest(img)
+    assert len(digest_calls) == 1
+
+    # 別オブジェクト（回収後に同じ id を使い回すものを含む）は計算し直す
+    for seed in range(1, 4):
+        other = _image(seed)
+        assert memo.digest(other) == image_digest(other)
+        del other
+    assert len(digest_calls) == 4
+
+def test_memo_is_bounded():
+    memo = ImageDigestMemo(max_entries=2)
+    img = _image(0)
+    for i in range(5):
+        memo.digest(img, ("k", i))
+    assert len(memo._entries) == 2
+
+def test_final_image_cache_hit_skips_pixel_hash(tmp_path, digest_calls):
+    path = tmp_path / "in.png"
+    _image(0).save(path)
+    cache = RenderCache()
+    memo = ImageDigestMemo()
+
+    first = render_final_image_file(
+        load_image_rgb(path), GlobalParams(), tmp_path / "cache", cache=cache,
+        source=file_source_key(path), digests=memo,
+    )
+    again = render_final_image_file(
+        load_image_rgb(path), GlobalParams(), tmp_path / "cache", cache=cache,
+        source=file_source_key(path), digests=memo,
+    )
+    assert again == first and first.exists()
+    assert len(digest_calls) == 1
+    assert cache.hits == 1
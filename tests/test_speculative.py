@@ -0,0 +1,47 @@
+# tests/test_speculative.py
+"""
+speculative: 捨てた先読みの分岐の GP が gp_state.pt に書かれないこと、採用した分岐のものだけが保存されること
+"""
+from __future__ import annotations
+
+import torch
+
+from printtune.core.botorch.build_data import build_torch_data
+from printtune.core.botorch.model_cache import data_fingerprint, trim_unreferenced_tail
+from printtune.core.io import paths
+from printtune.core.io.gp_state_store import load_gp_state
+from printtune.core.session_runner import apply_judgment_chosen, append_round, create_round1, new_session
+from printtune.core.speculative import ProposalPrefetcher
+from printtune.core.usecases import submit_judgment_and_maybe_create_next_round
+
+def _fingerprint(session) -> str:
+    data = build_torch_data(session)
+    return data_fingerprint(
+        trim_unreferenced_tail(data.train_X, data.train_comp).double(), data.train_comp
+    )
+
+def test_discarded_branch_never_reaches_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(paths, "sessions_root_dir", lambda: tmp_path)
+    torch.manual_seed(0)
+    session = new_session("sample.png")
+    session = append_round(session, create_round1(session))
+    session = submit_judgment_and_maybe_create_next_round(
+        session, round_index=1, kind="chosen", chosen_slot=session.rounds[0].candidates[0].slot,
+    )
+    state_path = paths.gp_state_path(session.session_id)
+    saved = load_gp_state(state_path)
+    assert saved is not None and saved.fingerprint == _fingerprint(session)
+
+    prefetcher = ProposalPrefetcher()
+    round_index = len(session.rounds)
+    slots = [c.slot for c in session.rounds[-1].candidates]
+    assert prefetcher.prefetch_round(session, round_index) == len(slots)
+    for fut in list(prefetcher._futures[session.session_id].values()):
+        fut.result()
+    # 先読みの分岐はどれも保存しない
+    assert load_gp_state(state_path).fingerprint == saved.fingerprint
+
+    judged = apply_judgment_chosen(session, round_index=round_index, chosen_slot=slots[0])
+    assert prefetcher.take(judged) is not None
+    assert prefetcher.stats.hits == 1 and prefetcher.stats.discarded == len(slots) - 1
+    assert load_gp_state(state_path).fingerprint == _fingerprint(judged)
@@ -0,0 +1,39 @@
+# tests/test_update_loop.py
+"""
+botorch.update_loop: まとめると比較が残らないセッションでも提案が返ること
+"""
+from __future__ import annotations
+
+from dataclasses import replace
+
+import pytest
+
+from printtune.core.botorch.build_data import build_torch_data
+from printtune.core.botorch.update_loop import propose_from_session_for_round
+from printtune.core.log_types import SessionRecord
+from printtune.core.optimizer.param_space_v1 import PARAM_KEYS_V1, default_globals_v1
+from printtune.core.policy import PROPOSAL_POLICY
+from printtune.core.session_runner import append_round, apply_judgment_chosen, create_round1, new_session
+
+def _session_with_duplicate_candidates_judged() -> SessionRecord:
+    # 全候補が同じパラメータのラウンドで1つを選ぶ（比較はすべて同じ点どうしなので、まとめると消える）
+    session = new_session("sample.png")
+    rr = create_round1(session)
+    g = default_globals_v1()
+    rr = replace(rr, candidates=[replace(c, params={"globals": dict(g)}) for c in rr.candidates])
+    session = append_round(session, rr)
+    return apply_judgment_chosen(session, round_index=1, chosen_slot=rr.candidates[0].slot)
+
+@pytest.mark.parametrize("q", [2, 3, 4])
+def test_propose_falls_back_when_dedupe_leaves_no_comparisons(q):
+    session = _session_with_duplicate_candidates_judged()
+    assert session.comparisons_global
+    with pytest.raises(ValueError):
+        build_torch_data(session)
+
+    policy = replace(PROPOSAL_POLICY, candidates_per_round=q)
+    proposal = propose_from_session_for_round(session, phase_round_index=2, policy=policy, persist=False)
+    assert proposal.schedule["center_source"] == "fallback_no_comparison"
+    assert len(proposal.X_next) == q
+    assert all(len(x) == len(PARAM_KEYS_V1) for x in proposal.X_next)
+    assert len({tuple(x) for x in proposal.X_next}) > 1